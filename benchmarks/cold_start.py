@@ -0,0 +1,114 @@
+"""
+Время холодного запуска процесса database: пустой интерпретатор, импорт
+модулей базы и короткие команды в пакетном режиме (-c) на таблице
+из ROWS строк. Время - медиана нескольких запусков, мс.
+Перед замером байт-код проекта компилируется (compileall), как после
+установки пакета, иначе замер показывает время компиляции.
+Проверки (код возврата 1, если не пройдены):
+- надбавка к запуску интерпретатора для select по ID с выводом -o tsv
+  не больше бюджета (вывод таблицей дополнительно загружает prettytable
+  и wcwidth, его время показывается без проверки);
+- модули LAZY_MODULES (asyncio, пул процессов, prettytable, prompt, tarfile)
+  не импортируются при select с выводом -o tsv.
+
+Запуск из корня проекта: python -m benchmarks.cold_start [N] [--budget MS]
+"""
+import argparse
+import compileall
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, Set
+
+from benchmarks.datagen import DEFAULT_SCHEMA, generate_rows, insert_values
+
+REPEATS = 10
+ROWS = 1000
+# Допустимая надбавка к запуску интерпретатора для select по ID -o tsv, мс
+BUDGET_MS = 100
+LAZY_MODULES = ("asyncio", "multiprocessing", "concurrent.futures",
+                "prettytable", "prompt", "tarfile")
+DATABASE = [sys.executable, "-m", "src.primitive_db.main", "-q"]
+
+"""
+Медиана времени выполнения команды, мс
+"""
+def median_ms(command: List[str], cwd: str, env: dict, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=cwd, env=env, check=True,
+                       stdout=subprocess.DEVNULL)
+        timings.append((time.perf_counter() - start) * 1000)
+    return sorted(timings)[len(timings) // 2]
+
+"""
+Модули, импортированные при выполнении команды (по -X importtime)
+"""
+def imported_modules(command: List[str], cwd: str, env: dict) -> Set[str]:
+    stderr = subprocess.run(
+        [command[0], "-X", "importtime", *command[1:]], cwd=cwd, env=env,
+        check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    ).stderr
+    return {line.rsplit("|", 1)[1].strip() for line in stderr.splitlines()
+            if line.startswith("import time:") and "|" in line}
+
+"""
+Запуск замеров
+"""
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Холодный запуск database")
+    parser.add_argument("repeats", type=int, nargs="?", default=REPEATS)
+    parser.add_argument("--budget", type=float, default=BUDGET_MS,
+                        help="допустимая надбавка к запуску интерпретатора, мс")
+    args = parser.parse_args()
+
+    project = os.getcwd()
+    compileall.compile_dir(os.path.join(project, "src"), quiet=1)
+    env = {**os.environ, "PYTHONPATH": project}
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    workdir = tempfile.mkdtemp(prefix="primitive_db_start_")
+    values = ", ".join(map(insert_values, generate_rows(DEFAULT_SCHEMA, ROWS)))
+    subprocess.run([*DATABASE, "-c", f"create_table t {' '.join(DEFAULT_SCHEMA)}",
+                    "-c", f"insert into t values {values}"],
+                   cwd=workdir, env=env, check=True, stdout=subprocess.DEVNULL)
+
+    select = f"select from t where ID = {ROWS // 2}"
+    scenarios = {
+        "python -c pass": [sys.executable, "-c", "pass"],
+        "import main": [sys.executable, "-c", "import src.primitive_db.main"],
+        "list_tables": [*DATABASE, "-c", "list_tables"],
+        "info t": [*DATABASE, "-c", "info t"],
+        "select по ID": [*DATABASE, "-c", select],
+        "select по ID -o tsv": [*DATABASE, "-o", "tsv", "-c", select],
+    }
+    print(f"Медиана {args.repeats} запусков, мс; таблица {ROWS} строк")
+    results = {}
+    for name, command in scenarios.items():
+        results[name] = median_ms(command, workdir, env, args.repeats)
+        print(f"{name:<22} {results[name]:>8.1f}")
+
+    failed = False
+    overhead = results["select по ID -o tsv"] - results["python -c pass"]
+    verdict = "в пределах" if overhead <= args.budget else "ПРЕВЫШЕН"
+    print(f"\nНадбавка к запуску интерпретатора (select по ID -o tsv): "
+          f"{overhead:.1f} мс, бюджет {args.budget:.0f} мс - {verdict}")
+    failed |= overhead > args.budget
+
+    modules = imported_modules(scenarios["select по ID -o tsv"], workdir, env)
+    shutil.rmtree(workdir, ignore_errors=True)
+    loaded = [name for name in LAZY_MODULES if name in modules]
+    if loaded:
+        print(f"При select -o tsv импортированы: {', '.join(loaded)}")
+        failed = True
+    else:
+        print(f"При select -o tsv не импортированы: {', '.join(LAZY_MODULES)}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
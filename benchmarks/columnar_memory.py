@@ -0,0 +1,83 @@
+"""
+Память процесса (RSS) под таблицу из N строк в двух представлениях:
+dict - словарь ID -> запись (как до перехода на столбцы),
+columnar - ColumnarTable (array для int, битовая карта для bool,
+интернированные строки для str).
+Каждое представление строится в отдельном процессе.
+
+Запуск из корня проекта: python -m benchmarks.columnar_memory [N ...]
+"""
+import gc
+import os
+import subprocess
+import sys
+from typing import Any, Dict, Iterator
+
+from src.primitive_db.columnar import ColumnarTable
+
+SIZES = [100_000, 1_000_000]
+MODES = ("dict", "columnar")
+
+"""
+Синтетические строки схемы name:str age:int active:bool.
+Строки создаются заново для каждой записи, как при разборе JSON
+"""
+def make_rows(count: int) -> Iterator[Dict[str, Any]]:
+    for i in range(1, count + 1):
+        yield {"ID": i, "name": f"user{i % 5000}", "age": i % 90,
+               "active": i % 2 == 0}
+
+"""
+Текущий RSS процесса, байт
+"""
+def rss_bytes() -> int:
+    with open("/proc/self/statm", 'r', encoding='utf-8') as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE")
+
+"""
+Прирост RSS после построения таблицы (выполняется в дочернем процессе)
+"""
+def measure(mode: str, count: int) -> int:
+    gc.collect()
+    before = rss_bytes()
+    if mode == "dict":
+        table: Any = {row["ID"]: row for row in make_rows(count)}
+    else:
+        table = ColumnarTable(make_rows(count))
+    gc.collect()
+    used = rss_bytes() - before
+    assert len(table) == count
+    return used
+
+"""
+Запуск замера в отдельном процессе, чтобы память не переиспользовалась
+"""
+def measure_in_process(mode: str, count: int) -> int:
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.columnar_memory",
+         "--child", mode, str(count)],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return int(output)
+
+"""
+Запуск замеров
+"""
+def main() -> None:
+    if sys.argv[1:2] == ["--child"]:
+        print(measure(sys.argv[2], int(sys.argv[3])))
+        return
+
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    print(f"{'строк':>10} {'dict, МБ':>12} {'columnar, МБ':>14} {'экономия':>10}")
+    for size in sizes:
+        dict_mb, columnar_mb = (
+            measure_in_process(mode, size) / 2 ** 20 for mode in MODES
+        )
+        print(f"{size:>10} {dict_mb:>12.1f} {columnar_mb:>14.1f} "
+              f"{dict_mb / columnar_mb:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
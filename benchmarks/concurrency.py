@@ -0,0 +1,157 @@
+"""
+Нагрузочная проверка одновременной работы процессов с одной базой:
+N процессов-писателей выполняют по K команд insert в одну таблицу,
+R процессов-читателей в это время выполняют select count(*).
+После завершения проверяется, что ни одна запись не потеряна,
+ID уникальны и идут подряд, а счетчик ID в метаданных совпадает
+с числом записей. Выводится время ожидания блокировок.
+С флагом --no-locks блокировки отключаются (для сравнения).
+
+Запуск из корня проекта:
+python -m benchmarks.concurrency [N [K [R]]] [--storage json|log] [--no-locks]
+Код возврата 1 - найдены потерянные или повторные записи
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Tuple
+
+from src.primitive_db import constants, engine, locks, storage
+from src.primitive_db.output import error_count, set_quiet
+
+WRITERS = 8
+INSERTS = 200
+READERS = 2
+TABLE = "stress"
+
+"""
+Настройка процесса: рабочий каталог, хранилище, блокировки
+"""
+def setup(workdir: str, backend: str, use_locks: bool) -> None:
+    os.chdir(workdir)
+    storage.use_storage(backend)
+    locks.set_enabled(use_locks)
+    set_quiet(True)
+
+"""
+Выполнение команд одной сессией процесса.
+Возвращает время работы, число ошибок (и сбоев) команд и статистику блокировок
+"""
+def run_commands(workdir: str, backend: str, use_locks: bool,
+                 commands: List[List[str]]) -> Tuple[float, int, Dict[str, Any]]:
+    setup(workdir, backend, use_locks)
+    start = time.perf_counter()
+    failed = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        cache = engine.start_session(reload_metadata=use_locks)
+        try:
+            for args in commands:
+                try:
+                    engine.execute(args)
+                except OSError:
+                    # Без блокировок процессы удаляют и заменяют файлы друг друга
+                    failed += 1
+        finally:
+            engine.end_session(cache)
+    elapsed = time.perf_counter() - start
+    stats = {
+        path: (item.acquired, item.waited, item.wait_total, item.wait_max)
+        for path, item in locks.lock_stats().items()
+    }
+    return elapsed, error_count() + failed, stats
+
+"""
+Проверка таблицы после нагрузки. Возвращает список найденных проблем
+"""
+def verify(backend: str, writers: int, inserts: int) -> List[str]:
+    rows = storage.get_storage(backend).load(TABLE)
+    with open(constants.DB_FILE, 'r', encoding='utf-8') as f:
+        sequence = json.load(f)[TABLE]["sequence"]
+    expected = writers * inserts
+    ids = [row["ID"] for row in rows]
+    pairs = {(row["worker"], row["n"]) for row in rows}
+    problems = []
+    if len(rows) != expected:
+        problems.append(f"записей {len(rows)} вместо {expected}")
+    if len(set(ids)) != len(ids):
+        problems.append(f"повторных ID: {len(ids) - len(set(ids))}")
+    if len(pairs) != expected:
+        problems.append(f"потеряно вставок: {expected - len(pairs)}")
+    if sorted(ids) != list(range(1, len(ids) + 1)):
+        problems.append("ID идут не подряд")
+    if sequence != expected:
+        problems.append(f"счетчик ID {sequence} вместо {expected}")
+    return problems
+
+"""
+Запуск проверки
+"""
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("writers", nargs="?", type=int, default=WRITERS)
+    parser.add_argument("inserts", nargs="?", type=int, default=INSERTS)
+    parser.add_argument("readers", nargs="?", type=int, default=READERS)
+    parser.add_argument("--storage", choices=sorted(storage.STORAGES), default="log")
+    parser.add_argument("--no-locks", action="store_true")
+    options = parser.parse_args()
+    use_locks = not options.no_locks
+
+    workdir = tempfile.mkdtemp(prefix="primitive_db_stress_")
+    run_commands(workdir, options.storage, use_locks,
+                 [["create_table", TABLE, "worker:int", "n:int"]])
+
+    jobs = [
+        [["insert", "into", TABLE, "values", f"({w}, {n})"]
+         for n in range(options.inserts)]
+        for w in range(options.writers)
+    ]
+    reads = max(1, options.inserts // 4)
+    jobs += [[["select", "count(*)", "from", TABLE]] * reads] * options.readers
+
+    # spawn: процессы не наследуют открытые файлы блокировок родителя
+    context = multiprocessing.get_context("spawn")
+    start = time.perf_counter()
+    with context.Pool(len(jobs), maxtasksperchild=1) as pool:
+        results = pool.starmap(
+            run_commands,
+            [(workdir, options.storage, use_locks, job) for job in jobs],
+        )
+    elapsed = time.perf_counter() - start
+
+    os.chdir(workdir)
+    problems = verify(options.storage, options.writers, options.inserts)
+    total = options.writers * options.inserts
+    print(f"Хранилище {options.storage}, блокировки "
+          f"{'включены' if use_locks else 'отключены'}: {options.writers} писателей "
+          f"x {options.inserts} insert, {options.readers} читателей x {reads} select")
+    print(f"Время: {elapsed:.2f} с, {total / elapsed:.0f} insert/с, "
+          f"ошибок команд: {sum(errors for _, errors, _ in results)}")
+
+    print(f"{'блокировка':>24} {'получена':>9} {'с ожиданием':>12} "
+          f"{'ожидание, с':>12} {'максимум, с':>12}")
+    merged: Dict[str, List[float]] = {}
+    for _, _, stats in results:
+        for path, (acquired, waited, wait_total, wait_max) in stats.items():
+            item = merged.setdefault(path, [0, 0, 0.0, 0.0])
+            item[0] += acquired
+            item[1] += waited
+            item[2] += wait_total
+            item[3] = max(item[3], wait_max)
+    for path, (acquired, waited, wait_total, wait_max) in sorted(merged.items()):
+        print(f"{path:>24} {acquired:>9} {waited:>12} "
+              f"{wait_total:>12.3f} {wait_max:>12.4f}")
+
+    if problems:
+        print("ОШИБКА: " + "; ".join(problems))
+        sys.exit(1)
+    print("OK: записи не потеряны, ID уникальны")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Генератор синтетических данных для схем из столбцов int/str/bool.
+Данные детерминированы: одно и то же зерно (seed) дает те же записи
+на любой машине, поэтому замеры разных версий сравнимы.
+Значения по типам:
+int - равномерно от 0 до INT_RANGE - 1 (условие < 10 отбирает около 1%),
+str - "s<число>" из набора rows // STR_REPEAT различных строк
+(как имена и города - значения повторяются),
+bool - true/false с вероятностью 1/2.
+
+Запуск из корня проекта:
+python -m benchmarks.datagen <строк> <файл.jsonl|файл.csv> [столбец:тип ...]
+                            [--seed N]
+"""
+import argparse
+import csv
+import json
+import random
+from typing import Any, Dict, Iterator, List, Tuple
+
+DEFAULT_SCHEMA = ["name:str", "age:int", "active:bool"]
+INT_RANGE = 1000
+# В среднем сколько раз повторяется каждое строковое значение
+STR_REPEAT = 10
+
+"""
+Разбор схемы ['имя:тип', ...] в пары (имя, тип)
+"""
+def parse_schema(columns: List[str]) -> List[Tuple[str, str]]:
+    schema = []
+    for spec in columns:
+        name, _, typ = spec.partition(":")
+        if not name or typ not in ("int", "str", "bool"):
+            raise ValueError(f"Некорректный столбец: {spec}. \
+                             Ожидается имя:int|str|bool")
+        schema.append((name, typ))
+    return schema
+
+"""
+Записи (без ID) схемы columns: count штук, детерминированно по seed
+"""
+def generate_rows(columns: List[str], count: int,
+                  seed: int = 0) -> Iterator[Dict[str, Any]]:
+    schema = parse_schema(columns)
+    rng = random.Random(seed)
+    distinct = max(1, count // STR_REPEAT)
+    for _ in range(count):
+        row = {}
+        for name, typ in schema:
+            if typ == "int":
+                row[name] = rng.randrange(INT_RANGE)
+            elif typ == "bool":
+                row[name] = rng.random() < 0.5
+            else:
+                row[name] = f"s{rng.randrange(distinct)}"
+        yield row
+
+"""
+Значения записи для команды insert: (v1, v2, ...)
+"""
+def insert_values(row: Dict[str, Any]) -> str:
+    return "(" + ", ".join(
+        str(value).lower() if isinstance(value, bool) else str(value)
+        for value in row.values()
+    ) + ")"
+
+"""
+Запись файла для команды load: JSONL (объект на строку) или CSV с заголовком
+"""
+def write_records(path: str, columns: List[str], count: int,
+                  seed: int = 0) -> None:
+    rows = generate_rows(columns, count, seed)
+    names = [name for name, _ in parse_schema(columns)]
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        if path.endswith(".csv"):
+            writer = csv.writer(f)
+            writer.writerow(names)
+            writer.writerows(row.values() for row in rows)
+        else:
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+"""
+Запуск генератора
+"""
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Синтетические записи для команды load")
+    parser.add_argument("rows", type=int, help="число записей")
+    parser.add_argument("path", help="файл .jsonl или .csv")
+    parser.add_argument("columns", nargs="*", default=DEFAULT_SCHEMA,
+                        help="столбцы имя:тип (по умолчанию %(default)s)")
+    parser.add_argument("--seed", type=int, default=0, help="зерно генератора")
+    args = parser.parse_args()
+    write_records(args.path, args.columns, args.rows, args.seed)
+    print(f"{args.path}: {args.rows} записей, столбцы {' '.join(args.columns)}")
+
+
+if __name__ == "__main__":
+    main()
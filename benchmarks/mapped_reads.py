@@ -0,0 +1,101 @@
+"""
+Чтение записи по ID и число записей (как в info) у таблицы, которая еще
+не загружена в кэш: json (снапшот хранилища log) против двоичного файла,
+отображенного в память (binary, binary+zlib). Для каждого замера -
+новый кэш, время и пик выделенной памяти (tracemalloc).
+Отдельно - время команды select ... where ID = N отдельным процессом database.
+
+Запуск из корня проекта: python -m benchmarks.mapped_reads [N]
+"""
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Tuple
+
+from benchmarks.table_formats import COLUMNS, make_rows
+from src.primitive_db.cache import TableCache
+from src.primitive_db.storage import get_storage, write_metadata_file
+
+ROWS = 1_000_000
+LOOKUPS = 5
+FORMATS = {
+    "json": ("json", "none"),
+    "binary": ("binary", "none"),
+    "binary+zlib": ("binary", "zlib"),
+}
+
+"""
+Время (мс) и пик памяти (МБ) вызова func(cache) на новом кэше
+"""
+def measure(func: Callable[[TableCache], object]) -> Tuple[float, float]:
+    cache = TableCache(storage=get_storage("log"))
+    tracemalloc.start()
+    start = time.perf_counter()
+    func(cache)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed * 1000, peak / 2 ** 20
+
+"""
+Подготовка таблиц: одинаковые записи во всех форматах
+"""
+def prepare(rows: int, project: str) -> None:
+    data = make_rows(rows)
+    for name, (table_format, compression) in FORMATS.items():
+        table_name = name.replace("+", "_")
+        get_storage("log").create(table_name, COLUMNS, table_format, compression)
+        get_storage("log").save(table_name, data)
+    write_metadata_file("db_meta.json", {
+        name.replace("+", "_"): {"columns": COLUMNS, "sequence": rows}
+        for name in FORMATS
+    })
+    os.environ["PYTHONPATH"] = project
+
+"""
+Время команды select по ID отдельным процессом, мс
+"""
+def cli_lookup(table_name: str, row_id: int) -> float:
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-m", "src.primitive_db.main", "-q",
+         "-c", f"select from {table_name} where ID = {row_id}"],
+        check=True, stdout=subprocess.DEVNULL,
+    )
+    return (time.perf_counter() - start) * 1000
+
+"""
+Запуск замеров
+"""
+def main() -> None:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else ROWS
+    project = os.getcwd()
+    os.chdir(tempfile.mkdtemp(prefix="primitive_db_mapped_"))
+    prepare(rows, project)
+    rng = random.Random(0)
+    ids = [rng.randint(1, rows) for _ in range(LOOKUPS)]
+
+    print(f"Таблица {rows} строк, столбцы {' '.join(COLUMNS[1:])}; "
+          f"чтение по ID - среднее по {LOOKUPS} запросам")
+    print(f"{'формат':>12} {'по ID, мс':>10} {'память, МБ':>11} "
+          f"{'число, мс':>10} {'память, МБ':>11} {'процесс, мс':>12}")
+    for name in FORMATS:
+        table_name = name.replace("+", "_")
+        lookups = [
+            measure(lambda cache, i=i: cache.find_rows(table_name, "ID", i))
+            for i in ids
+        ]
+        lookup_ms = sum(ms for ms, _ in lookups) / len(lookups)
+        lookup_mb = max(mb for _, mb in lookups)
+        count_ms, count_mb = measure(lambda cache: len(cache.get(table_name)))
+        process_ms = min(cli_lookup(table_name, i) for i in ids[:3])
+        print(f"{name:>12} {lookup_ms:>10.2f} {lookup_mb:>11.2f} "
+              f"{count_ms:>10.2f} {count_mb:>11.2f} {process_ms:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Накладные расходы сбора метрик: одни и те же короткие команды
+(select по ID, select с условием и limit, агрегат, insert) выполняются
+в одном процессе с включенными и выключенными метриками.
+Отдельно - собственная стоимость учета на пустой команде.
+Время на команду - лучшее из нескольких повторов (с метриками и без
+по очереди), вывод команд отбрасывается.
+
+Запуск из корня проекта: python -m benchmarks.metrics_overhead [N]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+import timeit
+from typing import List, Tuple
+
+from src.primitive_db import engine, metrics
+from src.primitive_db.output import set_quiet
+
+ROWS = 10_000
+COMMANDS = 2_000
+REPEATS = 5
+# Входов в фазу в замере собственной стоимости учета
+PHASES = 10
+QUERIES = {
+    "select по ID": "select from t where ID = {i}",
+    "select limit 5": "select from t where age > 50 limit 5",
+    "count(*)": "select count(*) from t where ok = true",
+    "insert": "insert into t values (user{i}, 30, false)",
+}
+
+"""
+Время выполнения команд сценария, микросекунд на команду
+"""
+def run(lines: List[str]) -> float:
+    args = [line.split() for line in lines]
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for command in args:
+            engine.execute(command)
+        elapsed = time.perf_counter() - start
+    return elapsed / len(lines) * 1e6
+
+"""
+Собственная стоимость учета: пустая команда с PHASES входами в фазу
+и счетчиком, мкс на команду с метриками и без
+"""
+def fixed_cost() -> Tuple[float, float]:
+    @metrics.timed_command
+    def command(args: List[str]) -> None:
+        for _ in range(PHASES):
+            with metrics.phase("filter"):
+                pass
+        metrics.add("rows_scanned", 1)
+
+    result = []
+    for enabled in (True, False):
+        metrics.set_enabled(enabled)
+        result.append(min(
+            timeit.timeit(lambda: command(["select"]), number=20_000)
+            for _ in range(REPEATS)
+        ) / 20_000 * 1e6)
+    metrics.set_enabled(True)
+    return result[0], result[1]
+
+"""
+Запуск замеров
+"""
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else COMMANDS
+    os.chdir(tempfile.mkdtemp(prefix="primitive_db_metrics_"))
+    set_quiet(True)
+    cache = engine.start_session()
+    try:
+        engine.execute(["create_table", "t", "name:str", "age:int", "ok:bool"])
+        values = ", ".join(f"(user{i}, {i % 90}, {str(i % 2 == 0).lower()})"
+                           for i in range(ROWS))
+        engine.execute(["insert", "into", "t", "values", values])
+
+        on, off = fixed_cost()
+        print(f"Пустая команда с {PHASES} фазами: {off:.1f} мкс без метрик, "
+              f"{on:.1f} мкс с метриками "
+              f"({(on - off) / PHASES:.2f} мкс на фазу с учетом команды)")
+        print(f"Таблица {ROWS} строк, {count} команд каждого вида, "
+              f"лучшее из {REPEATS}, мкс на команду")
+        print(f"{'команда':<16} {'без метрик':>11} {'с метриками':>12} "
+              f"{'разница':>9}")
+        for name, template in QUERIES.items():
+            lines = [template.format(i=i % ROWS + 1) for i in range(count)]
+            # Повторы с метриками и без чередуются, чтобы рост таблицы
+            # (insert) и фоновая нагрузка сказывались на обоих одинаково
+            timings = {False: [], True: []}
+            for _ in range(REPEATS):
+                for enabled in (False, True):
+                    metrics.set_enabled(enabled)
+                    timings[enabled].append(run(lines))
+            off, on = min(timings[False]), min(timings[True])
+            print(f"{name:<16} {off:>11.1f} {on:>12.1f} "
+                  f"{(on - off) / off * 100:>8.1f}%")
+    finally:
+        engine.end_session(cache)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Отбор записей полным перебором (без индекса) при разном числе процессов:
+1 - последовательно, 2/4/8 - параллельно по частям таблицы (parallel.py).
+Время - лучшее из нескольких запусков на уже запущенном пуле процессов;
+результат каждого запуска сверяется с последовательным.
+Выигрыш ограничен числом процессоров машины (печатается в начале).
+
+Запуск из корня проекта: python -m benchmarks.parallel_scan [N]
+"""
+import os
+import sys
+import time
+from typing import Iterable, List
+
+from benchmarks.table_formats import make_rows
+from src.primitive_db import parallel
+from src.primitive_db.columnar import ColumnarTable
+from src.primitive_db.predicates import Predicate, parse_where
+
+ROWS = 2_000_000
+WORKERS = [1, 2, 4, 8]
+REPEATS = 3
+QUERIES = [
+    "age > 40",
+    "age between 20 and 30 and active = true",
+    "city in (Пермь, Омск) or age < 25",
+    "name > user5",
+    "age > 40 and name > user5",
+]
+TYPES = {"ID": int, "name": str, "city": str, "age": int,
+         "active": lambda value: value == "true"}
+
+"""
+Условие where с значениями в типах столбцов (как после bind)
+"""
+def typed(query: str) -> Predicate:
+    pred = parse_where(query)
+    stack = [pred]
+    while stack:
+        item = stack.pop()
+        if hasattr(item, "items"):
+            stack.extend(item.items)
+        else:
+            item.values = [TYPES[item.column](value) for value in item.values]
+    return pred
+
+"""
+Лучшее время отбора, мс, и отметки отобранных позиций
+"""
+def measure(table: ColumnarTable, pred: Predicate) -> tuple:
+    best = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        selection = table.selection(pred, parallel_scan=True)
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, selection
+
+def matched(selection: Iterable[int]) -> List[bool]:
+    return [bool(flag) for flag in selection]
+
+"""
+Запуск замеров
+"""
+def main() -> None:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else ROWS
+    table = ColumnarTable(make_rows(rows))
+    preds = {query: typed(query) for query in QUERIES}
+    print(f"Таблица {rows} строк, процессоров: {os.cpu_count()}; "
+          f"время - лучшее из {REPEATS}, мс")
+
+    parallel.set_workers(1)
+    serial = {query: measure(table, pred) for query, pred in preds.items()}
+    print(f"{'условие':<42}" + "".join(f"{w:>8}" for w in WORKERS)
+          + f"{'к 1 проц.':>11}")
+    results = {query: [ms] for query, (ms, _) in serial.items()}
+    for workers in WORKERS[1:]:
+        parallel.set_workers(workers)
+        # Первый отбор запускает процессы пула, он в замер не входит
+        table.selection(preds[QUERIES[0]], parallel_scan=True)
+        for query, pred in preds.items():
+            ms, selection = measure(table, pred)
+            assert matched(selection) == matched(serial[query][1]), query
+            results[query].append(ms)
+    for query, timings in results.items():
+        speedup = timings[0] / min(timings[1:])
+        print(f"{query:<42}" + "".join(f"{ms:>8.0f}" for ms in timings)
+              + f"{speedup:>10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+Проверка исправленных ошибок: каждый сценарий выполняет команды процессом
+database в пустом каталоге (сценарий -f с --continue-on-error, вывод -o json)
+и сверяет записи таблиц и сообщения об ошибках с ожидаемыми.
+
+Запуск из корня проекта: python -m benchmarks.regressions
+Код возврата 1 - хотя бы один сценарий не прошел
+"""
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+from typing import Any, Callable, Dict, List, Tuple
+
+DATABASE = [sys.executable, "-m", "src.primitive_db.main", "-q", "-y",
+            "-o", "json", "--continue-on-error"]
+
+# Результат сценария: записи, выведенные select, и сообщения об ошибках
+Result = Tuple[List[Dict[str, Any]], str]
+
+"""
+Выполнение команд сценария в каталоге workdir.
+Возвращает записи, выведенные select (объект на строку), и stderr
+"""
+def run_script(workdir: str, lines: List[str]) -> Result:
+    script = os.path.join(workdir, "script.txt")
+    with open(script, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines) + "\n")
+    env = {**os.environ, "PYTHONPATH": os.getcwd()}
+    done = subprocess.run([*DATABASE, "-f", script], cwd=workdir, env=env,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    rows = [json.loads(line) for line in done.stdout.splitlines()
+            if line.startswith("{")]
+    return rows, done.stderr
+
+"""
+update ... set ID = ... отклоняется: смена ID перезаписала бы другую запись
+"""
+def update_id(workdir: str) -> List[str]:
+    rows, errors = run_script(workdir, [
+        "create_table t name:str",
+        'insert into t values ("a"), ("b"), ("c")',
+        "update t set ID = 3 where ID = 1",
+        "select from t",
+    ])
+    problems = []
+    if [row["name"] for row in rows] != ["a", "b", "c"]:
+        problems.append(f"записи после update ID: {rows}")
+    if "ID нельзя изменить" not in errors:
+        problems.append("update ID не отклонен")
+    return problems
+
+"""
+Значение в кавычках с операторами и пробелами - одна лексема условия
+в select, update и delete (и при повторе команды из кэша планов)
+"""
+def quoted_where(workdir: str) -> List[str]:
+    rows, errors = run_script(workdir, [
+        "create_table t name:str age:int",
+        'insert into t values ("a=b", 1), ("x y", 2), ("p<q", 3), ("and", 4)',
+        'select from t where name = "a=b"',
+        'select from t where name = "x y" or name in ("p<q", "and")',
+        'update t set age = 10 where name = "a=b"',
+        'delete from t where name = "p<q"',
+        'select from t where name != "x y"',
+    ])
+    expected = [("a=b", 1), ("x y", 2), ("p<q", 3), ("and", 4),
+                ("a=b", 10), ("and", 4)]
+    problems = []
+    if [(row["name"], row["age"]) for row in rows] != expected:
+        problems.append(f"записи: {rows}")
+    if errors:
+        problems.append(f"ошибки: {errors.strip()}")
+    return problems
+
+"""
+Значения insert в кавычках со скобками и запятыми - одно значение
+(первая команда разбирается, вторая берет план из кэша)
+"""
+def quoted_values(workdir: str) -> List[str]:
+    rows, errors = run_script(workdir, [
+        "create_table t name:str age:int",
+        'insert into t values ("x(y", 5)',
+        'insert into t values ("a, b", 6), (plain text, 7)',
+        "select from t",
+    ])
+    expected = [("x(y", 5), ("a, b", 6), ("plain text", 7)]
+    problems = []
+    if [(row["name"], row["age"]) for row in rows] != expected:
+        problems.append(f"записи: {rows}")
+    if errors:
+        problems.append(f"ошибки: {errors.strip()}")
+    return problems
+
+"""
+create_table и drop_table внутри транзакции отклоняются: после rollback
+в data/ не остается файлов таблицы, которой нет в метаданных
+"""
+def transaction_ddl(workdir: str) -> List[str]:
+    rows, errors = run_script(workdir, [
+        "create_table kept v:int",
+        "begin",
+        "create_table ghost v:int",
+        "drop_table kept",
+        "rollback",
+        "list_tables",
+    ])
+    problems = []
+    leftovers = [name for name in os.listdir(os.path.join(workdir, "data"))
+                 if name.startswith("ghost.") and not name.endswith(".lock")]
+    if leftovers:
+        problems.append(f"файлы отмененной таблицы: {', '.join(leftovers)}")
+    if errors.count("недоступна внутри транзакции") != 2:
+        problems.append(f"ошибки: {errors.strip()}")
+    if not os.path.exists(os.path.join(workdir, "data", "kept.stats.json")):
+        problems.append("удалены файлы таблицы kept")
+    return problems
+
+"""
+Копия с именем таблицы вне data/ ("../x") или с чужим файлом отклоняется,
+файлы вне data/ не создаются
+"""
+def crafted_backup(workdir: str) -> List[str]:
+    meta = json.dumps({"../x": {"columns": ["ID:int"], "sequence": 0}}).encode()
+    data = b"[]"
+    manifest = {
+        "format": 1, "created": "", "incremental": False,
+        "metadata": {"size": len(meta), "sha256": hashlib.sha256(meta).hexdigest()},
+        "tables": {"../x": {"archive": None, "files": {"x.json": {
+            "size": len(data), "sha256": hashlib.sha256(data).hexdigest()}}}},
+    }
+    archive = os.path.join(workdir, "crafted.tgz")
+    with gzip.open(archive, "wb") as gz, tarfile.open(fileobj=gz, mode="w|") as tar:
+        for name, content in (("db_meta.json", meta), ("data/x.json", data),
+                              ("manifest.json", json.dumps(manifest).encode())):
+            member = tarfile.TarInfo(name)
+            member.size = len(content)
+            tar.addfile(member, io.BytesIO(content))
+    _, errors = run_script(workdir, ["restore crafted.tgz"])
+    problems = []
+    if "Некорректное имя таблицы" not in errors:
+        problems.append(f"копия не отклонена: {errors.strip()}")
+    outside = [name for name in os.listdir(workdir) if name.startswith("x.")]
+    if outside:
+        problems.append(f"файлы вне data/: {', '.join(outside)}")
+    return problems
+
+"""
+Повтор журнала прерванного commit, операции которого уже записаны в таблицу:
+число записей в статистике (info) совпадает с таблицей
+"""
+def replayed_stats(workdir: str) -> List[str]:
+    run_script(workdir, [
+        "create_table t v:int",
+        "insert into t values (1), (2)",
+    ])
+    journal = {"tables": {"t": [{"op": "insert", "row": {"ID": 2, "v": 2}}]},
+               "metadata": {}}
+    with open(os.path.join(workdir, "db_txn.json"), 'w', encoding='utf-8') as f:
+        json.dump(journal, f)
+    env = {**os.environ, "PYTHONPATH": os.getcwd()}
+    done = subprocess.run([*DATABASE, "-c", "info t"], cwd=workdir, env=env,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if "Количество записей: 2" not in done.stdout:
+        return [f"info после повтора журнала: {done.stdout.strip()}"]
+    return []
+
+"""
+Оборванный файл статистики удаляется при запуске, а не принимается
+за поврежденный снапшот таблицы; статистика считается заново
+"""
+def torn_stats(workdir: str) -> List[str]:
+    run_script(workdir, [
+        "create_table t v:int",
+        "insert into t values (1), (2)",
+    ])
+    path = os.path.join(workdir, "data", "t.stats.json")
+    with open(path, 'r+', encoding='utf-8') as f:
+        f.truncate(20)
+    env = {**os.environ, "PYTHONPATH": os.getcwd()}
+    problems = []
+    for attempt in (1, 2):
+        done = subprocess.run([*DATABASE, "-c", "info t"], cwd=workdir, env=env,
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                              text=True)
+        if "Снапшот таблицы" in done.stderr:
+            problems.append(f"запуск {attempt}: {done.stderr.strip()}")
+        if "Количество записей: 2" not in done.stdout:
+            problems.append(f"запуск {attempt}: {done.stdout.strip()}")
+    return problems
+
+
+SCENARIOS: Dict[str, Callable[[str], List[str]]] = {
+    "update set ID": update_id,
+    "where со значением в кавычках": quoted_where,
+    "insert со значением в кавычках": quoted_values,
+    "create_table/drop_table в транзакции": transaction_ddl,
+    "restore подложной копии": crafted_backup,
+    "статистика после повтора журнала": replayed_stats,
+    "оборванный файл статистики": torn_stats,
+}
+
+"""
+Запуск всех сценариев
+"""
+def main() -> None:
+    failed = 0
+    for name, scenario in SCENARIOS.items():
+        workdir = tempfile.mkdtemp(prefix="primitive_db_check_")
+        try:
+            problems = scenario(workdir)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        print(f"{name:<40} {'ОШИБКА' if problems else 'ok'}")
+        for problem in problems:
+            print(f"  {problem}")
+        failed += bool(problems)
+    if failed:
+        print(f"Не прошли сценарии: {failed} из {len(SCENARIOS)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
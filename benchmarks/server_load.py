@@ -0,0 +1,164 @@
+"""
+Нагрузка на сервер базы (database serve): C клиентов, у каждого одно
+соединение на все запросы, выполняют по N команд - чтение по ID,
+update по ID (доля --writes) и агрегат с полным просмотром таблицы
+(доля --scans).
+Выводятся операций в секунду и задержки p50/p99 по видам команд,
+для сравнения - задержка той же команды чтения отдельным процессом database.
+
+Запуск из корня проекта:
+python -m benchmarks.server_load [C [N]] [--rows M] [--writes 0.2] [--scans 0.05]
+                                [--workers W]
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+from src.primitive_db.client import Client
+from src.primitive_db.protocol import parse_header
+
+CLIENTS = 16
+REQUESTS = 500
+ROWS = 100_000
+WRITES = 0.2
+SCANS = 0.05
+COLD_RUNS = 5
+
+"""
+Процентиль отсортированного списка задержек
+"""
+def percentile(values: List[float], share: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+"""
+Команда клиента: чтение по ID, агрегат или update
+"""
+def make_command(rng: random.Random, rows: int, writes: float,
+                 scans: float) -> Tuple[str, str]:
+    row_id = rng.randint(1, rows)
+    share = rng.random()
+    if share < writes:
+        age = rng.randint(0, 99)
+        return "update", f"update bench set age = {age} where ID = {row_id}"
+    if share < writes + scans:
+        return "aggregate", f"select count(*) from bench where age = {row_id % 100}"
+    return "select", f"select from bench where ID = {row_id}"
+
+"""
+Один клиент: последовательные запросы по одному соединению.
+Возвращает пары (вид команды, задержка в секундах)
+"""
+async def run_client(socket_path: str, seed: int, requests: int, rows: int,
+                     writes: float, scans: float) -> List[Tuple[str, float]]:
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_unix_connection(socket_path)
+    latencies = []
+    for _ in range(requests):
+        kind, command = make_command(rng, rows, writes, scans)
+        start = time.perf_counter()
+        writer.write(command.encode("utf-8") + b"\n")
+        ok, out_size, err_size = parse_header(await reader.readline())
+        await reader.readexactly(out_size + err_size)
+        latencies.append((kind, time.perf_counter() - start))
+        if not ok:
+            raise RuntimeError(f"Ошибка команды: {command}")
+    writer.close()
+    return latencies
+
+async def run_load(socket_path: str, clients: int, requests: int, rows: int,
+                   writes: float, scans: float) -> List[Tuple[str, float]]:
+    results = await asyncio.gather(*[
+        run_client(socket_path, seed, requests, rows, writes, scans)
+        for seed in range(clients)
+    ])
+    return [item for result in results for item in result]
+
+"""
+Подготовка таблицы и задержка команды чтения отдельным процессом (холодный запуск)
+"""
+def prepare(rows: int) -> float:
+    with open("bench.csv", 'w', encoding='utf-8') as f:
+        f.writelines(f"user{i},{i % 100}\n" for i in range(1, rows + 1))
+    subprocess.run(
+        [sys.executable, "-m", "src.primitive_db.main", "-q",
+         "-c", "create_table bench name:str age:int",
+         "-c", "load bench bench.csv",
+         "-c", "create_index bench ID"],
+        check=True, stdout=subprocess.DEVNULL,
+    )
+    start = time.perf_counter()
+    for i in range(COLD_RUNS):
+        subprocess.run(
+            [sys.executable, "-m", "src.primitive_db.main", "-q",
+             "-c", f"select from bench where ID = {i + 1}"],
+            check=True, stdout=subprocess.DEVNULL,
+        )
+    return (time.perf_counter() - start) / COLD_RUNS
+
+"""
+Запуск замера
+"""
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("clients", nargs="?", type=int, default=CLIENTS)
+    parser.add_argument("requests", nargs="?", type=int, default=REQUESTS)
+    parser.add_argument("--rows", type=int, default=ROWS)
+    parser.add_argument("--writes", type=float, default=WRITES)
+    parser.add_argument("--scans", type=float, default=SCANS)
+    parser.add_argument("--workers", type=int, default=4)
+    options = parser.parse_args()
+
+    project = os.getcwd()
+    os.chdir(tempfile.mkdtemp(prefix="primitive_db_server_"))
+    os.environ["PYTHONPATH"] = project
+    cold = prepare(options.rows)
+
+    socket_path = os.path.abspath("db.sock")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "src.primitive_db.main", "-q", "serve",
+         "--socket", socket_path, "--workers", str(options.workers)],
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while not os.path.exists(socket_path):
+            if time.monotonic() > deadline or server.poll() is not None:
+                raise RuntimeError("Сервер не запустился.")
+            time.sleep(0.05)
+        # Первый запрос загружает таблицу в память сервера
+        with Client(socket_path) as client:
+            client.execute("select count(*) from bench")
+
+        start = time.perf_counter()
+        latencies = asyncio.run(run_load(socket_path, options.clients,
+                                         options.requests, options.rows,
+                                         options.writes, options.scans))
+        elapsed = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(f"Таблица {options.rows} строк, {options.clients} клиентов x "
+          f"{options.requests} запросов, доля update {options.writes:.0%}, "
+          f"агрегатов {options.scans:.0%}, потоков сервера {options.workers}")
+    print(f"Всего: {len(latencies)} запросов за {elapsed:.2f} с, "
+          f"{len(latencies) / elapsed:.0f} операций/с")
+    groups: Dict[str, List[float]] = {}
+    for kind, latency in latencies:
+        groups.setdefault(kind, []).append(latency)
+    groups["все"] = [latency for _, latency in latencies]
+    print(f"{'команда':>10} {'запросов':>9} {'p50, мс':>9} {'p99, мс':>9}")
+    for kind, values in groups.items():
+        values.sort()
+        print(f"{kind:>10} {len(values):>9} {percentile(values, 0.5) * 1000:>9.2f} "
+              f"{percentile(values, 0.99) * 1000:>9.2f}")
+    print(f"Отдельный процесс database на одно чтение: {cold * 1000:.0f} мс")
+
+
+if __name__ == "__main__":
+    main()
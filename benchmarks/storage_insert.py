@@ -0,0 +1,58 @@
+"""
+Задержка записи одной новой строки в таблицу из N строк
+для хранилищ json (перезапись файла) и log (дозапись в журнал).
+
+Запуск из корня проекта: python -m benchmarks.storage_insert [N ...]
+"""
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from src.primitive_db.storage import get_storage
+
+SIZES = [10_000, 100_000, 1_000_000]
+
+"""
+Синтетические строки схемы name:str age:int active:bool
+"""
+def make_rows(count: int) -> List[Dict[str, Any]]:
+    return [
+        {"ID": i, "name": f"user{i}", "age": i % 90, "active": i % 2 == 0}
+        for i in range(1, count + 1)
+    ]
+
+"""
+Медианная задержка записи одной строки, секунды
+"""
+def measure(backend: str, table_size: int, repeats: int) -> float:
+    storage = get_storage(backend)
+    table = f"bench_{backend}_{table_size}"
+    storage.save(table, make_rows(table_size))
+    timings = []
+    for i in range(repeats):
+        row = {"ID": table_size + i + 1, "name": "new", "age": 1, "active": True}
+        start = time.perf_counter()
+        storage.append(table, [{"op": "insert", "row": row}])
+        timings.append(time.perf_counter() - start)
+    storage.drop(table)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+"""
+Запуск замеров
+"""
+def main() -> None:
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    os.chdir(tempfile.mkdtemp(prefix="primitive_db_bench_"))
+    print(f"{'строк':>10} {'json, мс':>12} {'log, мс':>12} {'ускорение':>10}")
+    for size in sizes:
+        json_repeats = 3 if size >= 1_000_000 else 10
+        json_ms = measure("json", size, json_repeats) * 1000
+        log_ms = measure("log", size, 100) * 1000
+        print(f"{size:>10} {json_ms:>12.3f} {log_ms:>12.3f} {json_ms / log_ms:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+"""
+Воспроизводимый набор замеров движка на синтетических данных (datagen)
+для таблиц из 1 тыс., 100 тыс. и 1 млн строк:
+load - массовая загрузка (записей/с), insert - вставка по одной команде,
+point_select - select по ID, filtered_select - select с условием без
+индекса (полный перебор), update и delete по ID, startup - запуск
+процесса database с командой info. Для каждого сценария - пик памяти
+процесса (ru_maxrss).
+Каждый сценарий выполняется в отдельном процессе на копии базы,
+команды - через engine, как в пакетном режиме, вывод отбрасывается.
+Результаты записываются в JSON и сравниваются с базовыми (baseline):
+ухудшение больше порога выводится как регрессия, код возврата - 1.
+
+Запуск из корня проекта:
+python -m benchmarks.suite [--sizes 1000 100000 1000000] [--format json|binary]
+                           [--out bench_results.json] [--baseline <файл>]
+                           [--save-baseline] [--threshold 0.25]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.datagen import (
+    DEFAULT_SCHEMA,
+    generate_rows,
+    insert_values,
+    write_records,
+)
+
+SIZES = [1_000, 100_000, 1_000_000]
+TABLE = "bench"
+# Команд в замерах точечных операций (insert, select, update, delete по ID)
+OPS = 200
+# Повторов select с условием и запусков процесса database
+FILTER_REPEATS = 5
+STARTUP_REPEATS = 3
+FILTER_QUERY = f"select from {TABLE} where age < 10 and active = true limit 100"
+SCENARIOS = ("insert", "point_select", "filtered_select", "update", "delete")
+DEFAULT_OUT = "bench_results.json"
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "baseline.json")
+# Допустимое ухудшение относительно базовых результатов (0.25 - на 25%)
+THRESHOLD = 0.25
+# Метрики, которые лучше, когда больше (остальные - время и память)
+HIGHER_IS_BETTER = ("_per_s",)
+
+Result = Dict[str, Any]
+
+"""
+Квантиль списка значений (q от 0 до 1)
+"""
+def quantile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+"""
+Пик памяти текущего процесса, МБ (ru_maxrss в Linux - в КБ)
+"""
+def peak_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+"""
+Выполнение команд в сессии движка; время каждой команды, секунды.
+Ошибка команды прерывает замер
+"""
+def timed_commands(lines: List[str]) -> List[float]:
+    import shlex
+
+    from src.primitive_db import engine
+    from src.primitive_db.output import error_count
+
+    timings = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for line in lines:
+            errors = error_count()
+            args = shlex.split(line)
+            start = time.perf_counter()
+            engine.execute(args)
+            timings.append(time.perf_counter() - start)
+            if error_count() > errors:
+                raise RuntimeError(f"Команда завершилась ошибкой: {line[:80]}")
+    return timings
+
+"""
+Метрики серии точечных команд: операций в секунду и задержки p50/p95
+"""
+def series(timings: List[float]) -> Dict[str, float]:
+    return {
+        "ops_per_s": len(timings) / sum(timings),
+        "p50_ms": quantile(timings, 0.5) * 1000,
+        "p95_ms": quantile(timings, 0.95) * 1000,
+    }
+
+"""
+Сценарий в текущем процессе (в каталоге базы): метрики сценария
+"""
+def run_scenario(scenario: str, rows: int, table_format: str) -> Dict[str, float]:
+    from src.primitive_db import engine
+    from src.primitive_db.decorators import set_assume_yes
+    from src.primitive_db.output import set_quiet
+
+    set_quiet(True)
+    set_assume_yes(True)
+    rng = random.Random(rows)
+    cache = engine.start_session()
+    try:
+        if scenario == "load":
+            columns = " ".join(DEFAULT_SCHEMA)
+            timed_commands([f"create_table {TABLE} {columns} --format {table_format}"])
+            elapsed = timed_commands([f"load {TABLE} data.jsonl"])[0]
+            result = {"rows_per_s": rows / elapsed}
+        elif scenario == "insert":
+            # Чтение таблицы в кэш (info) в замер не входит
+            timed_commands([f"info {TABLE}"])
+            values = [insert_values(row)
+                      for row in generate_rows(DEFAULT_SCHEMA, OPS, seed=1)]
+            result = series(timed_commands(
+                [f"insert into {TABLE} values {value}" for value in values]
+            ))
+        elif scenario == "point_select":
+            ids = [rng.randint(1, rows) for _ in range(OPS + 1)]
+            lines = [f"select from {TABLE} where ID = {row_id}" for row_id in ids]
+            timings = timed_commands(lines)
+            # Первая команда читает таблицу в кэш
+            result = {"first_ms": timings[0] * 1000, **series(timings[1:])}
+        elif scenario == "filtered_select":
+            timings = timed_commands([FILTER_QUERY] * (FILTER_REPEATS + 1))
+            result = {"first_ms": timings[0] * 1000,
+                      "p50_ms": quantile(timings[1:], 0.5) * 1000}
+        elif scenario in ("update", "delete"):
+            # Чтение таблицы в кэш (info) в замер не входит
+            timed_commands([f"info {TABLE}"])
+            ids = rng.sample(range(1, rows + 1), min(OPS, rows))
+            if scenario == "update":
+                lines = [f"update {TABLE} set age = 1 where ID = {row_id}"
+                         for row_id in ids]
+            else:
+                lines = [f"delete from {TABLE} where ID = {row_id}" for row_id in ids]
+            result = series(timed_commands(lines))
+        else:
+            raise ValueError(f"Неизвестный сценарий: {scenario}")
+    finally:
+        engine.end_session(cache)
+    result["peak_mb"] = peak_mb()
+    return result
+
+"""
+Запуск сценария в отдельном процессе в каталоге базы
+"""
+def run_child(scenario: str, directory: str, rows: int,
+              table_format: str) -> Dict[str, float]:
+    project = os.getcwd()
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.suite", "--child", scenario,
+         directory, str(rows), table_format],
+        check=True, capture_output=True, text=True,
+        env={**os.environ, "PYTHONPATH": project}, cwd=project,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+"""
+Время запуска процесса database с командой info на готовой базе, мс (медиана)
+"""
+def startup_ms(directory: str) -> float:
+    project = os.getcwd()
+    timings = []
+    for _ in range(STARTUP_REPEATS):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-m", "src.primitive_db.main", "-q",
+             "-c", f"info {TABLE}"],
+            check=True, stdout=subprocess.DEVNULL, cwd=directory,
+            env={**os.environ, "PYTHONPATH": project},
+        )
+        timings.append(time.perf_counter() - start)
+    return quantile(timings, 0.5) * 1000
+
+"""
+Все сценарии для таблицы из rows строк: база создается один раз
+(load), остальные сценарии работают с ее копиями
+"""
+def run_size(rows: int, table_format: str, workdir: str) -> List[Result]:
+    base = os.path.join(workdir, f"rows_{rows}")
+    os.makedirs(base)
+    write_records(os.path.join(base, "data.jsonl"), DEFAULT_SCHEMA, rows)
+    measured = {"load": run_child("load", base, rows, table_format)}
+    os.remove(os.path.join(base, "data.jsonl"))
+    for scenario in SCENARIOS:
+        copy = os.path.join(workdir, f"rows_{rows}_{scenario}")
+        shutil.copytree(base, copy)
+        try:
+            measured[scenario] = run_child(scenario, copy, rows, table_format)
+        finally:
+            shutil.rmtree(copy)
+    measured["startup"] = {"startup_ms": startup_ms(base)}
+    shutil.rmtree(base)
+    return [
+        {"scenario": scenario, "rows": rows, "metric": metric, "value": value}
+        for scenario, metrics in measured.items()
+        for metric, value in metrics.items()
+    ]
+
+"""
+Описание окружения замера
+"""
+def environment(sizes: List[int], table_format: str) -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "sizes": sizes,
+        "format": table_format,
+    }
+
+def higher_is_better(metric: str) -> bool:
+    return metric.endswith(HIGHER_IS_BETTER)
+
+"""
+Сравнение с базовыми результатами: строки (сценарий, строк, метрика,
+было, стало, изменение, оценка). Изменение - во сколько раз хуже (>1)
+или лучше (<1); оценка "регрессия", если хуже больше чем на threshold
+"""
+def compare(results: List[Result], baseline: List[Result],
+            threshold: float) -> List[Tuple[Any, ...]]:
+    base = {(r["scenario"], r["rows"], r["metric"]): r["value"] for r in baseline}
+    rows = []
+    for result in results:
+        key = (result["scenario"], result["rows"], result["metric"])
+        old, new = base.get(key), result["value"]
+        if not old or not new:
+            continue
+        ratio = old / new if higher_is_better(key[2]) else new / old
+        if ratio > 1 + threshold:
+            verdict = "регрессия"
+        elif ratio < 1 / (1 + threshold):
+            verdict = "улучшение"
+        else:
+            verdict = ""
+        rows.append((*key, old, new, ratio, verdict))
+    return rows
+
+def print_results(results: List[Result]) -> None:
+    print(f"{'сценарий':<16} {'строк':>8} {'метрика':<11} {'значение':>12}")
+    for r in results:
+        print(f"{r['scenario']:<16} {r['rows']:>8} {r['metric']:<11} "
+              f"{r['value']:>12.2f}")
+
+def print_comparison(rows: List[Tuple[Any, ...]]) -> None:
+    print(f"{'сценарий':<16} {'строк':>8} {'метрика':<11} {'было':>10} "
+          f"{'стало':>10} {'хуже в':>7}")
+    for scenario, size, metric, old, new, ratio, verdict in rows:
+        print(f"{scenario:<16} {size:>8} {metric:<11} {old:>10.2f} "
+              f"{new:>10.2f} {ratio:>6.2f}x {verdict}")
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Набор замеров primitive_db")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--format", choices=("json", "binary"), default="json",
+                        help="формат файла таблицы")
+    parser.add_argument("--out", default=DEFAULT_OUT,
+                        help="файл результатов (JSON)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE,
+                        help="базовые результаты для сравнения")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="записать результаты как базовые")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="допустимое ухудшение (доля)")
+    return parser.parse_args(argv)
+
+"""
+Запуск набора замеров
+"""
+def main() -> None:
+    if sys.argv[1:2] == ["--child"]:
+        scenario, directory, rows, table_format = sys.argv[2:6]
+        os.chdir(directory)
+        print(json.dumps(run_scenario(scenario, int(rows), table_format)))
+        return
+
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix="primitive_db_suite_")
+    results: List[Result] = []
+    try:
+        for rows in args.sizes:
+            start = time.perf_counter()
+            results.extend(run_size(rows, args.format, workdir))
+            print(f"{rows} строк: {time.perf_counter() - start:.0f} с",
+                  file=sys.stderr)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {"environment": environment(args.sizes, args.format),
+              "results": results}
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print_results(results)
+    print(f"\nРезультаты записаны в {args.out}")
+
+    if args.save_baseline:
+        shutil.copyfile(args.out, args.baseline)
+        print(f"Базовые результаты записаны в {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"Базовых результатов нет ({args.baseline}): запустите \
+с --save-baseline.")
+        return
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    rows = compare(results, baseline["results"], args.threshold)
+    print(f"\nСравнение с {args.baseline} "
+          f"({baseline['environment'].get('commit')}, "
+          f"порог {args.threshold:.0%}):")
+    print_comparison(rows)
+    regressions = sum(1 for row in rows if row[-1] == "регрессия")
+    if regressions:
+        print(f"Регрессий: {regressions}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
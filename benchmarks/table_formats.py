@@ -0,0 +1,85 @@
+"""
+Размер файла таблицы, время записи и время загрузки в разных форматах:
+json (data/<таблица>.json с отступами, как в хранилище json),
+json-log (снапшот хранилища log - JSON без отступов),
+binary, binary+zlib, binary+lzma (data/<таблица>.bin).
+Загрузка - чтение файла и построение таблицы по столбцам (ColumnarTable),
+как при первом обращении команды к таблице.
+
+Запуск из корня проекта: python -m benchmarks.table_formats [N ...]
+"""
+import gc
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Tuple
+
+from src.primitive_db.cache import TableCache
+from src.primitive_db.storage import get_storage
+
+SIZES = [100_000, 1_000_000]
+COLUMNS = ["ID:int", "name:str", "city:str", "age:int", "active:bool"]
+# Формат: (хранилище, формат файла, сжатие)
+FORMATS = {
+    "json": ("json", "json", "none"),
+    "json-log": ("log", "json", "none"),
+    "binary": ("log", "binary", "none"),
+    "binary+zlib": ("log", "binary", "zlib"),
+    "binary+lzma": ("log", "binary", "lzma"),
+}
+CITIES = ["Москва", "Казань", "Пермь", "Омск", "Тверь", "Самара"]
+
+"""
+Синтетические строки схемы COLUMNS
+"""
+def make_rows(count: int) -> List[Dict[str, Any]]:
+    return [
+        {"ID": i, "name": f"user{i}", "city": CITIES[i % len(CITIES)],
+         "age": 18 + i % 70, "active": i % 3 == 0}
+        for i in range(1, count + 1)
+    ]
+
+"""
+Запись таблицы в формате и ее загрузка: (байт, секунд записи, секунд загрузки)
+"""
+def measure(name: str, rows: List[Dict[str, Any]]) -> Tuple[int, float, float]:
+    backend, table_format, compression = FORMATS[name]
+    storage = get_storage(backend)
+    table_name = name.replace("+", "_").replace("-", "_")
+    storage.create(table_name, COLUMNS, table_format, compression)
+
+    start = time.perf_counter()
+    storage.save(table_name, rows)
+    saved = time.perf_counter() - start
+    size = sum(os.path.getsize(path) for path in storage.paths(table_name)
+               if os.path.exists(path))
+
+    gc.collect()
+    start = time.perf_counter()
+    table = TableCache(storage=storage).get(table_name)
+    loaded = time.perf_counter() - start
+    assert len(table) == len(rows)
+    return size, saved, loaded
+
+"""
+Запуск замеров
+"""
+def main() -> None:
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    os.chdir(tempfile.mkdtemp(prefix="primitive_db_formats_"))
+    for size in sizes:
+        rows = make_rows(size)
+        print(f"\n{size} строк, столбцы {' '.join(COLUMNS[1:])}")
+        print(f"{'формат':>12} {'размер, МБ':>11} {'запись, с':>10} "
+              f"{'загрузка, с':>12} {'к json':>7}")
+        baseline = None
+        for name in FORMATS:
+            file_size, saved, loaded = measure(name, rows)
+            baseline = baseline or loaded
+            print(f"{name:>12} {file_size / 2 ** 20:>11.1f} {saved:>10.2f} "
+                  f"{loaded:>12.2f} {baseline / loaded:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
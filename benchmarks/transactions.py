@@ -0,0 +1,73 @@
+"""
+Пропускная способность сценария из N команд update по одной записи
+в таблице из M строк: каждая команда записывается на диск сразу
+(autocommit) или все команды выполняются в одной транзакции
+(begin ... commit). Замер для хранилищ json и log.
+
+Запуск из корня проекта: python -m benchmarks.transactions [N [M]]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+from src.primitive_db import core, utils
+from src.primitive_db.cache import TableCache
+from src.primitive_db.predicates import parse_where
+from src.primitive_db.storage import get_storage
+
+UPDATES = 1000
+TABLE_SIZE = 5000
+METADATA = {"bench": {"columns": ["ID:int", "name:str", "age:int"],
+                      "sequence": TABLE_SIZE}}
+
+"""
+Время выполнения сценария, секунды
+"""
+def measure(backend: str, updates: int, table_size: int,
+            transaction: bool) -> float:
+    storage = get_storage(backend)
+    storage.save("bench", [
+        {"ID": i, "name": f"user{i}", "age": i % 90}
+        for i in range(1, table_size + 1)
+    ])
+    cache = TableCache(storage=storage)
+    utils.use_cache(cache)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if transaction:
+            cache.begin()
+        for i in range(updates):
+            row_id = i % table_size + 1
+            ops = core.update(METADATA, "bench", {"age": str(i % 90)},
+                              parse_where(f"ID = {row_id}"))
+            utils.append_table_ops("bench", ops)
+            utils.flush_tables()
+        if transaction:
+            cache.commit()
+    elapsed = time.perf_counter() - start
+    utils.use_cache(None)
+    storage.drop("bench")
+    return elapsed
+
+"""
+Запуск замеров
+"""
+def main() -> None:
+    updates = int(sys.argv[1]) if len(sys.argv) > 1 else UPDATES
+    table_size = int(sys.argv[2]) if len(sys.argv) > 2 else TABLE_SIZE
+    os.chdir(tempfile.mkdtemp(prefix="primitive_db_bench_"))
+    print(f"{updates} update, таблица {table_size} строк")
+    print(f"{'хранилище':>10} {'autocommit, с':>14} {'транзакция, с':>14} "
+          f"{'команд/с':>10} {'ускорение':>10}")
+    for backend in ("json", "log"):
+        auto = measure(backend, updates, table_size, transaction=False)
+        txn = measure(backend, updates, table_size, transaction=True)
+        print(f"{backend:>10} {auto:>14.3f} {txn:>14.3f} "
+              f"{updates / txn:>10.0f} {auto / txn:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
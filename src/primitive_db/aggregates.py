@@ -0,0 +1,149 @@
+import re
+from itertools import compress, count
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.primitive_db import metrics
+
+AGGREGATE_FUNCTIONS = ("count", "sum", "min", "max", "avg")
+# Функции, которым нужен числовой столбец
+NUMERIC_FUNCTIONS = ("sum", "avg")
+
+_AGGREGATE_RE = re.compile(r"^(\w+)\s*\(\s*(\*|\w+)\s*\)$")
+
+"""
+Агрегатная функция над столбцом: count(*), count(col), sum(col),
+min(col), max(col), avg(col). column = "*" только для count
+"""
+class Aggregate:
+    def __init__(self, func: str, column: str):
+        self.func = func
+        self.column = column
+
+    def __str__(self) -> str:
+        return f"{self.func}({self.column})"
+
+
+"""
+Разбор списка агрегатов вида 'count(*), sum(age)'
+"""
+@metrics.timed("parse")
+def parse_aggregates(text: str) -> List[Aggregate]:
+    aggregates = []
+    for item in text.split(","):
+        item = item.strip()
+        match = _AGGREGATE_RE.match(item)
+        if match is None:
+            raise ValueError(f"Некорректный агрегат: {item or '(пусто)'}. \
+                             Ожидается функция(столбец), например count(*)")
+        func, column = match.group(1).lower(), match.group(2)
+        if func not in AGGREGATE_FUNCTIONS:
+            raise ValueError(f"Неизвестная функция: {func}. \
+                             Поддерживаются: {', '.join(AGGREGATE_FUNCTIONS)}")
+        if column == "*" and func != "count":
+            raise ValueError(f"{func}(*) не поддерживается, укажите столбец.")
+        aggregates.append(Aggregate(func, column))
+    return aggregates
+
+"""
+Накопитель одной агрегатной функции: значения добавляются по одному,
+хранятся только текущие количество, сумма, минимум и максимум
+"""
+class Accumulator:
+    __slots__ = ("func", "count", "total", "low", "high")
+
+    def __init__(self, func: str):
+        self.func = func
+        self.count = 0
+        self.total = 0
+        self.low: Any = None
+        self.high: Any = None
+
+    def add(self, value: Any) -> None:
+        if value is None:
+            return
+        self.count += 1
+        if self.func in NUMERIC_FUNCTIONS:
+            self.total += value
+        elif self.func == "min":
+            if self.low is None or value < self.low:
+                self.low = value
+        elif self.func == "max":
+            if self.high is None or value > self.high:
+                self.high = value
+
+    def result(self) -> Any:
+        if self.func == "count":
+            return self.count
+        if self.func == "sum":
+            return self.total if self.count else None
+        if self.func == "avg":
+            return self.total / self.count if self.count else None
+        return self.low if self.func == "min" else self.high
+
+
+"""
+Один проход по записям-кортежам (ключ группы, значение1, значение2, ...)
+с накопителями для каждой группы. Для count(*) значение - любое не None.
+Возвращает словарь ключ группы -> результаты агрегатов
+"""
+def accumulate(records: Iterable[Tuple[Any, ...]],
+               aggregates: List[Aggregate]) -> Dict[Any, List[Any]]:
+    groups: Dict[Any, List[Accumulator]] = {}
+    for key, *values in records:
+        accumulators = groups.get(key)
+        if accumulators is None:
+            accumulators = [Accumulator(agg.func) for agg in aggregates]
+            groups[key] = accumulators
+        for accumulator, value in zip(accumulators, values):
+            accumulator.add(value)
+    return {
+        key: [accumulator.result() for accumulator in accumulators]
+        for key, accumulators in groups.items()
+    }
+
+"""
+Агрегат по уже отобранным значениям столбца: встроенные sum/min/max
+проходят по значениям на уровне C, без накопителей.
+count - число отобранных значений, nullable - среди них может быть None
+"""
+def aggregate_values(func: str, values: Iterable[Any], count: int,
+                     nullable: bool) -> Any:
+    if nullable:
+        values = (value for value in values if value is not None)
+    if func == "min":
+        return min(values, default=None)
+    if func == "max":
+        return max(values, default=None)
+    if nullable:
+        accumulator = Accumulator(func)
+        for value in values:
+            accumulator.add(value)
+        return accumulator.result()
+
+    if func == "count":
+        return count
+    if not count:
+        return None
+    total = sum(values)
+    return total if func == "sum" else total / count
+
+"""
+Позиции отобранных значений для каждого значения ключа группировки.
+keys - значения ключа по всем позициям, selection - отметки отобранных
+"""
+def group_positions(keys: Iterable[Any],
+                    selection: Iterable[Any]) -> Dict[Any, List[int]]:
+    groups: Dict[Any, List[int]] = {}
+    positions = compress(count(), selection)
+    for pos, key in zip(positions, compress(keys, selection)):
+        bucket = groups.get(key)
+        if bucket is None:
+            bucket = groups[key] = []
+        bucket.append(pos)
+    return groups
+
+"""
+Порядок вывода групп: по значению ключа, пустой ключ первым
+"""
+def group_order(key: Optional[Any]) -> Tuple[bool, Any]:
+    return (key is not None, key)
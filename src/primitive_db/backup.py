@@ -0,0 +1,391 @@
+"""
+Резервные копии базы (команды backup и restore). Копия - один архив tar,
+сжатый gzip: каталог db_meta.json, файлы таблиц data/<файл> (снапшот,
+журнал и индексы - после восстановления индексы перестраиваются при первом
+чтении таблицы; статистика не копируется и строится заново)
+и последним manifest.json - размер и SHA-256 каждого файла по таблицам.
+Файлы пишутся в архив и читаются из него потоком по частям, таблицы
+в память не загружаются.
+Копия --incremental содержит только таблицы, файлы которых изменились
+после прошлой копии (их подписи хранятся в BACKUP_STATE_FILE); остальные
+таблицы в manifest ссылаются на архив, в котором лежат их файлы.
+Восстановление сначала распаковывает и проверяет все файлы во временный
+каталог data/.restore-<pid>, затем переносит их на место по отметке
+RESTORE_FILE: если перенос прервется, он доводится при следующем запуске
+(finish_restore)
+"""
+import glob
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import tarfile
+import time
+from typing import IO, Any, Dict, Iterator, List, Optional, Tuple
+
+from src.primitive_db import metrics
+from src.primitive_db.constants import (
+    BACKUP_COMPRESSLEVEL,
+    BACKUP_STATE_FILE,
+    DATA_DIR,
+    RESTORE_FILE,
+    RESTORE_STAGING_PREFIX,
+)
+from src.primitive_db.indexes import index_path
+from src.primitive_db.storage import (
+    atomic_write,
+    file_signature,
+    fsync_dir,
+    get_durability,
+    get_storage,
+    table_path,
+    validate_table_name,
+)
+
+# Версия формата архива
+BACKUP_FORMAT = 1
+META_MEMBER = "db_meta.json"
+MANIFEST_MEMBER = "manifest.json"
+DATA_PREFIX = "data/"
+# Файлы таблицы в архиве и все ее файлы, которые заменяет восстановление
+COPIED_EXTENSIONS = ("json", "bin", "log", "idx.json")
+TABLE_EXTENSIONS = ("json", "bin", "log", "idx.json", "stats.json")
+_CHUNK_SIZE = 1024 * 1024
+
+# Размер и SHA-256 файла: {"size": n, "sha256": "..."}
+FileInfo = Dict[str, Any]
+
+"""
+Чтение файла с подсчетом размера и SHA-256 прочитанного
+(tarfile копирует файл в архив через read частями)
+"""
+class _HashingReader:
+    def __init__(self, f: IO[bytes]):
+        self.f = f
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.f.read(size)
+        self.sha256.update(data)
+        self.size += len(data)
+        return data
+
+    def info(self) -> FileInfo:
+        return {"size": self.size, "sha256": self.sha256.hexdigest()}
+
+
+"""
+Подписи таблиц и архивы с их файлами после последней копии
+(None - копий еще не было или файл поврежден)
+"""
+def load_state() -> Optional[Dict[str, Any]]:
+    try:
+        with open(BACKUP_STATE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+"""
+Добавление в архив файла name с содержимым data (каталог, manifest)
+"""
+def _add_bytes(tar: tarfile.TarFile, name: str, data: bytes) -> FileInfo:
+    member = tarfile.TarInfo(name)
+    member.size, member.mtime, member.mode = len(data), int(time.time()), 0o644
+    reader = _HashingReader(io.BytesIO(data))
+    tar.addfile(member, reader)
+    return reader.info()
+
+"""
+Добавление в архив файла таблицы (data/<файл>) с чтением по частям
+"""
+def _add_file(tar: tarfile.TarFile, path: str) -> FileInfo:
+    with open(path, 'rb') as f:
+        st = os.fstat(f.fileno())
+        member = tarfile.TarInfo(DATA_PREFIX + os.path.basename(path))
+        member.size, member.mtime, member.mode = st.st_size, int(st.st_mtime), 0o644
+        reader = _HashingReader(f)
+        tar.addfile(member, reader)
+    metrics.add("bytes_read", reader.size)
+    return reader.info()
+
+"""
+Запись копии базы в архив path: каталог metadata и файлы всех его таблиц.
+Вызывается под блокировками метаданных и всех таблиц - файлы не меняются
+во время копирования. incremental=True - таблицы, не изменившиеся после
+прошлой копии, не копируются, а ссылаются на ее архив.
+Возвращает manifest записанной копии
+"""
+def write_backup(path: str, metadata: Dict[str, Any],
+                 incremental: bool = False) -> Dict[str, Any]:
+    storage = get_storage()
+    archive = os.path.abspath(path)
+    state = load_state() if incremental else None
+    previous = {} if state is None else state["tables"]
+    manifest: Dict[str, Any] = {
+        "format": BACKUP_FORMAT,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "incremental": state is not None,
+        "tables": {},
+    }
+    tables_state = {}
+    with atomic_write(path, binary=True) as f:
+        with gzip.GzipFile(fileobj=f, mode="wb", compresslevel=BACKUP_COMPRESSLEVEL,
+                           mtime=0) as gz, tarfile.open(fileobj=gz, mode="w|") as tar:
+            catalog = json.dumps(metadata, ensure_ascii=False, indent=4)
+            manifest["metadata"] = _add_bytes(tar, META_MEMBER, catalog.encode("utf-8"))
+            for table_name in sorted(metadata):
+                paths = [*storage.paths(table_name), index_path(table_name)]
+                signature = [list(part) for part in file_signature(paths)]
+                entry = previous.get(table_name)
+                # Архив, на который ссылается таблица, не перезаписывается
+                if (entry is not None and entry["signature"] == signature
+                        and entry["archive"] != archive
+                        and os.path.exists(entry["archive"])):
+                    source, files = entry["archive"], entry["files"]
+                else:
+                    source = archive
+                    files = {os.path.basename(p): _add_file(tar, p)
+                             for p in paths if os.path.exists(p)}
+                manifest["tables"][table_name] = {
+                    "archive": None if source == archive else source,
+                    "files": files,
+                }
+                tables_state[table_name] = {"signature": signature,
+                                            "archive": source, "files": files}
+            text = json.dumps(manifest, ensure_ascii=False, indent=2)
+            _add_bytes(tar, MANIFEST_MEMBER, text.encode("utf-8"))
+    with atomic_write(BACKUP_STATE_FILE) as f:
+        json.dump({"archive": archive, "tables": tables_state}, f, ensure_ascii=False)
+    return manifest
+
+"""
+Имя файла таблицы в архиве (data/<файл>) без каталогов и скрытых файлов
+"""
+def _is_table_member(name: str) -> bool:
+    rest = name[len(DATA_PREFIX):]
+    return (name.startswith(DATA_PREFIX) and rest == os.path.basename(rest)
+            and not rest.startswith("."))
+
+"""
+Потоковый перебор файлов архива: пары (имя, файл для чтения части архива)
+"""
+def _members(path: str) -> Iterator[Tuple[str, IO[bytes]]]:
+    with gzip.open(path, 'rb') as gz, tarfile.open(fileobj=gz, mode="r|") as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+            if (member.name not in (META_MEMBER, MANIFEST_MEMBER)
+                    and not _is_table_member(member.name)):
+                raise ValueError(f"Неизвестный файл в архиве {path}: {member.name}")
+            yield member.name, tar.extractfile(member)
+
+"""
+Распаковка файла архива в target по частям (с fsync, если уровень
+надежности не off). Возвращает размер и SHA-256
+"""
+def _extract(source: IO[bytes], target: str) -> FileInfo:
+    reader = _HashingReader(source)
+    with open(target, 'wb') as f:
+        while True:
+            chunk = reader.read(_CHUNK_SIZE)
+            if not chunk:
+                break
+            f.write(chunk)
+        if get_durability() != "off":
+            f.flush()
+            os.fsync(f.fileno())
+    metrics.add("bytes_written", reader.size)
+    return reader.info()
+
+"""
+Сверка размера и контрольной суммы распакованного файла с manifest
+"""
+def _verify(found: Dict[str, FileInfo], name: str, expected: FileInfo) -> None:
+    if name not in found:
+        raise ValueError(f"В копии нет файла {name}.")
+    if found[name] != expected:
+        raise ValueError(f"Контрольная сумма файла {name} не совпадает: \
+                         копия повреждена.")
+
+"""
+Архив с файлами таблиц инкрементной копии: по сохраненному пути,
+иначе - рядом с архивом копии (архивы перенесены вместе)
+"""
+def _locate(source: str, path: str) -> str:
+    if os.path.exists(source):
+        return source
+    nearby = os.path.join(os.path.dirname(os.path.abspath(path)),
+                          os.path.basename(source))
+    if os.path.exists(nearby):
+        return nearby
+    raise ValueError(f"Не найден архив {source} с таблицами инкрементной копии.")
+
+"""
+Каталог таблиц копии (db_meta.json из архива) с проверкой имен таблиц:
+имена становятся путями к файлам в DATA_DIR
+"""
+def _load_catalog(path: str) -> Dict[str, Any]:
+    with open(path, 'r', encoding='utf-8') as f:
+        catalog = json.load(f)
+    if not isinstance(catalog, dict):
+        raise ValueError("Каталог таблиц копии поврежден.")
+    for table_name in catalog:
+        validate_table_name(table_name)
+    return catalog
+
+"""
+Проверка файла таблицы из копии до распаковки: файл <таблица>.<расширение>
+таблицы из каталога копии (и, если задана, таблицы table_name)
+"""
+def _check_table_file(catalog: Optional[Dict[str, Any]], name: str,
+                      table_name: Optional[str] = None) -> None:
+    if catalog is None:
+        raise ValueError(f"Файл {name} в копии раньше каталога таблиц.")
+    tables = catalog if table_name is None else [table_name]
+    if not any(name == f"{table}.{ext}" and table in catalog
+               for table in tables for ext in COPIED_EXTENSIONS):
+        raise ValueError(f"Файл {name} не относится к таблицам копии.")
+
+"""
+Распаковка копии path во временный каталог с проверкой размеров
+и контрольных сумм всех файлов (включая таблицы из архивов, на которые
+ссылается инкрементная копия). Имена таблиц и файлов проверяются
+по каталогу копии до распаковки. Возвращает каталог, manifest и каталог
+таблиц копии. Файлы базы не изменяются
+"""
+def read_backup(path: str) -> Tuple[str, Dict[str, Any], Dict[str, Any]]:
+    if not os.path.isfile(path):
+        raise ValueError(f"Файл копии не найден: {path}")
+    staging = os.path.join(DATA_DIR, f"{RESTORE_STAGING_PREFIX}{os.getpid()}")
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    try:
+        manifest = None
+        catalog: Optional[Dict[str, Any]] = None
+        found: Dict[str, FileInfo] = {}
+        for name, source in _members(path):
+            if name == MANIFEST_MEMBER:
+                manifest = json.load(source)
+                continue
+            if name != META_MEMBER:
+                _check_table_file(catalog, name[len(DATA_PREFIX):])
+            target = os.path.join(staging, os.path.basename(name))
+            found[name] = _extract(source, target)
+            if name == META_MEMBER:
+                catalog = _load_catalog(target)
+        if (catalog is None or manifest is None
+                or manifest.get("format") != BACKUP_FORMAT):
+            raise ValueError(f"{path} - не копия базы, копия другой версии \
+                             или архив поврежден.")
+        _verify(found, META_MEMBER, manifest["metadata"])
+        if set(catalog) != set(manifest["tables"]):
+            raise ValueError("Таблицы каталога копии не совпадают с manifest.")
+
+        external: Dict[str, Dict[str, FileInfo]] = {}
+        for table_name, entry in manifest["tables"].items():
+            for name in entry["files"]:
+                _check_table_file(catalog, name, table_name)
+            files = {DATA_PREFIX + name: info for name, info in entry["files"].items()}
+            if entry["archive"] is None:
+                for name, info in files.items():
+                    _verify(found, name, info)
+            else:
+                external.setdefault(entry["archive"], {}).update(files)
+        for source_path, files in external.items():
+            for name, source in _members(_locate(source_path, path)):
+                if name in files:
+                    target = os.path.join(staging, os.path.basename(name))
+                    found[name] = _extract(source, target)
+            for name, info in files.items():
+                _verify(found, name, info)
+
+        return staging, manifest, catalog
+    except (tarfile.TarError, EOFError, gzip.BadGzipFile, UnicodeDecodeError) as e:
+        discard_staging(staging)
+        raise ValueError(f"Архив копии поврежден: {e}")
+    except BaseException:
+        discard_staging(staging)
+        raise
+
+"""
+Удаление временного каталога распакованной копии
+"""
+def discard_staging(staging: str) -> None:
+    shutil.rmtree(staging, ignore_errors=True)
+
+"""
+Удаление распакованной копии, если перенос ее файлов не начат
+(иначе каталог нужен, чтобы довести перенос при запуске)
+"""
+def abandon_restore(staging: str) -> None:
+    if not os.path.exists(RESTORE_FILE):
+        discard_staging(staging)
+
+"""
+Перенос распакованной и проверенной копии на место файлов базы.
+Сначала записывается отметка RESTORE_FILE с планом переноса: таблицы
+копии с их файлами и таблицы базы, которых в копии нет (удаляются).
+Вызывается под исключительными блокировками метаданных и всех таблиц
+"""
+def install_restore(staging: str, manifest: Dict[str, Any], db_file: str,
+                    current_tables: List[str]) -> None:
+    plan = {
+        "staging": staging,
+        "db_file": db_file,
+        "tables": {name: sorted(entry["files"])
+                   for name, entry in manifest["tables"].items()},
+        "drop": sorted(set(current_tables) - set(manifest["tables"])),
+    }
+    with atomic_write(RESTORE_FILE) as f:
+        json.dump(plan, f, ensure_ascii=False)
+    _apply_restore(plan)
+
+"""
+Выполнение плана переноса. Повторное выполнение безопасно: уже
+перенесенный файл отсутствует во временном каталоге и не удаляется
+"""
+def _apply_restore(plan: Dict[str, Any]) -> None:
+    staging = plan["staging"]
+    os.makedirs(DATA_DIR, exist_ok=True)
+    for table_name in [*plan["drop"], *plan["tables"]]:
+        keep = plan["tables"].get(table_name, [])
+        for ext in TABLE_EXTENSIONS:
+            name = f"{table_name}.{ext}"
+            staged = os.path.join(staging, name)
+            if name not in keep:
+                try:
+                    os.remove(table_path(table_name, ext))
+                except FileNotFoundError:
+                    pass
+            elif os.path.exists(staged):
+                os.replace(staged, table_path(table_name, ext))
+    staged_meta = os.path.join(staging, META_MEMBER)
+    if os.path.exists(staged_meta):
+        os.replace(staged_meta, plan["db_file"])
+    if get_durability() == "full":
+        fsync_dir(DATA_DIR)
+        fsync_dir(os.path.dirname(plan["db_file"]))
+    os.remove(RESTORE_FILE)
+    discard_staging(staging)
+
+"""
+Завершение прерванного восстановления (при запуске, под исключительной
+блокировкой базы) и удаление временных каталогов прерванных распаковок.
+Возвращает число таблиц восстановленной копии или None, если
+восстановление не прерывалось
+"""
+def finish_restore() -> Optional[int]:
+    try:
+        with open(RESTORE_FILE, 'r', encoding='utf-8') as f:
+            plan = json.load(f)
+    except FileNotFoundError:
+        plan = None
+    if plan is not None:
+        _apply_restore(plan)
+    pattern = os.path.join(glob.escape(DATA_DIR), RESTORE_STAGING_PREFIX + "*")
+    for staging in glob.glob(pattern):
+        discard_staging(staging)
+    return None if plan is None else len(plan["tables"])
@@ -0,0 +1,532 @@
+import json
+import lzma
+import mmap
+import struct
+import sys
+import threading
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from operator import itemgetter
+from typing import Any, BinaryIO, Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.primitive_db import metrics
+from src.primitive_db.columnar import (
+    MISSING,
+    BoolColumn,
+    Column,
+    ColumnarTable,
+    IntColumn,
+    StrColumn,
+    column_from,
+)
+from src.primitive_db.constants import BINARY_BLOCK_ROWS
+from src.primitive_db.schema import alter_row
+
+Row = Dict[str, Any]
+
+"""
+Двоичный формат файла таблицы (data/<таблица>.bin):
+
+    MAGIC, длина заголовка (u32), заголовок - JSON {"columns": [...],
+    "compression": ...} (после изменений схемы - и "version", версия
+    схемы файла): схема хранится один раз, а не в каждой записи;
+    блоки по BINARY_BLOCK_ROWS записей, упорядоченных по ID, каждый
+    сжат отдельно (zlib, lzma или без сжатия);
+    индекс блоков - JSON {"rows": n, "blocks": [[смещение, размер,
+    первый ID, последний ID, записей], ...]};
+    смещение индекса (u64), его длина (u32) и END_MAGIC.
+
+Внутри блока значения хранятся по столбцам: int - массив int64,
+bool - байт на значение, str - длины строк и общий текст UTF-8,
+а если различных строк в блоке не больше половины - словарь различных
+строк и номера значений в нем.
+Столбец, значения которого не совпадают с типом схемы (пропуски, числа
+вне int64), записывается как JSON. Файл без END_MAGIC в конце
+считается оборванным
+"""
+MAGIC = b"PDBT\x01"
+END_MAGIC = b"PDBT"
+_LENGTH = struct.Struct("<I")
+_STRINGS = struct.Struct("<II")
+_INT = struct.Struct("<q")
+_CODE = struct.Struct("<I")
+_TRAILER = struct.Struct("<QI4s")
+
+COMPRESSORS: Dict[str, Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {
+    "none": (bytes, bytes),
+    "zlib": (zlib.compress, zlib.decompress),
+    "lzma": (lzma.compress, lzma.decompress),
+}
+
+"""
+Массив в порядке байт little-endian (порядок файла) и обратно
+"""
+def _to_le(data: array) -> bytes:
+    if sys.byteorder == "big":
+        data = array(data.typecode, data)
+        data.byteswap()
+    return data.tobytes()
+
+def _from_le(typecode: str, data: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+"""
+Кодирование значений одного столбца блока: вид (байт) + данные
+"""
+def _encode_column(values: List[Any], typ: str) -> bytes:
+    kinds = set(map(type, values))
+    if typ == "int" and kinds == {int}:
+        try:
+            return b"i" + _to_le(array('q', values))
+        except OverflowError:
+            pass
+    elif typ == "bool" and kinds == {bool}:
+        return b"b" + bytes(values)
+    elif typ == "str" and kinds == {str}:
+        distinct = list(dict.fromkeys(values))
+        if len(distinct) * 2 <= len(values):
+            codes = dict(zip(distinct, range(len(distinct))))
+            return (b"d" + _encode_strings(distinct)
+                    + _to_le(array('I', map(codes.__getitem__, values))))
+        return b"s" + _encode_strings(values)
+    missing = [pos for pos, value in enumerate(values) if value is MISSING]
+    plain = [None if value is MISSING else value for value in values]
+    return b"j" + json.dumps([plain, missing], ensure_ascii=False).encode("utf-8")
+
+"""
+Строки: число строк, размер текста в байтах, длины строк (в символах)
+и общий текст UTF-8
+"""
+def _encode_strings(values: List[str]) -> bytes:
+    text = "".join(values).encode("utf-8")
+    lengths = array('I', map(len, values))
+    return _STRINGS.pack(len(values), len(text)) + _to_le(lengths) + text
+
+"""
+Разбор строк (см. _encode_strings) из начала data. Строки интернируются,
+как в StrColumn. Возвращает строки и размер разобранной части в байтах
+"""
+def _decode_strings(data: bytes) -> Tuple[List[str], int]:
+    count, size = _STRINGS.unpack_from(data)
+    start = _STRINGS.size + 4 * count
+    offsets = list(accumulate(_from_le('I', data[_STRINGS.size:start]), initial=0))
+    text = str(data[start:start + size], "utf-8")
+    values = list(map(sys.intern, map(text.__getitem__,
+                                      map(slice, offsets, offsets[1:]))))
+    return values, start + size
+
+"""
+Значения столбца блока: массив или список (пропуски - MISSING)
+"""
+def _decode_column(data: bytes) -> Tuple[str, Any]:
+    kind, body = chr(data[0]), data[1:]
+    if kind == "i":
+        return kind, _from_le('q', body)
+    if kind == "b":
+        return kind, list(map(bool, body))
+    if kind == "s":
+        return kind, _decode_strings(body)[0]
+    if kind == "d":
+        distinct, end = _decode_strings(body)
+        return kind, list(map(distinct.__getitem__, _from_le('I', body[end:])))
+    plain, missing = json.loads(bytes(body))
+    for pos in missing:
+        plain[pos] = MISSING
+    return kind, plain
+
+def _encode_block(rows: List[Row], columns: List[str]) -> bytes:
+    parts = [_LENGTH.pack(len(rows))]
+    for spec in columns:
+        name, typ = spec.split(":", 1)
+        encoded = _encode_column([row.get(name, MISSING) for row in rows], typ)
+        parts.append(_LENGTH.pack(len(encoded)))
+        parts.append(encoded)
+    return b"".join(parts)
+
+"""
+Границы данных столбцов в разобранном блоке: пары (начало, конец)
+"""
+def _column_spans(data: bytes, count: int) -> List[Tuple[int, int]]:
+    pos = _LENGTH.size
+    spans = []
+    for _ in range(count):
+        size = _LENGTH.unpack_from(data, pos)[0]
+        pos += _LENGTH.size
+        spans.append((pos, pos + size))
+        pos += size
+    return spans
+
+"""
+Одно значение столбца блока (позиция pos) без разбора остальных значений,
+кроме строк: текст столбца декодируется целиком, но строки не создаются
+"""
+def _decode_value(data: bytes, pos: int) -> Any:
+    kind, body = chr(data[0]), data[1:]
+    if kind == "i":
+        return _INT.unpack_from(body, _INT.size * pos)[0]
+    if kind == "b":
+        return bool(body[pos])
+    if kind == "j":
+        plain, missing = json.loads(bytes(body))
+        return MISSING if pos in missing else plain[pos]
+    count, size = _STRINGS.unpack_from(body)
+    start = _STRINGS.size + 4 * count
+    lengths = _from_le('I', body[_STRINGS.size:start])
+    if kind == "d":
+        # Номер строки в словаре блока
+        pos = _CODE.unpack_from(body, start + size + 4 * pos)[0]
+    text = str(body[start:start + size], "utf-8")
+    offset = sum(lengths[:pos])
+    return sys.intern(text[offset:offset + lengths[pos]])
+
+"""
+Запись таблицы в двоичном формате (version - версия схемы columns).
+Записи упорядочиваются по ID
+"""
+def write_table(f: BinaryIO, rows: Iterable[Row], columns: List[str],
+                compression: str = "none",
+                block_rows: int = BINARY_BLOCK_ROWS, version: int = 1) -> None:
+    if compression not in COMPRESSORS:
+        raise ValueError(f"Неизвестное сжатие: {compression}. \
+                         Доступные: {', '.join(COMPRESSORS)}")
+    compress = COMPRESSORS[compression][0]
+    header = {"columns": columns, "compression": compression}
+    if version > 1:
+        header["version"] = version
+    header = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    f.write(MAGIC + _LENGTH.pack(len(header)) + header)
+    offset = len(MAGIC) + _LENGTH.size + len(header)
+
+    rows = sorted(rows, key=itemgetter("ID"))
+    blocks = []
+    for start in range(0, len(rows), block_rows):
+        chunk = rows[start:start + block_rows]
+        data = compress(_encode_block(chunk, columns))
+        f.write(data)
+        blocks.append([offset, len(data), chunk[0]["ID"], chunk[-1]["ID"],
+                       len(chunk)])
+        offset += len(data)
+    index = json.dumps({"rows": len(rows), "blocks": blocks}).encode("utf-8")
+    f.write(index)
+    f.write(_TRAILER.pack(offset, len(index), END_MAGIC))
+
+"""
+Заголовок файла: схема (columns), сжатие (compression)
+и версия схемы (version, если схема менялась)
+"""
+def read_header(path: str) -> Dict[str, Any]:
+    with open(path, 'rb') as f:
+        size = _header_size(f.read(len(MAGIC) + _LENGTH.size), path)
+        return json.loads(f.read(size))
+
+def _header_size(start: bytes, path: str) -> int:
+    if start[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"Файл {path} не является файлом таблицы.")
+    return _LENGTH.unpack_from(start, len(MAGIC))[0]
+
+"""
+Чтение таблицы. Файл отображается в память, значения разбираются
+по мере обращения к ним (см. MappedTable)
+"""
+def read_table(path: str) -> ColumnarTable:
+    return MappedTable(path)
+
+
+"""
+Столбец, который еще не разобран из файла: source - его имя в схеме файла
+(после переименования столбца оно отличается от имени в таблице)
+"""
+class _Pending:
+    def __init__(self, source: str):
+        self.source = source
+
+
+"""
+Столбцы таблицы из файла: каждый разбирается из блоков при первом обращении
+"""
+class _LazyColumns(dict):
+    def __init__(self, names: List[str], load: Callable[[str], Column]):
+        super().__init__((name, _Pending(name)) for name in names)
+        self._load = load
+
+    def __getitem__(self, name: str) -> Column:
+        column = dict.__getitem__(self, name)
+        if isinstance(column, _Pending):
+            column = self._load(column.source)
+            dict.__setitem__(self, name, column)
+        return column
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return self[name] if name in self else default
+
+    def values(self) -> List[Column]:
+        return [self[name] for name in self]
+
+    def items(self) -> List[Tuple[str, Column]]:
+        return [(name, self[name]) for name in self]
+
+    """
+    Уже разобранные столбцы (для оценки памяти)
+    """
+    def loaded(self) -> List[Column]:
+        return [c for c in dict.values(self) if not isinstance(c, _Pending)]
+
+
+"""
+Таблица из двоичного файла, отображенного в память (mmap).
+При открытии разбираются только заголовок и индекс блоков (первый
+и последний ID, число записей и смещение каждого блока), поэтому:
+- число записей берется из индекса;
+- запись по ID находится двоичным поиском по индексу блоков, из блока
+  разбираются столбец ID и значения одной этой записи;
+- изменения (операции журнала, insert, update, delete) до разбора таблицы
+  хранятся поверх файла, изменения схемы применяются к записям из файла
+  при чтении.
+Остальные обращения (перебор, условия по столбцам) разбирают таблицу:
+сразу - столбец ID, остальные столбцы - при первом обращении к каждому,
+поэтому условие или агрегат разбирают только свои столбцы.
+После разбора таблица работает как обычная ColumnarTable
+"""
+class MappedTable(ColumnarTable):
+    # Атрибуты ColumnarTable, которые появляются при разборе таблицы
+    _DECODED = ("ids", "alive", "columns", "_live", "_positions")
+    # Сколько разобранных (распакованных) блоков держать для поиска по ID
+    _BLOCK_CACHE = 4
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        start = len(MAGIC) + _LENGTH.size
+        header = json.loads(self._map[start:start + _header_size(self._map, path)])
+        self._schema: List[str] = header["columns"]
+        self._compression = header["compression"]
+        # Версия схемы файла и изменения схемы, сделанные до разбора таблицы
+        self.version: int = header.get("version", 1)
+        self._changes: List[Dict[str, Any]] = []
+        index = _parse_index(self._map, path)
+        self._blocks_index: List[List[int]] = index["blocks"]
+        self._first_ids = [block[2] for block in self._blocks_index]
+        self._count: int = index["rows"]
+        self._overlay: Dict[int, Optional[Row]] = {}
+        self._cached: Dict[int, Any] = {}
+        self._decoded = False
+        self._lock = threading.RLock()
+
+    def __getattr__(self, name: str) -> Any:
+        if name not in MappedTable._DECODED:
+            raise AttributeError(name)
+        self._decode()
+        return self.__dict__[name]
+
+    def __len__(self) -> int:
+        if self._decoded:
+            return super().__len__()
+        return self._count
+
+    def __contains__(self, row_id: int) -> bool:
+        return self.get(row_id) is not None
+
+    def __getitem__(self, row_id: int) -> Row:
+        row = self.get(row_id)
+        if row is None:
+            raise KeyError(row_id)
+        return row
+
+    def __setitem__(self, row_id: int, row: Row) -> None:
+        if self._decoded:
+            super().__setitem__(row_id, row)
+            return
+        if self.get(row_id) is None:
+            self._count += 1
+        self._overlay[row_id] = dict(row)
+
+    def get(self, row_id: int, default: Any = None) -> Any:
+        if self._decoded:
+            return super().get(row_id, default)
+        if row_id in self._overlay:
+            row = self._overlay[row_id]
+            return default if row is None else dict(row)
+        row = self._base_row(row_id)
+        return default if row is None else row
+
+    def pop(self, row_id: int, default: Any = None) -> Any:
+        if self._decoded:
+            return super().pop(row_id, default)
+        row = self.get(row_id)
+        if row is None:
+            return default
+        self._overlay[row_id] = None
+        self._count -= 1
+        return row
+
+    """
+    Изменение схемы до разбора таблицы запоминается и применяется к записям
+    из файла при чтении; записи поверх файла приводятся к новой схеме сразу
+    """
+    def alter(self, change: Dict[str, Any]) -> None:
+        with self._lock:
+            if self._decoded:
+                super().alter(change)
+                return
+            self._changes.append(change)
+            self._overlay = {
+                row_id: None if row is None else alter_row(row, change)
+                for row_id, row in self._overlay.items()
+            }
+
+    def nbytes(self) -> int:
+        if not self._decoded:
+            cached = sum(len(block) for block in self._cached.values())
+            return cached + sys.getsizeof(self._overlay) + 256 * len(self._overlay)
+        columns = self.columns
+        loaded = (columns.loaded() if isinstance(columns, _LazyColumns)
+                  else columns.values())
+        total = sys.getsizeof(self.ids) + sys.getsizeof(self.alive)
+        total += sum(column.nbytes() for column in loaded)
+        if self._positions is not None:
+            total += sys.getsizeof(self._positions) + 32 * len(self._positions)
+        return total
+
+    """
+    Распакованный блок. Без сжатия - участок отображения без копирования
+    """
+    def _block(self, number: int) -> Any:
+        with self._lock:
+            data = self._cached.get(number)
+            if data is None:
+                offset, size = self._blocks_index[number][:2]
+                metrics.add("bytes_read", size)
+                if self._compression == "none":
+                    data = memoryview(self._map)[offset:offset + size]
+                else:
+                    decompress = COMPRESSORS[self._compression][1]
+                    data = decompress(self._map[offset:offset + size])
+                    self._cached[number] = data
+                    if len(self._cached) > self._BLOCK_CACHE:
+                        del self._cached[next(iter(self._cached))]
+            return data
+
+    """
+    Запись из файла по ID: блок ищется по индексу, из него разбираются
+    столбец ID и значения найденной позиции
+    """
+    def _base_row(self, row_id: int) -> Optional[Row]:
+        number = bisect_right(self._first_ids, row_id) - 1
+        if number < 0 or row_id > self._blocks_index[number][3]:
+            return None
+        block = self._block(number)
+        spans = _column_spans(block, len(self._schema))
+        start, end = spans[0]
+        if block[start] == ord("i") and sys.byteorder == "little":
+            # Поиск прямо по байтам блока, без копирования столбца
+            ids = memoryview(block)[start + 1:end].cast('q')
+        else:
+            ids = _decode_column(block[start:end])[1]
+        pos = bisect_left(ids, row_id)
+        if pos == len(ids) or ids[pos] != row_id:
+            return None
+        row = {"ID": row_id}
+        for spec, (start, end) in zip(self._schema[1:], spans[1:]):
+            value = _decode_value(block[start:end], pos)
+            if value is not MISSING:
+                row[spec.split(":", 1)[0]] = value
+        for change in self._changes:
+            row = alter_row(row, change)
+        return row
+
+    """
+    Значения столбца (номер в схеме) по всем блокам
+    """
+    def _column_parts(self, number: int) -> List[Tuple[str, Any]]:
+        parts = []
+        for block_number in range(len(self._blocks_index)):
+            block = self._block(block_number)
+            start, end = _column_spans(block, len(self._schema))[number]
+            parts.append(_decode_column(block[start:end]))
+        return parts
+
+    def _load_column(self, name: str) -> Column:
+        names = [spec.split(":", 1)[0] for spec in self._schema]
+        return _merge_column(self._column_parts(names.index(name)))
+
+    """
+    Разбор таблицы: столбец ID, остальные столбцы - по обращению.
+    Изменения схемы и записей, сделанные до разбора, применяются
+    к разобранной таблице
+    """
+    def _decode(self) -> None:
+        with self._lock:
+            if self._decoded:
+                return
+            ids = array('q')
+            for _, values in self._column_parts(0):
+                ids.extend(values)
+            names = [spec.split(":", 1)[0] for spec in self._schema[1:]]
+            self.__dict__.update(
+                ids=ids,
+                alive=bytearray(b"\x01") * len(ids),
+                _live=len(ids),
+                _positions=None,
+                # В пустую таблицу столбцы добавляются по первой записи
+                columns=_LazyColumns(names, self._load_column) if ids else {},
+            )
+            overlay, self._overlay = self._overlay, {}
+            self._decoded = True
+            for change in self._changes:
+                super().alter(change)
+            self._changes = []
+            for row_id, row in overlay.items():
+                if row is None:
+                    super().pop(row_id)
+                else:
+                    super().__setitem__(row_id, row)
+
+"""
+Столбец таблицы из значений по блокам: если во всех блоках
+значения одного типа - столбец этого типа, иначе общий
+"""
+def _merge_column(parts: List[Tuple[str, Any]]) -> Column:
+    kinds = {kind for kind, _ in parts}
+    if kinds == {"i"}:
+        column = IntColumn()
+        for _, values in parts:
+            column.data.extend(values)
+        return column
+    values = [value for _, block in parts for value in block]
+    if kinds == {"b"}:
+        return BoolColumn.from_values(values)
+    if kinds <= {"s", "d"}:
+        # Строки уже интернированы при разборе блоков
+        column = StrColumn()
+        column.data = values
+        return column
+    return column_from(values)
+
+def _parse_index(data: bytes, path: str) -> Dict[str, Any]:
+    if len(data) < _TRAILER.size:
+        raise ValueError(f"Файл таблицы {path} поврежден (запись оборвана).")
+    offset, size, end = _TRAILER.unpack_from(data, len(data) - _TRAILER.size)
+    if end != END_MAGIC:
+        raise ValueError(f"Файл таблицы {path} поврежден (запись оборвана).")
+    return json.loads(data[offset:offset + size])
+
+"""
+Проверка двоичного файла таблицы на обрыв записи (по началу и концу файла)
+"""
+def is_torn(path: str) -> bool:
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(len(MAGIC))
+            size = f.seek(0, 2)
+            if size < len(MAGIC) + _TRAILER.size:
+                return True
+            f.seek(size - len(END_MAGIC))
+            return head != MAGIC or f.read() != END_MAGIC
+    except FileNotFoundError:
+        return False
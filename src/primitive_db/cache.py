@@ -0,0 +1,530 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from operator import itemgetter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.primitive_db import metrics
+from src.primitive_db.columnar import ColumnarTable
+from src.primitive_db.constants import CACHE_MAX_BYTES
+from src.primitive_db.indexes import (
+    Index,
+    alter_indexes,
+    build_index,
+    drop_indexes,
+    index_path,
+    load_indexes,
+    save_indexes,
+)
+from src.primitive_db.schema import schema_changes, upgrade_row
+from src.primitive_db.stats import TableStats, drop_stats, load_stats, save_stats
+from src.primitive_db.storage import (
+    JsonStorage,
+    Op,
+    Row,
+    Signature,
+    apply_ops,
+    file_signature,
+    get_storage,
+    write_metadata_file,
+)
+from src.primitive_db.transaction import clear_journal, write_journal
+
+"""
+Метод кэша под его блокировкой: в режиме сервера кэшем одновременно
+пользуются несколько потоков
+"""
+def _synchronized(method: Callable) -> Callable:
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class _Entry:
+    def __init__(self, rows: ColumnarTable, signature: Signature,
+                 snapshot: Signature, indexes: Dict[str, Index],
+                 version: int = 1):
+        self.rows = rows
+        self.signature = signature
+        self.snapshot = snapshot
+        self.indexes = indexes
+        self.pending: List[Op] = []
+        self.nbytes = rows.nbytes()
+        # Версия схемы записей в памяти и изменения схемы по версиям
+        self.version = version
+        self.history: Dict[int, Op] = {}
+        # Статистика таблицы (None - не загружена, считается по запросу)
+        self.stats: Optional[TableStats] = None
+
+    """
+    Применение операций к записям, индексам и статистике. Изменение схемы
+    применяется к таблице по столбцам, запись прежней версии схемы
+    приводится к текущей
+    """
+    def apply(self, ops: List[Op]) -> None:
+        rows, stats = self.rows, self.stats
+        self.history.update((op["v"], op) for op in ops if op["op"] == "alter")
+        for op in ops:
+            if op["op"] == "alter":
+                if op["v"] > self.version:
+                    rows.alter(op)
+                    alter_indexes(self.indexes, op)
+                    if stats is not None:
+                        stats.alter(op)
+                    self.version = op["v"]
+                continue
+            indexes = self.indexes.values()
+            row_id = op["ID"] if op["op"] == "delete" else op["row"]["ID"]
+            old = rows.get(row_id)
+            if old is not None:
+                for index in indexes:
+                    index.remove(old)
+                if stats is not None:
+                    stats.remove_row(old)
+            if op["op"] == "delete":
+                rows.pop(row_id, None)
+            else:
+                row = op["row"]
+                if op.get("v", 1) < self.version:
+                    row = upgrade_row(row, self.history, op.get("v", 1),
+                                      self.version)
+                rows[row_id] = row
+                for index in indexes:
+                    index.add(row)
+                if stats is not None:
+                    stats.add_rows([row])
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self.pending)
+
+
+"""
+Кэш таблиц и метаданных на время сессии.
+Таблица читается с диска один раз и дальше обслуживается из памяти
+(в компактном виде по столбцам, см. ColumnarTable; таблица из двоичного
+файла разбирается по мере обращения к ней, см. binary.MappedTable),
+пока ее файлы не изменятся (сравниваются время изменения, размер и inode).
+Если другой процесс только дописал журнал таблицы, читаются лишь новые строки.
+Изменения копятся в памяти и записываются на диск в flush только
+для измененных таблиц. Объем кэша ограничен max_bytes: при превышении
+вытесняются давно не использованные таблицы (LRU).
+"""
+class TableCache:
+    def __init__(self, max_bytes: int = CACHE_MAX_BYTES,
+                 storage: Optional[JsonStorage] = None,
+                 reload_metadata: bool = True):
+        self.max_bytes = max_bytes
+        self.storage = storage or get_storage()
+        # False - метаданные читаются с диска один раз, дальше только из памяти
+        self.reload_metadata = reload_metadata
+        self._tables: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._metadata: Dict[str, Tuple[Signature, Dict[str, Any]]] = {}
+        # Метаданные, измененные в открытой транзакции (None - транзакции нет)
+        self._staged: Optional[Dict[str, Dict[str, Any]]] = None
+        self._lock = threading.RLock()
+
+    def _table_signature(self, table_name: str) -> Signature:
+        return file_signature(self.storage.paths(table_name))
+
+    @_synchronized
+    def _entry(self, table_name: str) -> _Entry:
+        entry = self._tables.get(table_name)
+        if entry is not None and not entry.dirty:
+            signature = self._table_signature(table_name)
+            if entry.signature != signature:
+                # Другой процесс дописал журнал - применяются только новые операции
+                ops = self.storage.ops_since(table_name, entry.signature, signature)
+                if ops is None:
+                    entry = None
+                else:
+                    entry.apply(ops)
+                    entry.signature = signature
+                    entry.nbytes = entry.rows.nbytes()
+        if entry is not None:
+            self._tables.move_to_end(table_name)
+            return entry
+
+        signature = self._table_signature(table_name)
+        snapshot_rows, version, ops = self.storage.load_parts(table_name)
+        snapshot_version = version
+        long_log = len(ops) > len(snapshot_rows) // 8
+        if long_log:
+            # Длинный журнал быстрее применить к записям до построения столбцов,
+            # индексы в этом случае строятся заново
+            rows, version = apply_ops(snapshot_rows, ops, version)
+            rows = ColumnarTable(sorted(rows, key=itemgetter("ID")))
+        elif isinstance(snapshot_rows, ColumnarTable):
+            # Двоичный снапшот читается сразу по столбцам
+            rows = snapshot_rows
+        else:
+            rows = ColumnarTable(snapshot_rows)
+        snapshot = self.storage.snapshot_signature(table_name)
+        saved_snapshot, indexes = load_indexes(table_name)
+        if long_log:
+            # Индексы сохранены по столбцам снапшота
+            for change in schema_changes(ops, snapshot_version):
+                alter_indexes(indexes, change)
+            ops = []
+        if indexes and (long_log or saved_snapshot != snapshot):
+            # Индексы сохранены для другого снапшота - перестраиваются
+            indexes = {
+                column: build_index(column, index.kind, rows.values())
+                for column, index in indexes.items()
+            }
+            if not long_log:
+                save_indexes(table_name, indexes, snapshot)
+        entry = _Entry(rows, signature, snapshot, indexes, version)
+        entry.apply(ops)
+        entry.stats = self._load_stats(table_name, signature)
+        entry.nbytes = rows.nbytes()
+        self._tables[table_name] = entry
+        self._tables.move_to_end(table_name)
+        self._evict()
+        return entry
+
+    def _evict(self) -> None:
+        entries = list(self._tables.items())
+        for _, entry in entries:
+            # Таблица из двоичного файла растет по мере разбора при чтении
+            entry.nbytes = entry.rows.nbytes()
+        total = sum(entry.nbytes for _, entry in entries)
+        for table_name, entry in entries[:-1]:
+            if total <= self.max_bytes:
+                break
+            if entry.dirty:
+                # Изменения транзакции (или команды другого потока)
+                # остаются в памяти до commit или flush
+                continue
+            del self._tables[table_name]
+            total -= entry.nbytes
+
+    """
+    Сохраненная статистика таблицы для подписи ее файлов signature.
+    Если после сохранения журнал только дописывался вставками (массовая
+    загрузка, другой процесс), они учитываются без чтения таблицы.
+    None - статистики нет или ее нужно посчитать заново
+    """
+    def _load_stats(self, table_name: str,
+                    signature: Signature) -> Optional[TableStats]:
+        saved, stats = load_stats(table_name)
+        if stats is None or saved == signature:
+            return stats
+        ops = self.storage.ops_since(table_name, saved, signature)
+        if ops is None or not stats.apply_inserts(ops):
+            return None
+        save_stats(table_name, stats, signature)
+        return stats
+
+    def _flush_entry(self, table_name: str, entry: _Entry) -> None:
+        self.storage.append(table_name, entry.pending)
+        entry.pending = []
+        self._sync_snapshot(table_name, entry)
+
+    """
+    Обновление подписей после записи. Если хранилище переписало снапшот
+    (свернуло журнал), индексы сохраняются заново для нового снапшота.
+    Статистика сохраняется с новой подписью файлов таблицы
+    """
+    def _sync_snapshot(self, table_name: str, entry: _Entry) -> None:
+        signature = self._table_signature(table_name)
+        if entry.stats is not None and signature != entry.signature:
+            save_stats(table_name, entry.stats, signature)
+        entry.signature = signature
+        snapshot = self.storage.snapshot_signature(table_name)
+        if snapshot != entry.snapshot:
+            entry.snapshot = snapshot
+            if entry.indexes:
+                save_indexes(table_name, entry.indexes, snapshot)
+
+    """
+    Запись всех изменений таблицы и сворачивание журнала,
+    чтобы снапшот совпадал с состоянием в памяти
+    """
+    def _checkpoint(self, table_name: str, entry: _Entry) -> None:
+        if entry.dirty:
+            self.storage.append(table_name, entry.pending)
+            entry.pending = []
+        self.storage.compact(table_name)
+        self._sync_snapshot(table_name, entry)
+
+    """
+    Записи таблицы (только для чтения, изменения - через apply).
+    Таблица хранится по столбцам, записи создаются при переборе
+    """
+    def get(self, table_name: str) -> ColumnarTable:
+        return self._entry(table_name).rows
+
+    """
+    Применение операций к таблице в памяти, таблица помечается измененной
+    """
+    @_synchronized
+    def apply(self, table_name: str, ops: List[Op]) -> None:
+        if not ops:
+            return
+        entry = self._entry(table_name)
+        entry.apply(ops)
+        entry.pending.extend(ops)
+        entry.nbytes = entry.rows.nbytes()
+
+    """
+    Запись операций сразу в хранилище, минуя кэш (для массовой загрузки).
+    Таблица выгружается из кэша и будет перечитана при следующем обращении,
+    сохраненная статистика учитывает вставки сразу
+    """
+    @_synchronized
+    def append_direct(self, table_name: str, ops: List[Op]) -> None:
+        entry = self._tables.pop(table_name, None)
+        if entry is not None and entry.dirty:
+            self._flush_entry(table_name, entry)
+        stats = self._load_stats(table_name, self._table_signature(table_name))
+        self.storage.append(table_name, ops, compact=False)
+        if stats is not None and stats.apply_inserts(ops):
+            save_stats(table_name, stats, self._table_signature(table_name))
+
+    """
+    Запись операций в хранилище сразу (изменение схемы). Таблица с индексами
+    загружается: индексы переходят к новым столбцам и сохраняются заново,
+    если хранилище свернет журнал
+    """
+    @_synchronized
+    def append_now(self, table_name: str, ops: List[Op]) -> None:
+        if (table_name not in self._tables
+                and not os.path.exists(index_path(table_name))):
+            self.storage.append(table_name, ops)
+            return
+        entry = self._entry(table_name)
+        entry.apply(ops)
+        entry.pending.extend(ops)
+        self._flush_entry(table_name, entry)
+        entry.nbytes = entry.rows.nbytes()
+
+    """
+    Запись на диск изменений всех измененных таблиц.
+    Внутри транзакции ничего не записывается - изменения ждут commit
+    """
+    @_synchronized
+    def flush(self) -> None:
+        if self.in_transaction:
+            return
+        for table_name, entry in self._tables.items():
+            if entry.dirty:
+                self._flush_entry(table_name, entry)
+
+    @property
+    def in_transaction(self) -> bool:
+        return self._staged is not None
+
+    """
+    Начало транзакции: накопленные изменения записываются,
+    дальнейшие копятся в памяти до commit или rollback
+    """
+    @_synchronized
+    def begin(self) -> None:
+        if self.in_transaction:
+            raise ValueError("Транзакция уже начата.")
+        self.flush()
+        self._staged = {}
+
+    """
+    Фиксация транзакции. Сначала все изменения сохраняются в журнал
+    транзакции, затем записываются в файлы таблиц и метаданных,
+    после чего журнал удаляется. Возвращает число измененных таблиц
+    """
+    @_synchronized
+    def commit(self) -> int:
+        if self._staged is None:
+            raise ValueError("Нет открытой транзакции.")
+        dirty = {name: entry for name, entry in self._tables.items() if entry.dirty}
+        staged = self._staged
+        if dirty or staged:
+            write_journal(
+                {name: entry.pending for name, entry in dirty.items()}, staged
+            )
+            for table_name, entry in dirty.items():
+                self._flush_entry(table_name, entry)
+            for filepath, data in staged.items():
+                write_metadata_file(filepath, data)
+                self.set_metadata(filepath, data)
+            clear_journal()
+        self._staged = None
+        return len(dirty)
+
+    """
+    Отмена транзакции: измененные таблицы выгружаются из кэша
+    и при следующем обращении читаются с диска
+    """
+    @_synchronized
+    def rollback(self) -> None:
+        if self._staged is None:
+            raise ValueError("Нет открытой транзакции.")
+        for table_name in [n for n, e in self._tables.items() if e.dirty]:
+            del self._tables[table_name]
+        self._staged = None
+
+    """
+    Метаданные, измененные внутри транзакции (записываются при commit)
+    """
+    def stage_metadata(self, filepath: str, data: Dict[str, Any]) -> None:
+        if self._staged is None:
+            raise ValueError("Нет открытой транзакции.")
+        self._staged[filepath] = data
+
+    """
+    Сворачивание журнала таблицы без повторной загрузки в кэш.
+    Таблица с индексами загружается: индексы сохраняются для нового
+    снапшота по столбцам его схемы
+    """
+    @_synchronized
+    def compact(self, table_name: str) -> None:
+        entry = self._tables.get(table_name)
+        if entry is None and os.path.exists(index_path(table_name)):
+            entry = self._entry(table_name)
+        if entry is None:
+            self.storage.compact(table_name)
+        else:
+            self._checkpoint(table_name, entry)
+
+    """
+    Записи, найденные по индексу столбца, или None, если индекса нет.
+    По ID запись ищется без индекса: таблица упорядочена по ID,
+    а таблица из двоичного файла находит запись без разбора файла
+    """
+    def find_rows(self, table_name: str, column: str,
+                  value: Any) -> Optional[List[Row]]:
+        entry = self._entry(table_name)
+        index = entry.indexes.get(column)
+        if index is None and column == "ID":
+            row = entry.rows.get(value) if type(value) is int else None
+            return [] if row is None else [row]
+        if index is None:
+            return None
+        return [entry.rows[row_id] for row_id in index.lookup(value)]
+
+    """
+    Записи со значением столбца в диапазоне, или None, если нет
+    упорядоченного индекса по столбцу
+    """
+    def find_range(self, table_name: str, column: str, low: Any, high: Any,
+                   low_inclusive: bool = True,
+                   high_inclusive: bool = True) -> Optional[List[Row]]:
+        entry = self._entry(table_name)
+        index = entry.indexes.get(column)
+        if index is None or index.kind != "sorted":
+            return None
+        ids = index.range(low, high, low_inclusive, high_inclusive)
+        return [entry.rows[row_id] for row_id in ids]
+
+    """
+    Статистика таблицы. Таблица не из кэша не загружается, если сохраненная
+    статистика соответствует ее файлам; иначе статистика считается
+    по таблице и сохраняется
+    """
+    @_synchronized
+    def table_stats(self, table_name: str) -> TableStats:
+        if table_name not in self._tables:
+            stats = self._load_stats(table_name, self._table_signature(table_name))
+            if stats is not None:
+                return stats
+        entry = self._entry(table_name)
+        if entry.stats is None:
+            self._build_stats(table_name, entry)
+        return entry.stats
+
+    """
+    Пересчет статистики таблицы по записям (команда analyze)
+    """
+    @_synchronized
+    def analyze(self, table_name: str) -> TableStats:
+        entry = self._entry(table_name)
+        self._build_stats(table_name, entry)
+        return entry.stats
+
+    def _build_stats(self, table_name: str, entry: _Entry) -> None:
+        entry.stats = TableStats.build(entry.rows)
+        if not entry.dirty:
+            save_stats(table_name, entry.stats, entry.signature)
+
+    """
+    Индексы таблицы: столбец -> вид индекса. Таблица не из кэша
+    не загружается - индексы читаются из их файла
+    """
+    def indexes(self, table_name: str) -> Dict[str, str]:
+        if table_name in self._tables:
+            indexes = self._entry(table_name).indexes
+        else:
+            _, indexes = load_indexes(table_name)
+        return {column: index.kind for column, index in indexes.items()}
+
+    """
+    Построение и сохранение индекса по столбцу
+    """
+    @_synchronized
+    def create_index(self, table_name: str, column: str, kind: str) -> None:
+        entry = self._entry(table_name)
+        if column in entry.indexes:
+            raise ValueError(f'Индекс по столбцу "{column}" уже существует.')
+        index = build_index(column, kind, entry.rows.values())
+        self._checkpoint(table_name, entry)
+        entry.indexes[column] = index
+        save_indexes(table_name, entry.indexes, entry.snapshot)
+
+    """
+    Удаление индекса по столбцу
+    """
+    @_synchronized
+    def drop_index(self, table_name: str, column: str) -> None:
+        entry = self._entry(table_name)
+        if column not in entry.indexes:
+            raise ValueError(f'Индекс по столбцу "{column}" не найден.')
+        self._checkpoint(table_name, entry)
+        del entry.indexes[column]
+        save_indexes(table_name, entry.indexes, entry.snapshot)
+
+    """
+    Удаление таблицы из кэша (без записи изменений)
+    """
+    @_synchronized
+    def discard(self, table_name: str) -> None:
+        self._tables.pop(table_name, None)
+
+    """
+    Удаление таблицы из кэша вместе с файлами ее индексов и статистики
+    """
+    @_synchronized
+    def drop(self, table_name: str) -> None:
+        self.discard(table_name)
+        drop_indexes(table_name)
+        drop_stats(table_name)
+
+    """
+    Метаданные из кэша, если файл не менялся с момента чтения
+    (внутри транзакции - с ее изменениями)
+    """
+    @_synchronized
+    def get_metadata(self, filepath: str) -> Dict[str, Any]:
+        if self._staged and filepath in self._staged:
+            return self._staged[filepath]
+        cached = self._metadata.get(filepath)
+        if cached is not None and not self.reload_metadata:
+            return cached[1]
+        signature = file_signature([filepath])
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+                metrics.add("bytes_read", f.tell())
+        except FileNotFoundError:
+            data = {}
+        self._metadata[filepath] = (signature, data)
+        return data
+
+    """
+    Запоминание только что записанных метаданных
+    """
+    @_synchronized
+    def set_metadata(self, filepath: str, data: Dict[str, Any]) -> None:
+        self._metadata[filepath] = (file_signature([filepath]), data)
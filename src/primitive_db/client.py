@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+
+import argparse
+import socket
+import sys
+from typing import List, Optional, Tuple
+
+from src.primitive_db.constants import SERVER_HOST, SERVER_SOCKET
+from src.primitive_db.protocol import parse_header
+
+"""
+Тонкий клиент сервера базы (database serve): одно соединение на все
+команды сессии. Не импортирует движок, prettytable и prompt, поэтому
+запускается быстро
+"""
+class Client:
+    def __init__(self, socket_path: Optional[str] = SERVER_SOCKET,
+                 host: str = SERVER_HOST, port: Optional[int] = None):
+        if port is None:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(socket_path)
+        else:
+            self.sock = socket.create_connection((host, port))
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.stream = self.sock.makefile("rb")
+
+    """
+    Отправка команды и ожидание ответа: (успех, stdout, stderr)
+    """
+    def execute(self, line: str) -> Tuple[bool, str, str]:
+        self.sock.sendall(line.encode("utf-8") + b"\n")
+        header = self.stream.readline()
+        if not header:
+            raise ConnectionError("Сервер закрыл соединение.")
+        ok, out_size, err_size = parse_header(header)
+        out = self.stream.read(out_size).decode("utf-8")
+        err = self.stream.read(err_size).decode("utf-8")
+        return ok, out, err
+
+    def close(self) -> None:
+        self.stream.close()
+        self.sock.close()
+
+    def __enter__(self) -> "Client":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+"""
+Выполнение команды с выводом ее результата. Возвращает успех
+"""
+def run_line(client: Client, line: str) -> bool:
+    ok, out, err = client.execute(line)
+    sys.stdout.write(out)
+    sys.stderr.write(err)
+    sys.stdout.flush()
+    return ok
+
+"""
+Интерактивный режим: команды вводятся построчно до exit
+"""
+def repl(client: Client) -> int:
+    errors = 0
+    while True:
+        try:
+            line = input(">>>Введите команду: ").strip()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if line == "exit":
+            break
+        if line and not run_line(client, line):
+            errors += 1
+    return 1 if errors else 0
+
+"""
+Выполнение команд сценария (-f, -c или stdin). При ошибке выполнение
+останавливается, если не задан stop_on_error=False.
+Код возврата: 0 - все команды выполнены, 1 - были ошибки
+"""
+def run_lines(client: Client, lines: List[str], stop_on_error: bool = True) -> int:
+    errors = 0
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        if line.rstrip(";") == "exit":
+            break
+        if not run_line(client, line):
+            errors += 1
+            if stop_on_error:
+                print(f"Выполнение остановлено на строке {number}.", file=sys.stderr)
+                break
+    return 1 if errors else 0
+
+"""
+Разбор аргументов командной строки
+"""
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="database-client",
+        description="Клиент сервера базы данных (database serve). Без аргументов "
+                    "запускается интерактивный режим; если stdin не терминал, "
+                    "команды читаются из него построчно.",
+    )
+    parser.add_argument("--socket", default=SERVER_SOCKET,
+                        help=f"Unix-сокет сервера (по умолчанию {SERVER_SOCKET})")
+    parser.add_argument("--host", default=SERVER_HOST,
+                        help="адрес сервера для TCP")
+    parser.add_argument("--port", type=int,
+                        help="порт сервера; если задан, подключение по TCP")
+    parser.add_argument("-f", "--file",
+                        help="выполнить команды из файла сценария")
+    parser.add_argument("-c", "--command", action="append", default=[],
+                        help="выполнить команду (флаг можно повторять)")
+    parser.add_argument("--continue-on-error", action="store_true",
+                        help="не останавливать сценарий на ошибке")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    try:
+        client = Client(args.socket, args.host, args.port)
+    except OSError as e:
+        print(f"Ошибка подключения к серверу: {e}", file=sys.stderr)
+        sys.exit(2)
+
+    with client:
+        try:
+            if not args.file and not args.command and sys.stdin.isatty():
+                sys.exit(repl(client))
+            if args.file:
+                with open(args.file, 'r', encoding='utf-8') as f:
+                    lines = f.readlines()
+            elif args.command:
+                lines = []
+            else:
+                lines = sys.stdin.readlines()
+            sys.exit(run_lines(client, lines + args.command,
+                               stop_on_error=not args.continue_on_error))
+        except (OSError, ValueError) as e:
+            print(f"Ошибка: {e}", file=sys.stderr)
+            sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,484 @@
+import operator
+import sys
+from array import array
+from bisect import bisect_left
+from itertools import compress, repeat
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.primitive_db import parallel
+from src.primitive_db.predicates import Predicate, column_mask
+
+Row = Dict[str, Any]
+
+# Отметка отсутствующего значения (столбец появился позже записи)
+MISSING = object()
+
+INT64_MIN = -(2 ** 63)
+INT64_MAX = 2 ** 63 - 1
+
+"""
+Столбец целых чисел: массив array('q'), 8 байт на значение
+"""
+class IntColumn:
+    kind = "int"
+
+    def __init__(self):
+        self.data = array('q')
+
+    @staticmethod
+    def accepts(value: Any) -> bool:
+        return (type(value) is int) and INT64_MIN <= value <= INT64_MAX
+
+    def append(self, value: int) -> None:
+        self.data.append(value)
+
+    def get(self, pos: int) -> int:
+        return self.data[pos]
+
+    def set(self, pos: int, value: int) -> None:
+        self.data[pos] = value
+
+    def values(self) -> Iterable[Any]:
+        return self.data
+
+    """
+    Значения позиций [start, stop) отдельным столбцом (для передачи в процесс)
+    """
+    def slice(self, start: int, stop: int) -> "IntColumn":
+        column = IntColumn()
+        column.data = self.data[start:stop]
+        return column
+
+    def take(self, positions: List[int]) -> "IntColumn":
+        data = self.data
+        return IntColumn.from_values([data[pos] for pos in positions])
+
+    @staticmethod
+    def from_values(values: List[Any]) -> "IntColumn":
+        column = IntColumn()
+        column.data = array('q', values)
+        return column
+
+    def nbytes(self) -> int:
+        return sys.getsizeof(self.data)
+
+
+"""
+Столбец булевых значений: битовая карта, 1 бит на значение
+"""
+class BoolColumn:
+    kind = "bool"
+
+    def __init__(self):
+        self.bits = bytearray()
+        self.length = 0
+
+    @staticmethod
+    def accepts(value: Any) -> bool:
+        return type(value) is bool
+
+    def append(self, value: bool) -> None:
+        if self.length % 8 == 0:
+            self.bits.append(0)
+        self.length += 1
+        self.set(self.length - 1, value)
+
+    def get(self, pos: int) -> bool:
+        return bool(self.bits[pos >> 3] >> (pos & 7) & 1)
+
+    def set(self, pos: int, value: bool) -> None:
+        if value:
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        else:
+            self.bits[pos >> 3] &= ~(1 << (pos & 7)) & 0xFF
+
+    def values(self) -> Iterable[Any]:
+        if not self.length:
+            return iter(())
+        digits = format(int.from_bytes(self.bits, "little"), f"0{self.length}b")
+        return map("1".__eq__, reversed(digits[-self.length:]))
+
+    """
+    Значения позиций [start, stop) отдельным столбцом; start кратен 8,
+    поэтому часть битовой карты копируется целыми байтами
+    """
+    def slice(self, start: int, stop: int) -> "BoolColumn":
+        stop = min(stop, self.length)
+        column = BoolColumn()
+        column.length = max(0, stop - start)
+        column.bits = self.bits[start >> 3:(stop + 7) >> 3]
+        return column
+
+    def take(self, positions: List[int]) -> "BoolColumn":
+        get = self.get
+        return BoolColumn.from_values([get(pos) for pos in positions])
+
+    """
+    Упаковка списка bool в битовую карту: бит i числа - значение i
+    """
+    @staticmethod
+    def from_values(values: List[Any]) -> "BoolColumn":
+        column = BoolColumn()
+        column.length = len(values)
+        digits = "".join(map("01".__getitem__, reversed(values))) or "0"
+        column.bits = bytearray(
+            int(digits, 2).to_bytes((len(values) + 7) // 8, "little")
+        )
+        return column
+
+    def nbytes(self) -> int:
+        return sys.getsizeof(self.bits)
+
+
+"""
+Столбец строк: список интернированных строк, одинаковые значения
+хранятся в памяти один раз
+"""
+class StrColumn:
+    kind = "str"
+
+    def __init__(self):
+        self.data: List[Any] = []
+
+    @staticmethod
+    def accepts(value: Any) -> bool:
+        return type(value) is str
+
+    def append(self, value: str) -> None:
+        self.data.append(sys.intern(value))
+
+    def get(self, pos: int) -> Any:
+        return self.data[pos]
+
+    def set(self, pos: int, value: str) -> None:
+        self.data[pos] = sys.intern(value)
+
+    def values(self) -> Iterable[Any]:
+        return self.data
+
+    def take(self, positions: List[int]) -> "StrColumn":
+        column = type(self)()
+        data = self.data
+        column.data = [data[pos] for pos in positions]
+        return column
+
+    @classmethod
+    def from_values(cls, values: List[Any]) -> "StrColumn":
+        column = cls()
+        intern = sys.intern
+        column.data = [
+            intern(value) if type(value) is str else value for value in values
+        ]
+        return column
+
+    def nbytes(self, sample: int = 1000) -> int:
+        data = self.data
+        if not data:
+            return sys.getsizeof(data)
+        step = max(1, len(data) // sample)
+        sampled = data[::step]
+        # Интернированные повторы учитываются один раз
+        unique = {id(value): value for value in sampled}
+        per_value = sum(sys.getsizeof(v) for v in unique.values()) / len(sampled)
+        return sys.getsizeof(data) + int(per_value * len(data))
+
+
+"""
+Столбец произвольных значений (смешанные типы, пропуски) - обычный список
+"""
+class ObjectColumn(StrColumn):
+    kind = "object"
+
+    @staticmethod
+    def accepts(value: Any) -> bool:
+        return True
+
+    def append(self, value: Any) -> None:
+        self.data.append(sys.intern(value) if type(value) is str else value)
+
+    def set(self, pos: int, value: Any) -> None:
+        self.data[pos] = sys.intern(value) if type(value) is str else value
+
+
+Column = IntColumn | BoolColumn | StrColumn | ObjectColumn
+
+"""
+Столбец из списка значений: самый компактный вид, в который
+помещаются все значения
+"""
+def column_from(values: List[Any]) -> Column:
+    kinds = set(map(type, values))
+    if kinds == {bool}:
+        return BoolColumn.from_values(values)
+    if kinds == {int}:
+        try:
+            return IntColumn.from_values(values)
+        except OverflowError:
+            pass
+    if kinds == {str}:
+        return StrColumn.from_values(values)
+    return ObjectColumn.from_values(values)
+
+
+"""
+Таблица в памяти по столбцам.
+ID хранятся в array('q'), остальные столбцы - в IntColumn/BoolColumn/
+StrColumn, при несовпадении типа столбец переводится в ObjectColumn.
+Записи (словари) создаются только по запросу - при чтении строки.
+Снаружи таблица ведет себя как словарь ID -> запись: get, [], pop, values.
+Удаление помечает позицию как удаленную; удаленные позиции вычищаются,
+когда их становится больше половины
+"""
+class ColumnarTable:
+    def __init__(self, rows: Iterable[Row] = ()):
+        self.ids = array('q')
+        self.alive = bytearray()
+        self.columns: Dict[str, Column] = {}
+        self._live = 0
+        # Карта ID -> позиция нужна, только если ID добавлялись не по возрастанию
+        self._positions: Optional[Dict[int, int]] = None
+        self.extend(rows)
+
+    """
+    Таблица из готовых столбцов: ID по возрастанию, все позиции живые
+    """
+    @classmethod
+    def from_columns(cls, ids: array,
+                     columns: Dict[str, Column]) -> "ColumnarTable":
+        table = cls()
+        table.ids = ids
+        table.alive = bytearray(b"\x01") * len(ids)
+        table.columns = columns
+        table._live = len(ids)
+        return table
+
+    def __len__(self) -> int:
+        return self._live
+
+    def __iter__(self) -> Iterator[Row]:
+        return self.values()
+
+    def __contains__(self, row_id: int) -> bool:
+        return self._find(row_id) is not None
+
+    def __getitem__(self, row_id: int) -> Row:
+        pos = self._find(row_id)
+        if pos is None:
+            raise KeyError(row_id)
+        return self.row_at(pos)
+
+    def __setitem__(self, row_id: int, row: Row) -> None:
+        pos = self._find_slot(row_id)
+        if pos is None:
+            self._append(row_id, row)
+        else:
+            if not self.alive[pos]:
+                self.alive[pos] = 1
+                self._live += 1
+            for name in self.columns:
+                self._set_value(name, pos, row.get(name, MISSING))
+            for name, value in row.items():
+                if name != "ID" and name not in self.columns:
+                    self._add_column(name, pos, value)
+
+    def get(self, row_id: int, default: Any = None) -> Any:
+        pos = self._find(row_id)
+        return default if pos is None else self.row_at(pos)
+
+    def pop(self, row_id: int, default: Any = None) -> Any:
+        pos = self._find(row_id)
+        if pos is None:
+            return default
+        row = self.row_at(pos)
+        self.alive[pos] = 0
+        self._live -= 1
+        if len(self.ids) - self._live > max(1024, len(self.ids) // 2):
+            self._compact()
+        return row
+
+    def values(self) -> Iterator[Row]:
+        names = ["ID", *self.columns]
+        sequences = [self.ids, *(c.values() for c in self.columns.values())]
+        partial = any(c.kind == "object" for c in self.columns.values())
+        alive = self.alive
+        for pos, values in enumerate(zip(*sequences)):
+            if not alive[pos]:
+                continue
+            row = dict(zip(names, values))
+            if partial:
+                row = {k: v for k, v in row.items() if v is not MISSING}
+            yield row
+
+    """
+    Добавление множества записей. В пустую таблицу записи с возрастающими ID
+    загружаются целиком по столбцам, иначе - по одной
+    """
+    def extend(self, rows: Iterable[Row]) -> None:
+        rows = list(rows)
+        ids = [row["ID"] for row in rows]
+        if self.ids or any(a >= b for a, b in zip(ids, ids[1:])):
+            for row in rows:
+                self[row["ID"]] = row
+            return
+        names: Dict[str, None] = {}
+        keys = None
+        for row in rows:
+            if row.keys() != keys:
+                names.update(dict.fromkeys(row))
+                keys = row.keys()
+        names.pop("ID", None)
+        self.ids = array('q', ids)
+        self.alive = bytearray(b"\x01") * len(ids)
+        self._live = len(ids)
+        for name in names:
+            self.columns[name] = column_from(
+                [row.get(name, MISSING) for row in rows]
+            )
+
+    """
+    Запись в позиции pos (создается новый словарь)
+    """
+    def row_at(self, pos: int) -> Row:
+        row = {"ID": self.ids[pos]}
+        for name, column in self.columns.items():
+            value = column.get(pos)
+            if value is not MISSING:
+                row[name] = value
+        return row
+
+    """
+    Значения столбца по всем позициям, включая удаленные (для отбора через
+    selection), без создания записей. Пропуски заменяются на None.
+    Возвращает значения и признак того, что среди них может быть None
+    """
+    def column(self, name: str) -> Tuple[Iterable[Any], bool]:
+        if name == "ID":
+            return self.ids, False
+        if name not in self.columns:
+            return repeat(None, len(self.ids)), True
+        column = self.columns[name]
+        if column.kind == "object":
+            return [None if v is MISSING else v for v in column.values()], True
+        return column.values(), False
+
+    """
+    Отметки живых позиций, удовлетворяющих типизированному условию
+    (все живые позиции, если условия нет); используется с itertools.compress.
+    parallel_scan=True - условие проверяется в пуле процессов (см. parallel.py)
+    """
+    def selection(self, pred: Optional[Predicate] = None,
+                  parallel_scan: bool = False) -> Iterable[Any]:
+        if pred is None:
+            return self.alive
+        selection = None
+        if parallel_scan:
+            selection = parallel.scan_selection(self, pred)
+        if selection is None:
+            selection = list(map(operator.and_, column_mask(pred, self.column),
+                                 self.alive))
+        return selection
+
+    """
+    Полный перебор по столбцам для типизированного условия (см. bind):
+    каждое сравнение вычисляется сразу для всего столбца, результаты
+    объединяются по and/or, записи создаются только для подходящих позиций
+    """
+    def scan(self, pred: Predicate, parallel_scan: bool = False) -> Iterator[Row]:
+        for pos in compress(range(len(self.ids)),
+                            self.selection(pred, parallel_scan)):
+            yield self.row_at(pos)
+
+    """
+    Изменение схемы (см. schema.alter_row) по столбцам, без создания записей.
+    Столбцы перебираются методами dict, чтобы не разбирать столбцы,
+    загружаемые по обращению (binary.MappedTable)
+    """
+    def alter(self, change: Dict[str, Any]) -> None:
+        action, name = change["action"], change["column"]
+        if action == "add":
+            if change.get("default") is not None:
+                self.columns[name] = column_from(
+                    [change["default"]] * len(self.ids)
+                )
+        elif action == "drop":
+            dict.pop(self.columns, name, None)
+        elif dict.__contains__(self.columns, name):
+            columns = list(dict.items(self.columns))
+            dict.clear(self.columns)
+            dict.update(self.columns, (
+                (change["to"] if key == name else key, column)
+                for key, column in columns
+            ))
+
+    """
+    Приблизительный объем памяти таблицы, байт
+    """
+    def nbytes(self) -> int:
+        total = sys.getsizeof(self.ids) + sys.getsizeof(self.alive)
+        total += sum(column.nbytes() for column in self.columns.values())
+        if self._positions is not None:
+            total += sys.getsizeof(self._positions) + 32 * len(self._positions)
+        return total
+
+    def _find(self, row_id: int) -> Optional[int]:
+        pos = self._find_slot(row_id)
+        if pos is None or not self.alive[pos]:
+            return None
+        return pos
+
+    def _find_slot(self, row_id: int) -> Optional[int]:
+        if self._positions is not None:
+            return self._positions.get(row_id)
+        pos = bisect_left(self.ids, row_id)
+        if pos < len(self.ids) and self.ids[pos] == row_id:
+            return pos
+        return None
+
+    def _append(self, row_id: int, row: Row) -> None:
+        pos = len(self.ids)
+        if self._positions is None and pos and self.ids[-1] > row_id:
+            self._positions = {value: i for i, value in enumerate(self.ids)}
+        self.ids.append(row_id)
+        self.alive.append(1)
+        self._live += 1
+        if self._positions is not None:
+            self._positions[row_id] = pos
+        for name, column in self.columns.items():
+            value = row.get(name, MISSING)
+            if not column.accepts(value):
+                column = self._widen(name)
+            column.append(value)
+        for name, value in row.items():
+            if name != "ID" and name not in self.columns:
+                self._add_column(name, pos, value)
+
+    """
+    Новый столбец: значение value в позиции pos, в остальных - пропуск
+    """
+    def _add_column(self, name: str, pos: int, value: Any) -> None:
+        values = [MISSING] * len(self.ids)
+        values[pos] = value
+        self.columns[name] = column_from(values)
+
+    def _set_value(self, name: str, pos: int, value: Any) -> None:
+        column = self.columns[name]
+        if not column.accepts(value):
+            column = self._widen(name)
+        column.set(pos, value)
+
+    def _widen(self, name: str) -> Column:
+        column = self.columns[name]
+        wide = ObjectColumn()
+        wide.data = list(column.values())
+        self.columns[name] = wide
+        return wide
+
+    def _compact(self) -> None:
+        positions = [pos for pos in range(len(self.ids)) if self.alive[pos]]
+        self.ids = array('q', (self.ids[pos] for pos in positions))
+        self.alive = bytearray(b"\x01") * len(positions)
+        self.columns = {
+            name: column.take(positions) for name, column in self.columns.items()
+        }
+        if self._positions is not None:
+            self._positions = {value: i for i, value in enumerate(self.ids)}
@@ -1,3 +1,81 @@
 
 SUPPORTED_TYPES = {"int", "str", "bool"}
-DB_FILE = "db_meta.json"
\ No newline at end of file
+DB_FILE = "db_meta.json"
+# Журнал фиксируемой транзакции (существует только во время commit)
+TXN_FILE = "db_txn.json"
+DATA_DIR = "data"
+# Блокировка базы: каждая команда держит ее разделяемой, проверка файлов
+# при запуске процесса - исключительной
+LOCK_FILE = "db.lock"
+
+# Блокировки файлов для одновременной работы нескольких процессов с одной базой
+# (таблица - читатели/писатель, метаданные - писатель). False - один процесс
+LOCKING = True
+# Сколько секунд ждать блокировку, занятую другим процессом, до ошибки
+LOCK_TIMEOUT = 30
+
+# Хранилище данных таблиц: "json" - перезапись файла целиком,
+# "log" - снапшот + журнал построчных операций
+STORAGE_BACKEND = "log"
+# Форматы файла таблицы (выбираются в create_table): "json" - массив записей,
+# "binary" - схема один раз и значения по столбцам блоками, со сжатием или без
+TABLE_FORMATS = ("json", "binary")
+COMPRESSIONS = ("none", "zlib", "lzma")
+# Записей в блоке двоичного файла таблицы (блок сжимается и читается целиком)
+BINARY_BLOCK_ROWS = 16384
+# Надежность записи на диск: "off" - без fsync (быстрее, но при сбое питания
+# последние изменения могут пропасть), "normal" - fsync файла перед атомарной
+# заменой, "full" - также fsync каталога и каждой дозаписи в журнал
+DURABILITY = "normal"
+DURABILITY_LEVELS = ("off", "normal", "full")
+# Минимальный размер журнала (в байтах), после которого он сворачивается в снапшот
+LOG_COMPACT_MIN_BYTES = 1024 * 1024
+# Ограничение памяти кэша таблиц сессии, байт
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+# Параллельный перебор таблицы без индекса: число процессов (0 - по числу
+# процессоров, 1 - без параллелизма). Делить ли перебор между процессами,
+# решает оценка стоимости (ниже)
+SCAN_WORKERS = 0
+# Оценки стоимости способов доступа к записям (микросекунды, замер
+# на 1 млн строк): проверка одного сравнения при переборе по столбцам -
+# на запись; создание подходящей записи; запись, найденная по индексу
+# (поиск и создание); передача записи процессу пула; запуск задач
+# параллельного перебора; запуск одного процесса пула (первый перебор)
+SCAN_ROW_COST = 0.1
+ROW_BUILD_COST = 2.2
+INDEX_ROW_COST = 5.0
+PARALLEL_ROW_COST = 0.03
+PARALLEL_TASK_COST = 5_000
+PARALLEL_SPAWN_COST = 100_000
+# Число регистров оценки различных значений столбца (HyperLogLog) - 2^N,
+# погрешность около 1.04 / sqrt(2^N): 10 - 1024 регистра, около 3%
+STATS_HLL_PRECISION = 10
+# Сбор метрик производительности (команда stats): время команд и их фаз,
+# счетчики записей и байт. METRICS_FILE - файл, в который метрики
+# записываются в конце сессии ("" - не записывать; *.json - JSON,
+# иначе текстовый формат Prometheus)
+METRICS = True
+METRICS_FILE = ""
+# Границы корзин гистограмм времени, секунды
+METRICS_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Число записей, которые команда load проверяет и записывает за один раз
+LOAD_BATCH_SIZE = 10_000
+# Число планов команд в LRU-кэше разборщика (planner.py)
+PLAN_CACHE_SIZE = 256
+# Вывод select: записей в одной выводимой таблице и на странице в режиме --page
+SELECT_CHUNK_SIZE = 1000
+SELECT_PAGE_SIZE = 20
+# Резервные копии (backup/restore): степень сжатия gzip архива (1-9),
+# файл с подписями таблиц последней копии (для копии --incremental)
+# и отметка незавершенного восстановления (доводится при запуске)
+BACKUP_COMPRESSLEVEL = 6
+BACKUP_STATE_FILE = "db_backup.json"
+RESTORE_FILE = "db_restore.json"
+# Префикс временного каталога распакованной копии в DATA_DIR
+RESTORE_STAGING_PREFIX = ".restore-"
+# Режим сервера: Unix-сокет по умолчанию, адрес для TCP (только локальный)
+# и число потоков, выполняющих команды клиентов
+SERVER_SOCKET = "db.sock"
+SERVER_HOST = "127.0.0.1"
+SERVER_WORKERS = 4
@@ -1,11 +1,69 @@
-from typing import Any, Dict, List, Optional, Tuple
+import json
+import os
+import time
+from array import array
+from itertools import compress, islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
-from prettytable import PrettyTable
-
-from src.primitive_db.constants import SUPPORTED_TYPES
-from src.primitive_db.decorators import confirm_action, handle_db_errors, log_time
+from src.primitive_db import locks, metrics, parallel, utils
+from src.primitive_db.aggregates import (
+    NUMERIC_FUNCTIONS,
+    Accumulator,
+    Aggregate,
+    accumulate,
+    aggregate_values,
+    group_order,
+    group_positions,
+)
+from src.primitive_db.columnar import ColumnarTable
+from src.primitive_db.constants import (
+    COMPRESSIONS,
+    DB_FILE,
+    LOAD_BATCH_SIZE,
+    SELECT_CHUNK_SIZE,
+    SELECT_PAGE_SIZE,
+    SUPPORTED_TYPES,
+    TABLE_FORMATS,
+)
+from src.primitive_db.decorators import confirm_action, handle_db_errors
+from src.primitive_db.indexes import INDEX_KINDS
+from src.primitive_db.loader import read_records
+from src.primitive_db.output import inform, print_empty, print_table, report_error
+from src.primitive_db.planner import (
+    Plan,
+    access_cost,
+    count_comparisons,
+    estimate_selectivity,
+    plan_cache,
+)
+from src.primitive_db.predicates import (
+    RANGE_OPERATORS,
+    And,
+    Comparison,
+    Predicate,
+    bind,
+    compile_matcher,
+    conjuncts,
+)
+from src.primitive_db.schema import ALTER_ACTIONS, Schema, alter_columns, get_schema
+from src.primitive_db.storage import (
+    atomic_write,
+    get_durability,
+    row_op,
+    set_durability,
+    validate_table_name,
+)
 from src.primitive_db.utils import load_table_data
 
+# Способы доступа к записям (см. access_path) для вывода explain
+ACCESS_NAMES = {
+    "scan": "полный перебор",
+    "parallel": "параллельный перебор",
+    "id": "поиск по ID",
+    "hash": "индекс hash",
+    "sorted": "индекс sorted",
+}
+
 """
 Валидация данных в колонке таблицы
 """
@@ -26,16 +84,29 @@ def validate_column_spec(
     return name, typ
 
 """
-Создание таблицы в метаданных
+Создание таблицы в метаданных.
+table_format - формат файла таблицы (json или binary), compression -
+сжатие двоичного файла (none, zlib или lzma)
 """
 @handle_db_errors
 def create_table(
-    metadata: Dict[str, List[str]], 
+    metadata: Dict[str, Dict[str, Any]], 
     table_name: str, 
-    column_specs: List[str]
-) -> Dict[str, List[str]]:
+    column_specs: List[str],
+    table_format: str = "json",
+    compression: str = "none"
+) -> Dict[str, Dict[str, Any]]:
     if table_name in metadata:
         raise ValueError(f'Таблица "{table_name}" уже существует.')
+    validate_table_name(table_name)
+    if table_format not in TABLE_FORMATS:
+        raise ValueError(f"Неизвестный формат таблицы: {table_format}. \
+                         Доступные: {', '.join(TABLE_FORMATS)}")
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Неизвестное сжатие: {compression}. \
+                         Доступные: {', '.join(COMPRESSIONS)}")
+    if compression != "none" and table_format != "binary":
+        raise ValueError("Сжатие доступно только для формата binary.")
 
     columns = ["ID:int"]
     for spec in column_specs:
@@ -43,9 +114,11 @@ def create_table(
         columns.append(f"{name}:{typ}")
 
     new_metadata = metadata.copy()
-    new_metadata[table_name] = columns
-    print(f'Таблица "{table_name}" успешно создана со столбцами:\
+    new_metadata[table_name] = {"columns": columns, "sequence": 0}
+    inform(f'Таблица "{table_name}" успешно создана со столбцами:\
            {", ".join(columns)}')
+    if table_format != "json":
+        inform(f"Формат хранения: {format_name(table_format, compression)}")
     return new_metadata
 
 """
@@ -54,28 +127,125 @@ def create_table(
 @handle_db_errors
 @confirm_action("удаление таблицы")
 def drop_table(metadata:
-                Dict[str, List[str]], 
+                Dict[str, Dict[str, Any]], 
                 table_name: str
-                ) -> Dict[str, List[str]]:
+                ) -> Dict[str, Dict[str, Any]]:
     if table_name not in metadata:
         raise KeyError(table_name)
 
     new_metadata = metadata.copy()
     del new_metadata[table_name]
-    print(f'Таблица "{table_name}" успешно удалена.')
+    inform(f'Таблица "{table_name}" успешно удалена.')
     return new_metadata
 
+"""
+Изменение схемы таблицы: add <имя:тип> [default <значение>],
+drop <столбец>, rename <столбец> <новое имя>.
+Записи не переписываются: изменение получает новую версию схемы
+и записывается операцией журнала, а записи прежних версий приводятся
+к новой схеме при чтении. Возвращает метаданные и операцию журнала
+"""
+@handle_db_errors
+def alter_table(
+    metadata: Dict[str, Dict[str, Any]],
+    table_name: str,
+    action: str,
+    args: List[str]
+) -> Optional[Tuple[Dict[str, Dict[str, Any]], List[Dict[str, Any]]]]:
+    if table_name not in metadata:
+        raise KeyError(table_name)
+    if action not in ALTER_ACTIONS:
+        raise ValueError(f"Неизвестное изменение схемы: {action}. \
+                         Доступные: {', '.join(ALTER_ACTIONS)}")
+
+    schema = get_schema(metadata, table_name)
+    version = schema.version + 1
+    defaults = dict(schema.defaults)
+    if action == "add":
+        if len(args) not in (1, 3) or (len(args) == 3 and args[1] != "default"):
+            raise ValueError("Ожидается: alter_table <таблица> add \
+                             <имя:тип> [default <значение>]")
+        name, typ = validate_column_spec(args[0])
+        if name in schema.types:
+            raise ValueError(f'Столбец "{name}" уже существует.')
+        default = cast_value(args[2], typ) if len(args) == 3 else None
+        change = {"action": action, "column": name, "type": typ,
+                  "default": default}
+        defaults[name] = default
+        message = f'В таблицу "{table_name}" добавлен столбец {name}:{typ}.'
+    else:
+        expected = 2 if action == "rename" else 1
+        if len(args) != expected:
+            usage = "<столбец> <новое имя>" if action == "rename" else "<столбец>"
+            raise ValueError(f"Ожидается: alter_table <таблица> {action} {usage}")
+        name = args[0]
+        if name not in schema.types:
+            raise KeyError(name)
+        if name == "ID":
+            raise ValueError("Столбец ID нельзя удалить или переименовать.")
+        change = {"action": action, "column": name}
+        default = defaults.pop(name, None)
+        if action == "drop":
+            message = f'Из таблицы "{table_name}" удален столбец {name}.'
+        else:
+            new_name = args[1]
+            if not new_name or ":" in new_name:
+                raise ValueError(f"Некорректное имя столбца: {new_name}.")
+            if new_name in schema.types:
+                raise ValueError(f'Столбец "{new_name}" уже существует.')
+            if name in schema.defaults:
+                defaults[new_name] = default
+            change["to"] = new_name
+            message = f'Столбец {name} таблицы "{table_name}" \
+                        переименован в {new_name}.'
+
+    entry = metadata[table_name]
+    new_metadata = metadata.copy()
+    new_metadata[table_name] = {
+        **entry,
+        "columns": alter_columns(schema.columns, change),
+        "version": version,
+        "defaults": defaults,
+        "changes": [*entry.get("changes", []), {"v": version, **change}],
+    }
+    inform(message)
+    inform(f"Версия схемы таблицы: {version}")
+    return new_metadata, [{"op": "alter", "v": version, **change}]
+
 """
 Вывод списка таблиц
 """
 @handle_db_errors
-def list_tables(metadata: Dict[str, List[str]]) -> None:
+def list_tables(metadata: Dict[str, Dict[str, Any]]) -> None:
     if not metadata:
         print("Нет таблиц.")
     else:
         for table in metadata:
             print(f"- {table}")
 
+"""
+Название формата хранения для вывода: json, binary или binary+zlib
+"""
+def format_name(table_format: str, compression: str) -> str:
+    return table_format if compression == "none" else f"{table_format}+{compression}"
+
+"""
+Выделение новых ID по счетчику таблицы без просмотра данных.
+Возвращает метаданные с увеличенным счетчиком и первый выделенный ID
+"""
+def allocate_ids(
+    metadata: Dict[str, Dict[str, Any]],
+    table_name: str,
+    count: int = 1
+) -> Tuple[Dict[str, Dict[str, Any]], int]:
+    first_id = metadata[table_name]["sequence"] + 1
+    new_metadata = metadata.copy()
+    new_metadata[table_name] = {
+        **metadata[table_name],
+        "sequence": first_id + count - 1,
+    }
+    return new_metadata, first_id
+
 """
 Преобразование строки в значение нужного типа.
 """
@@ -97,178 +267,1014 @@ def cast_value(value_str: str, target_type: str) -> Any:
         raise ValueError(f"Неизвестный тип: {target_type}")
 
 """
-Валидация и приведение значения к нужному типу
+Валидация и приведение значения к нужному типу.
+Значения последних столбцов, добавленных alter_table, можно не указывать:
+берется значение по умолчанию, а без него столбец в записи отсутствует
 """
-def validate_and_cast_values(schema: List[str],
+def validate_and_cast_values(schema: Schema,
                               values: List[str]) -> Dict[str, Any]:
-    data_columns = schema[1:] 
-    if len(values) != len(data_columns):
+    data_columns = schema.data_columns
+    omitted = data_columns[len(values):]
+    if len(values) > len(data_columns) or any(
+            name not in schema.defaults for name, _ in omitted):
         raise ValueError(f"Ожидалось {len(data_columns)}\
                           значений, получено {len(values)}.")
 
     record = {}
-    for spec, val_str in zip(data_columns, values):
-        col_name, col_type = spec.split(":", 1)
+    for (col_name, col_type), val_str in zip(data_columns, values):
         record[col_name] = cast_value(val_str, col_type)
+    for col_name, _ in omitted:
+        if schema.defaults[col_name] is not None:
+            record[col_name] = schema.defaults[col_name]
     return record
 
 """
-Добавление записи в таблицу
+Условия верхнего уровня and, по которым записи можно найти без перебора:
+по индексу (=, in, а для упорядоченного индекса и диапазоны) или по ID
+(=, in). Возвращает пары (вид - "id", "hash" или "sorted", условие)
+"""
+def index_options(
+    table_name: str,
+    where: Predicate
+) -> List[Tuple[str, Comparison]]:
+    indexes = utils.table_indexes(table_name)
+    options = []
+    for cond in conjuncts(where):
+        if not isinstance(cond, Comparison):
+            continue
+        kind = indexes.get(cond.column)
+        if kind is None:
+            if cond.column == "ID" and cond.op in ("=", "in"):
+                options.append(("id", cond))
+        elif cond.op in ("=", "in") or (kind == "sorted"
+                                         and cond.op in RANGE_OPERATORS):
+            options.append((kind, cond))
+    return options
+
+"""
+Способы доступа к записям для условия с оценкой стоимости (см.
+planner.access_cost), от дешевого к дорогому: (стоимость, вид, условие).
+Кроме поиска по индексам и ID (см. index_options) - полный перебор "scan"
+и, если условие можно проверить в пуле процессов, "parallel". Число
+записей и доли, подходящие под условия, оцениваются по статистике таблицы
+"""
+def access_plans(
+    table_name: str,
+    where: Predicate,
+    table_data: Any = None
+) -> List[Tuple[float, str, Optional[Comparison]]]:
+    stats = utils.table_stats(table_name)
+    rows, comparisons = stats.rows, count_comparisons(where)
+    matched = rows * estimate_selectivity(where, stats)
+    plans = [(access_cost("scan", rows, comparisons, matched), "scan", None)]
+    if (isinstance(table_data, ColumnarTable)
+            and parallel.can_scan(table_data, where)):
+        cost = access_cost("parallel", rows, comparisons, matched,
+                           workers=parallel.get_workers(),
+                           spawn=not parallel.started())
+        plans.append((cost, "parallel", None))
+    for kind, cond in index_options(table_name, where):
+        found = (len(set(cond.values)) if kind == "id"
+                 else rows * estimate_selectivity(cond, stats))
+        plans.append((access_cost(kind, rows, comparisons, matched, found),
+                      kind, cond))
+    plans.sort(key=lambda plan: plan[0])
+    return plans
+
+"""
+Способ доступа к записям для условия: вид - "scan" (полный перебор),
+"parallel", "id", "hash" или "sorted" - и условие, по которому ищутся
+записи. Поиск по ID выбирается сразу, без перебора нечего выбирать,
+иначе выбирается самый дешевый способ по оценке стоимости (access_plans).
+table_data - записи таблицы (нужны для проверки параллельного перебора)
+"""
+def access_path(
+    table_name: str,
+    where: Predicate,
+    table_data: Any = None
+) -> Tuple[str, Optional[Comparison]]:
+    options = index_options(table_name, where)
+    for kind, cond in options:
+        if kind == "id":
+            return kind, cond
+    if not options and not (isinstance(table_data, ColumnarTable)
+                            and parallel.can_scan(table_data, where)):
+        return "scan", None
+    _, kind, cond = access_plans(table_name, where, table_data)[0]
+    return kind, cond
+
+"""
+Записи, найденные по индексу (или по ID) для одного условия.
+None - индекса нет (или кэш не подключен), нужен полный перебор
+"""
+def lookup_rows(
+    table_name: str,
+    cond: Comparison
+) -> Optional[List[Dict[str, Any]]]:
+    col, op, values = cond.column, cond.op, cond.values
+    if op == "=":
+        return utils.find_rows(table_name, col, values[0])
+    if op == "in":
+        found = []
+        for value in set(values):
+            rows = utils.find_rows(table_name, col, value)
+            if rows is None:
+                return None
+            found.extend(rows)
+        found.sort(key=lambda row: row["ID"])
+        return found
+    low = values[0] if op in (">", ">=", "between") else None
+    high = values[-1] if op in ("<", "<=", "between") else None
+    return utils.find_range(table_name, col, low, high,
+                            low_inclusive=op != ">",
+                            high_inclusive=op != "<")
+
+"""
+Выбранный способ доступа (см. access_path) и записи-кандидаты, найденные
+по индексу или ID. None вместо кандидатов - нужен перебор ("scan" или
+"parallel"), в том числе если индекса нет (кэш не подключен)
+"""
+def access_rows(
+    table_name: str,
+    where: Predicate,
+    table_data: Any = None
+) -> Tuple[str, Optional[List[Dict[str, Any]]]]:
+    kind, cond = access_path(table_name, where, table_data)
+    candidates = None if cond is None else lookup_rows(table_name, cond)
+    if cond is not None and candidates is None:
+        kind = "scan"
+    return kind, candidates
+
+"""
+Генератор записей таблицы, удовлетворяющих условию where.
+Условие приводится к типам столбцов и компилируется в функцию проверки
+один раз на запрос. Если для условия есть индекс, проверяются только
+найденные по нему записи, иначе - все записи таблицы
+(таблица из кэша проверяется сразу по столбцам, см. ColumnarTable.scan).
+Записи выдаются по мере проверки, весь результат не собирается
+"""
+def iter_rows(
+    schema: Schema,
+    table_name: str,
+    table_data: Iterable[Dict[str, Any]],
+    where: Optional[Predicate]
+) -> Iterator[Dict[str, Any]]:
+    if where is None:
+        scanned = 0
+        try:
+            for row in table_data:
+                scanned += 1
+                yield row
+        finally:
+            metrics.add("rows_scanned", scanned)
+        return
+
+    with metrics.phase("cast"):
+        where = bind(where, schema.types, cast_value)
+    with metrics.phase("filter"):
+        kind, candidates = access_rows(table_name, where, table_data)
+    yield from match_rows(table_data, where, candidates, kind == "parallel")
+
+"""
+Записи, удовлетворяющие типизированному условию: из кандидатов по индексу,
+если они есть, иначе - из всей таблицы (parallel_scan=True - таблица
+из кэша проверяется в пуле процессов)
+"""
+def match_rows(
+    table_data: Iterable[Dict[str, Any]],
+    where: Predicate,
+    candidates: Optional[List[Dict[str, Any]]],
+    parallel_scan: bool = False
+) -> Iterator[Dict[str, Any]]:
+    metrics.add("rows_scanned",
+                len(table_data if candidates is None else candidates))
+    if candidates is None and isinstance(table_data, ColumnarTable):
+        # Полный перебор по столбцам: записи создаются только для подходящих
+        return table_data.scan(where, parallel_scan)
+    matcher = compile_matcher(where)
+    rows = table_data if candidates is None else candidates
+    return (row for row in rows if matcher(row))
+
+"""
+Записи таблицы, удовлетворяющие условию where, списком
+"""
+def filter_rows(
+    schema: Schema,
+    table_name: str,
+    table_data: Iterable[Dict[str, Any]],
+    where: Predicate
+) -> List[Dict[str, Any]]:
+    with metrics.phase("filter"):
+        return list(iter_rows(schema, table_name, table_data, where))
+
+"""
+Разбиение потока записей на части по size записей
+"""
+def iter_chunks(
+    rows: Iterable[Dict[str, Any]],
+    size: int
+) -> Iterator[List[Dict[str, Any]]]:
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+"""
+Вывод части записей в выбранном формате (header - с заголовком)
+"""
+def print_chunk(columns: List[str], chunk: List[Dict[str, Any]],
+                header: bool = True) -> None:
+    print_table(columns, ([row.get(col) for col in columns] for row in chunk),
+                header)
+
+"""
+Добавление записи в таблицу.
+Возвращает метаданные с новым счетчиком ID и список построчных операций.
 """
 @handle_db_errors
-@log_time
 def insert(
-    metadata: Dict[str, List[str]], 
+    metadata: Dict[str, Dict[str, Any]], 
     table_name: str, 
     values: List[str]
-) -> Optional[List[Dict[str, Any]]]:
+) -> Optional[Tuple[Dict[str, Dict[str, Any]], List[Dict[str, Any]]]]:
     if table_name not in metadata:
         raise KeyError(table_name)
 
-    schema = metadata[table_name]
-    record_data = validate_and_cast_values(schema, values)
+    schema = get_schema(metadata, table_name)
+    with metrics.phase("cast"):
+        record_data = validate_and_cast_values(schema, values)
 
-    table_data = load_table_data(table_name)
-    new_id = max((row.get("ID", 0) for row in table_data),
-                  default=0) + 1
+    new_metadata, new_id = allocate_ids(metadata, table_name)
     record = {"ID": new_id, **record_data}
-    table_data.append(record)
-    print(f'Запись с ID={new_id} успешно добавлена в таблицу "{table_name}".')
-    return table_data
+    inform(f'Запись с ID={new_id} успешно добавлена в таблицу "{table_name}".')
+    return new_metadata, [row_op("insert", record, schema.version)]
 
 
 """
-Вывод записи таблицы
+Добавление нескольких записей одной операцией.
+Все значения проверяются до записи, ID выделяются одним шагом.
+Возвращает метаданные с новым счетчиком ID и список построчных операций.
+"""
+@handle_db_errors
+def insert_many(
+    metadata: Dict[str, Dict[str, Any]],
+    table_name: str,
+    values_list: List[List[str]]
+) -> Optional[Tuple[Dict[str, Dict[str, Any]], List[Dict[str, Any]]]]:
+    if table_name not in metadata:
+        raise KeyError(table_name)
+
+    schema = get_schema(metadata, table_name)
+    records = []
+    with metrics.phase("cast"):
+        for number, values in enumerate(values_list, 1):
+            try:
+                records.append(validate_and_cast_values(schema, values))
+            except ValueError as e:
+                raise ValueError(f"Набор значений №{number}: {e}")
+
+    new_metadata, first_id = allocate_ids(metadata, table_name, len(records))
+    ops = [
+        row_op("insert", {"ID": first_id + i, **record}, schema.version)
+        for i, record in enumerate(records)
+    ]
+    inform(f'В таблицу "{table_name}" добавлено записей: {len(ops)}\
+           (ID={first_id}..{first_id + len(ops) - 1}).')
+    return new_metadata, ops
+
+"""
+Запись пачки проверенных значений в таблицу с выделением ID.
+Возвращает метаданные с новым счетчиком ID
+"""
+@metrics.timed("save")
+def _write_batch(
+    metadata: Dict[str, Dict[str, Any]],
+    table_name: str,
+    records: List[Dict[str, Any]]
+) -> Dict[str, Dict[str, Any]]:
+    new_metadata, first_id = allocate_ids(metadata, table_name, len(records))
+    version = get_schema(metadata, table_name).version
+    ops = [
+        row_op("insert", {"ID": first_id + i, **record}, version)
+        for i, record in enumerate(records)
+    ]
+    utils.save_metadata(DB_FILE, new_metadata)
+    utils.bulk_append_table_ops(table_name, ops)
+    return new_metadata
+
+"""
+Массовая загрузка записей из CSV/JSONL файла.
+Файл читается потоково, записи проверяются и записываются пачками
+по LOAD_BATCH_SIZE, поэтому объем памяти не зависит от размера файла.
+При ошибке уже записанные пачки сохраняются
+"""
+@handle_db_errors
+def load(
+    metadata: Dict[str, Dict[str, Any]],
+    table_name: str,
+    filepath: str
+) -> None:
+    if table_name not in metadata:
+        raise KeyError(table_name)
+
+    schema = get_schema(metadata, table_name)
+    columns = schema.names[1:]
+    start = time.monotonic()
+    loaded = 0
+    batch = []
+    try:
+        # Чтение файла и проверка значений (запись пачек - отдельная фаза)
+        with metrics.phase("cast"):
+            for line_number, values in read_records(filepath, columns):
+                try:
+                    batch.append(validate_and_cast_values(schema, values))
+                except ValueError as e:
+                    raise ValueError(f"Строка {line_number}: {e}")
+                if len(batch) >= LOAD_BATCH_SIZE:
+                    metadata = _write_batch(metadata, table_name, batch)
+                    loaded += len(batch)
+                    batch = []
+            if batch:
+                metadata = _write_batch(metadata, table_name, batch)
+                loaded += len(batch)
+    finally:
+        elapsed = time.monotonic() - start
+        rate = loaded / elapsed if elapsed > 0 else 0
+        inform(f'Загружено записей в таблицу "{table_name}": {loaded}\
+               за {elapsed:.2f} секунд ({rate:.0f} записей/с).')
+
+
+"""
+Вывод записей таблицы.
+limit/offset ограничивают выборку, page - постраничный вывод с ожиданием ввода
 """
 @handle_db_errors
-@log_time
 def select(
-    metadata: Dict[str, List[str]], 
+    metadata: Dict[str, Dict[str, Any]], 
     table_name: str, 
-    where_clause: Optional[Dict[str, Any]] = None
+    where: Optional[Predicate] = None,
+    limit: Optional[int] = None,
+    offset: int = 0,
+    page: bool = False
 ) -> None:
     if table_name not in metadata:
-        print(f'Ошибка: Таблица "{table_name}" не существует.')
+        report_error(f'Ошибка: Таблица "{table_name}" не существует.')
         return
 
     table_data = load_table_data(table_name)
-    schema = metadata[table_name]
-    columns = [spec.split(":", 1)[0] for spec in schema]
-
-    if where_clause:
-        filtered = []
-        for row in table_data:
-            match = True
-            for col, val in where_clause.items():
-                if str(row.get(col, "")) != str(val):
-                    match = False
-                    break
-            if match:
-                filtered.append(row)
-        table_data = filtered
-
-    if not table_data:
-        print("Нет записей.")
+    schema = get_schema(metadata, table_name)
+    columns = schema.names
+
+    rows = iter_rows(schema, table_name, table_data, where)
+    if offset or limit is not None:
+        rows = islice(rows, offset, None if limit is None else offset + limit)
+
+    # Записи выводятся частями по мере фильтрации, без сбора всего результата
+    chunk_size = SELECT_PAGE_SIZE if page else SELECT_CHUNK_SIZE
+    chunks = iter_chunks(rows, chunk_size)
+    with metrics.phase("filter"):
+        chunk = next(chunks, None)
+    if chunk is None:
+        print_empty(columns)
         return
 
-    pt = PrettyTable()
-    pt.field_names = columns
-    for row in table_data:
-        pt.add_row([row.get(col, "") for col in columns])
-    print(pt)
+    shown = 0
+    while chunk is not None:
+        with metrics.phase("render"):
+            print_chunk(columns, chunk, header=not shown)
+        shown += len(chunk)
+        with metrics.phase("filter"):
+            chunk = next(chunks, None)
+        if page and chunk is not None:
+            import prompt
 
+            answer = prompt.string(f"Показано записей: {shown}. \
+                                   Enter - дальше, q - выход: ", empty=True)
+            if answer is not None and answer.lower() == "q":
+                break
+
+
+"""
+Результаты агрегатов по столбцам таблицы в памяти, без создания записей.
+Без группировки агрегаты считаются по отобранным значениям столбцов,
+с группировкой - сначала собираются позиции каждой группы, затем
+агрегаты считаются по значениям на этих позициях
+"""
+def _aggregate_columns(
+    table: ColumnarTable,
+    aggregates: List[Aggregate],
+    where: Optional[Predicate],
+    group_by: Optional[str],
+    parallel_scan: bool = False
+) -> Dict[Any, List[Any]]:
+    metrics.add("rows_scanned", len(table))
+    selection = table.selection(where, parallel_scan)
+    columns = [
+        (None, False) if agg.column == "*" else table.column(agg.column)
+        for agg in aggregates
+    ]
+    if group_by is None:
+        count = sum(selection)
+        return {None: [
+            count if values is None else aggregate_values(
+                agg.func, compress(values, selection), count, nullable
+            )
+            for agg, (values, nullable) in zip(aggregates, columns)
+        ]}
+
+    keys, _ = table.column(group_by)
+    groups = group_positions(keys, selection)
+    # Для выборки по позициям нужны индексируемые последовательности
+    columns = [
+        (values if values is None or isinstance(values, (list, array))
+         else list(values), nullable)
+        for values, nullable in columns
+    ]
+    return {
+        key: [
+            len(positions) if values is None else aggregate_values(
+                agg.func, map(values.__getitem__, positions),
+                len(positions), nullable
+            )
+            for agg, (values, nullable) in zip(aggregates, columns)
+        ]
+        for key, positions in groups.items()
+    }
 
 """
-Обновление записи по условию
+Агрегатный запрос: count/sum/min/max/avg по записям, удовлетворяющим where,
+всего или по группам значений столбца group_by.
+Результат считается за один проход без сбора записей; условие where
+использует индекс, если он есть, таблица из кэша считается по столбцам
+"""
+@handle_db_errors
+def aggregate(
+    metadata: Dict[str, Dict[str, Any]],
+    table_name: str,
+    aggregates: List[Aggregate],
+    where: Optional[Predicate] = None,
+    group_by: Optional[str] = None,
+    limit: Optional[int] = None,
+    offset: int = 0
+) -> None:
+    if table_name not in metadata:
+        report_error(f'Ошибка: Таблица "{table_name}" не существует.')
+        return
+
+    types = get_schema(metadata, table_name).types
+    for agg in aggregates:
+        if agg.column != "*" and agg.column not in types:
+            raise KeyError(agg.column)
+        if agg.func in NUMERIC_FUNCTIONS and types[agg.column] != "int":
+            raise ValueError(f"Функция {agg.func} применима только \
+                             к столбцам типа int, {agg.column}: {types[agg.column]}")
+    if group_by is not None and group_by not in types:
+        raise KeyError(group_by)
+
+    table_data = load_table_data(table_name)
+    kind, candidates = "scan", None
+    if where is not None:
+        with metrics.phase("cast"):
+            where = bind(where, types, cast_value)
+        with metrics.phase("filter"):
+            kind, candidates = access_rows(table_name, where, table_data)
+
+    with metrics.phase("filter"):
+        if candidates is None and isinstance(table_data, ColumnarTable):
+            groups = _aggregate_columns(table_data, aggregates, where, group_by,
+                                        kind == "parallel")
+        else:
+            if where is None:
+                metrics.add("rows_scanned", len(table_data))
+            rows = table_data if where is None else match_rows(
+                table_data, where, candidates
+            )
+            groups = accumulate((
+                (row.get(group_by) if group_by else None,
+                 *(1 if agg.column == "*" else row.get(agg.column)
+                   for agg in aggregates))
+                for row in rows
+            ), aggregates)
+
+    if group_by is None and not groups:
+        groups = {None: [Accumulator(agg.func).result() for agg in aggregates]}
+    columns = ([group_by] if group_by else []) + [str(agg) for agg in aggregates]
+    if not groups:
+        print_empty(columns)
+        return
+
+    with metrics.phase("render"):
+        keys = sorted(groups, key=group_order)
+        if offset or limit is not None:
+            keys = keys[offset:None if limit is None else offset + limit]
+        print_table(columns, (
+            ([key] if group_by else []) + [
+                round(value, 4) if isinstance(value, float) else value
+                for value in groups[key]
+            ]
+            for key in keys
+        ))
+
+
+"""
+Обновление записи по условию (столбец ID не изменяется - по нему
+находятся записи).
+Возвращает список построчных операций для хранилища.
 """
 @handle_db_errors
 def update(
-    metadata: Dict[str, List[str]], 
+    metadata: Dict[str, Dict[str, Any]], 
     table_name: str, 
     set_clause: Dict[str, str], 
-    where_clause: Dict[str, Any]
+    where: Predicate
 ) -> Optional[List[Dict[str, Any]]]:
     if table_name not in metadata:
         raise KeyError(table_name)
 
     table_data = load_table_data(table_name)
-    schema_dict = {
-        spec.split(":", 1)[0]: spec.split(":", 1)[1]
-        for spec in metadata[table_name]
-    }
+    schema = get_schema(metadata, table_name)
 
     validated_set = {}
-    for col, val_str in set_clause.items():
-        if col not in schema_dict:
-            raise KeyError(col)
-        validated_set[col] = cast_value(val_str, schema_dict[col])
-
-    updated = False
-    for row in table_data:
-        match = True
-        for col, val in where_clause.items():
-            if str(row.get(col, "")) != str(val):
-                match = False
-                break
-        if match:
-            for col, new_val in validated_set.items():
-                row[col] = new_val
-            updated = True
-            print(f'Запись с ID={row["ID"]} в таблице\
-                   "{table_name}" успешно обновлена.')
+    with metrics.phase("cast"):
+        for col, val_str in set_clause.items():
+            if col not in schema.types:
+                raise KeyError(col)
+            if col == "ID":
+                # Записи находятся по ID: смена ID перезаписала бы другую запись
+                raise ValueError("Столбец ID нельзя изменить: \
+                                 ID выдаются счетчиком таблицы.")
+            validated_set[col] = cast_value(val_str, schema.types[col])
 
-    if not updated:
-        print("Ни одна запись не соответствует условию.")
+    ops = []
+    for row in filter_rows(schema, table_name, table_data, where):
+        ops.append(row_op("update", {**row, **validated_set}, schema.version))
+        inform(f'Запись с ID={row["ID"]} в таблице\
+               "{table_name}" успешно обновлена.')
 
-    return table_data if updated else None
+    if not ops:
+        inform("Ни одна запись не соответствует условию.")
+
+    return ops or None
 
 
 """
-Удаление записи по условию
+Удаление записи по условию.
+Возвращает список построчных операций для хранилища.
 """
 @handle_db_errors
 @confirm_action("удаление записи")
 def delete(
-    metadata: Dict[str, List[str]], 
+    metadata: Dict[str, Dict[str, Any]], 
     table_name: str, 
-    where_clause: Dict[str, Any]
+    where: Predicate
 ) -> Optional[List[Dict[str, Any]]]:
     if table_name not in metadata:
         raise KeyError(table_name)
 
     table_data = load_table_data(table_name)
-    new_table_data = []
-    deleted = False
-
-    for row in table_data:
-        match = True
-        for col, val in where_clause.items():
-            if str(row.get(col, "")) != str(val):
-                match = False
-                break
-        if match:
-            deleted = True
-            print(f'Запись с ID={row["ID"]} \
-                  успешно удалена из таблицы "{table_name}".')
+    ops = []
+
+    for row in filter_rows(get_schema(metadata, table_name), table_name,
+                           table_data, where):
+        ops.append({"op": "delete", "ID": row["ID"]})
+        inform(f'Запись с ID={row["ID"]} \
+              успешно удалена из таблицы "{table_name}".')
+
+    if not ops:
+        inform("Ни одна запись не соответствует условию.")
+
+    return ops or None
+
+
+"""
+Статистика столбцов таблицы: оценка числа различных значений, число
+пропусков и min/max (по статистике, без перебора таблицы)
+"""
+def print_column_stats(schema: Schema, stats: Any) -> None:
+    rows = []
+    for name, _ in schema.data_columns:
+        column = stats.columns.get(name)
+        if column is None:
+            rows.append([name, 0, stats.rows, None, None])
         else:
-            new_table_data.append(row)
+            rows.append([name, column.distinct(), max(stats.rows - column.count, 0),
+                         column.min, column.max])
+    print_table(["Столбец", "Различных (оценка)", "Пропусков", "Минимум",
+                 "Максимум"], rows)
+
+"""
+Вывод информации о таблице. Число записей и статистика столбцов берутся
+из статистики таблицы, сама таблица не читается
+"""
+@handle_db_errors
+def info(metadata: Dict[str, Dict[str, Any]], table_name: str) -> None:
+    if table_name not in metadata:
+        raise KeyError(table_name)
 
-    if not deleted:
-        print("Ни одна запись не соответствует условию.")
+    schema = get_schema(metadata, table_name)
+    stats = utils.table_stats(table_name)
+    print(f"Таблица: {table_name}")
+    print(f"Столбцы: {', '.join(schema.columns)}")
+    if schema.version > 1:
+        print(f"Версия схемы: {schema.version} (изменений: "
+              f"{len(metadata[table_name].get('changes', []))})")
+    print(f"Количество записей: {stats.rows}")
+    print(f"Последний выданный ID: {metadata[table_name]['sequence']}")
+    print(f"Формат хранения: {format_name(*utils.table_format(table_name))}")
+    indexes = utils.table_indexes(table_name)
+    if indexes:
+        print("Индексы: " + ", ".join(
+            f"{column} ({kind})" for column, kind in indexes.items()
+        ))
+    else:
+        print("Индексы: нет")
+    if schema.data_columns:
+        print_column_stats(schema, stats)
 
-    return new_table_data if deleted else None
+"""
+Пересчет статистики таблицы по ее записям. Удаление и изменение записей
+не сужают min/max и оценку различных значений, после них статистика
+уточняется этой командой
+"""
+@handle_db_errors
+def analyze(metadata: Dict[str, Dict[str, Any]], table_name: str) -> None:
+    if table_name not in metadata:
+        raise KeyError(table_name)
 
+    start = time.perf_counter()
+    stats = utils.analyze_table(table_name)
+    elapsed = (time.perf_counter() - start) * 1000
+    inform(f'Статистика таблицы "{table_name}" пересчитана: записей '
+           f'{stats.rows}, {elapsed:.0f} мс.')
+    print_column_stats(get_schema(metadata, table_name), stats)
 
 """
-Вывод информации о таблице
+План команды select/update/delete: нормализованный текст и кэш планов,
+способ доступа к записям (полный или параллельный перебор, индекс или
+поиск по ID) с оценками стоимости способов, условия, проверяемые после
+него, и оценка числа записей. Записи, найденные по индексу, считаются
+точно, доля остальных условий оценивается по статистике таблицы
 """
 @handle_db_errors
-def info(metadata: Dict[str, List[str]], table_name: str) -> None:
+def explain(metadata: Dict[str, Dict[str, Any]], plan: Plan) -> None:
+    if plan.command == "insert":
+        raise ValueError("explain поддерживает select, update и delete.")
+    table_name = plan.table
     if table_name not in metadata:
         raise KeyError(table_name)
 
-    schema = metadata[table_name]
+    where = plan.where
+    if where is not None:
+        where = bind(where, get_schema(metadata, table_name).types, cast_value)
     table_data = load_table_data(table_name)
-    print(f"Таблица: {table_name}")
-    print(f"Столбцы: {', '.join(schema)}")
-    print(f"Количество записей: {len(table_data)}")
\ No newline at end of file
+    stats = utils.table_stats(table_name)
+    total = stats.rows
+    kind, cond, plans = "scan", None, []
+    if where is not None:
+        kind, cond = access_path(table_name, where, table_data)
+        if kind != "id":
+            plans = access_plans(table_name, where, table_data)
+    found = total
+    if cond is not None:
+        candidates = lookup_rows(table_name, cond)
+        if candidates is None:
+            kind, cond = "scan", None
+        else:
+            found = len(candidates)
+    rest = [] if where is None else [
+        item for item in conjuncts(where) if item is not cond
+    ]
+    check = None if not rest else rest[0] if len(rest) == 1 else And(rest)
+    # Найденные записи дают оценку не меньше одной
+    estimate = max(round(found * estimate_selectivity(check, stats)),
+                   min(found, 1))
+    if plan.command == "select":
+        estimate = max(estimate - plan.offset, 0)
+        if plan.limit is not None:
+            estimate = min(estimate, plan.limit)
+
+    if plan.key is None:
+        print("План: без кэша")
+    else:
+        print(f"План: {plan.key}")
+        print(f"Кэш планов: {'найден' if plan.cached else 'новый план'} \
+(планов: {len(plan_cache)} из {plan_cache.max_plans}, \
+попаданий: {plan_cache.hits}, промахов: {plan_cache.misses})")
+    print(f"Таблица: {table_name} (записей: {total})")
+    access = ACCESS_NAMES[kind]
+    if kind in ("hash", "sorted"):
+        access += f" по столбцу {cond.column}"
+    print(f"Доступ: {access}" + (f" ({cond}), записей: {found}" if cond else ""))
+    if len(plans) > 1:
+        print("Стоимость (оценка, мкс): " + ", ".join(
+            ACCESS_NAMES[option] + (f" ({option_cond})" if option_cond else "")
+            + f" - {cost:.0f}" for cost, option, option_cond in plans
+        ))
+    if check is not None:
+        print(f"Проверка условия: {check}")
+    if plan.command == "aggregate":
+        print(f"Агрегаты: {', '.join(map(str, plan.aggregates))}"
+              + (f", группировка по {plan.group_by}" if plan.group_by else ""))
+    print(f"Оценка числа записей: {estimate}")
+
+"""
+Выгрузка записей таблицы в JSON файл - массив записей, как в файле
+таблицы формата json (для переноса таблицы между форматами).
+Файл записывается атомарно: прерванная выгрузка не оставляет обрезанный файл
+"""
+@handle_db_errors
+def export_table(
+    metadata: Dict[str, Dict[str, Any]],
+    table_name: str,
+    filepath: str
+) -> None:
+    if table_name not in metadata:
+        raise KeyError(table_name)
+
+    rows = list(load_table_data(table_name))
+    with atomic_write(filepath) as f:
+        json.dump(rows, f, ensure_ascii=False, indent=2)
+    inform(f'Записи таблицы "{table_name}" выгружены в {filepath}: {len(rows)}.')
+
+"""
+Проверка записи из импортируемого файла: целый уникальный ID
+и значения всех столбцов схемы нужных типов (кроме столбцов,
+добавленных alter_table без значения по умолчанию)
+"""
+def validate_record(schema: Schema, record: Any,
+                    seen: Set[int]) -> Dict[str, Any]:
+    types = schema.types
+    if not isinstance(record, dict):
+        raise ValueError("Ожидается объект с полями записи.")
+    optional = {name for name, value in schema.defaults.items() if value is None}
+    if not set(types) - optional <= set(record) <= set(types):
+        raise ValueError(f"Поля записи {', '.join(record)} не совпадают \
+                         со столбцами таблицы {', '.join(types)}.")
+    for name, typ in types.items():
+        if name in record and type(record[name]).__name__ != typ:
+            raise ValueError(f'Значение столбца "{name}" должно иметь тип {typ}.')
+    if record["ID"] in seen:
+        raise ValueError(f"Повторяющийся ID={record['ID']}.")
+    seen.add(record["ID"])
+    return record
+
+"""
+Загрузка записей из JSON файла (результат export или файл таблицы формата
+json) в пустую таблицу с сохранением ID. Записи пишутся в формате таблицы.
+Возвращает метаданные (счетчик ID не меньше наибольшего ID) и записи
+"""
+@handle_db_errors
+def import_table(
+    metadata: Dict[str, Dict[str, Any]],
+    table_name: str,
+    filepath: str
+) -> Optional[Tuple[Dict[str, Dict[str, Any]], List[Dict[str, Any]]]]:
+    if table_name not in metadata:
+        raise KeyError(table_name)
+    if len(load_table_data(table_name)):
+        raise ValueError(f'Таблица "{table_name}" не пуста: \
+                         импорт возможен только в пустую таблицу.')
+
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            records = json.load(f)
+    except FileNotFoundError:
+        raise ValueError(f"Файл {filepath} не найден.")
+    if isinstance(records, dict):
+        # Файл таблицы формата json после изменений схемы
+        records = records.get("rows")
+    if not isinstance(records, list):
+        raise ValueError(f"Файл {filepath}: ожидается JSON массив записей.")
+
+    schema = get_schema(metadata, table_name)
+    seen: Set[int] = set()
+    rows = []
+    with metrics.phase("cast"):
+        for number, record in enumerate(records, 1):
+            try:
+                rows.append(validate_record(schema, record, seen))
+            except ValueError as e:
+                raise ValueError(f"Запись №{number}: {e}")
+
+    new_metadata = metadata.copy()
+    new_metadata[table_name] = {
+        **metadata[table_name],
+        "sequence": max([metadata[table_name]["sequence"], *seen]),
+    }
+    inform(f'В таблицу "{table_name}" импортировано записей: {len(rows)}.')
+    return new_metadata, rows
+
+"""
+Сворачивание журнала изменений таблицы в снапшот
+"""
+@handle_db_errors
+def compact(metadata: Dict[str, Dict[str, Any]], table_name: str) -> None:
+    if table_name not in metadata:
+        raise KeyError(table_name)
+
+    utils.compact_table_data(table_name)
+    inform(f'Журнал таблицы "{table_name}" свернут.')
+
+"""
+Резервная копия всей базы в архив filepath (tar + gzip) под разделяемыми
+блокировками всех таблиц: изменения других процессов ждут окончания
+копирования. incremental=True - в архив попадают только таблицы,
+изменившиеся после прошлой копии
+"""
+@handle_db_errors
+def backup(metadata: Dict[str, Dict[str, Any]], filepath: str,
+           incremental: bool = False) -> None:
+    start = time.perf_counter()
+    with locks.holding_tables(list(metadata)):
+        manifest = utils.backup_database(filepath, metadata, incremental)
+    elapsed = time.perf_counter() - start
+
+    tables = manifest["tables"]
+    copied = sum(1 for entry in tables.values() if entry["archive"] is None)
+    inform(f"Копия базы записана в {filepath}: таблиц - {len(tables)}, \
+           скопировано - {copied}, из прошлых копий - {len(tables) - copied}, \
+           размер архива - {os.path.getsize(filepath)} байт, {elapsed:.3f} с.")
+
+"""
+Восстановление базы из копии filepath. Архив распаковывается
+во временный каталог и проверяется по контрольным суммам до изменения
+файлов базы, затем под исключительными блокировками всех таблиц базы
+и копии файлы заменяются (utils.restore_database)
+"""
+@handle_db_errors
+@confirm_action("восстановление базы из копии")
+def restore(metadata: Dict[str, Dict[str, Any]], filepath: str) -> None:
+    from src.primitive_db.backup import abandon_restore, read_backup
+
+    staging, manifest, catalog = read_backup(filepath)
+    try:
+        with locks.holding_tables([*{*metadata, *manifest["tables"]}],
+                                  exclusive=True):
+            utils.restore_database(DB_FILE, staging, manifest, catalog,
+                                   list(metadata))
+    except BaseException:
+        abandon_restore(staging)
+        raise
+    inform(f"База восстановлена из копии {filepath} от {manifest['created']}: \
+           таблиц - {len(catalog)}.")
+
+
+"""
+Создание индекса по столбцу таблицы
+"""
+@handle_db_errors
+def create_index(
+    metadata: Dict[str, Dict[str, Any]],
+    table_name: str,
+    column: str,
+    kind: str = "hash"
+) -> None:
+    if table_name not in metadata:
+        raise KeyError(table_name)
+    if column not in get_schema(metadata, table_name).types:
+        raise KeyError(column)
+    if kind not in INDEX_KINDS:
+        raise ValueError(f"Неизвестный вид индекса: {kind}. \
+                         Доступные: {', '.join(INDEX_KINDS)}")
+
+    utils.create_index(table_name, column, kind)
+    inform(f'Индекс ({kind}) по столбцу "{column}" таблицы\
+           "{table_name}" успешно создан.')
+
+"""
+Удаление индекса по столбцу таблицы
+"""
+@handle_db_errors
+def drop_index(
+    metadata: Dict[str, Dict[str, Any]],
+    table_name: str,
+    column: str
+) -> None:
+    if table_name not in metadata:
+        raise KeyError(table_name)
+
+    utils.drop_index(table_name, column)
+    inform(f'Индекс по столбцу "{column}" таблицы "{table_name}" успешно удален.')
+
+"""
+Просмотр и установка уровня надежности записи на диск для сессии
+"""
+@handle_db_errors
+def durability(level: Optional[str] = None) -> None:
+    if level is not None:
+        set_durability(level)
+    print(f"Уровень надежности записи: {get_durability()}")
+
+"""
+Просмотр и установка числа процессов перебора таблиц без индекса для сессии
+"""
+@handle_db_errors
+def scan_workers(count: Optional[int] = None) -> None:
+    if count is not None:
+        parallel.set_workers(count)
+    workers = parallel.get_workers()
+    if workers == 1:
+        print("Перебор без индекса: последовательно (1 процесс)")
+    else:
+        print(f"Перебор без индекса: процессов - {workers} (если по оценке \
+стоимости параллельный перебор дешевле последовательного)")
+
+"""
+Метрики производительности за сессию по командам: число вызовов, среднее
+время и квантили по гистограмме, среднее собственное время фаз
+и счетчики записей и байт
+"""
+@handle_db_errors
+def stats() -> None:
+    if not metrics.is_enabled():
+        print("Сбор метрик отключен (METRICS = False).")
+        return
+    data = metrics.snapshot()
+    if not data:
+        print("Метрик еще нет.")
+        return
+
+    latency, phases, counters = [], [], []
+    for command, item in sorted(data.items()):
+        hist = item.latency
+        latency.append([command, hist.count, *(
+            round(seconds * 1000, 3) for seconds in (
+                hist.mean(), hist.quantile(0.5), hist.quantile(0.95),
+                hist.quantile(0.99), hist.max,
+            )
+        )])
+        # Среднее на вызов команды (фаза могла быть не в каждом вызове)
+        spent = [item.phases[name].total if name in item.phases else 0.0
+                 for name in metrics.PHASES]
+        other = max(hist.total - sum(spent), 0.0)
+        phases.append([command, *(round(seconds * 1000 / hist.count, 3)
+                                  for seconds in [*spent, other])])
+        counters.append([command, *(item.counters[name]
+                                    for name in metrics.COUNTERS)])
+    print_table(["Команда", "Вызовов", "Среднее, мс", "p50, мс", "p95, мс",
+                 "p99, мс", "Максимум, мс"], latency)
+    print_table(["Команда", *(f"{metrics.PHASE_NAMES[name]}, мс"
+                              for name in metrics.PHASES), "прочее, мс"], phases)
+    print_table(["Команда", *metrics.COUNTER_NAMES.values()], counters)
+
+"""
+Сброс метрик сессии
+"""
+@handle_db_errors
+def reset_stats() -> None:
+    metrics.reset()
+    inform("Метрики сброшены.")
+
+"""
+Запись метрик в файл: JSON для *.json, иначе текстовый формат Prometheus
+"""
+@handle_db_errors
+def dump_stats(filepath: str) -> None:
+    utils.save_metrics(filepath)
+    inform(f"Метрики записаны в {filepath}.")
+
+"""
+Статистика блокировок за сессию: сколько раз получены, сколько раз
+и как долго пришлось ждать, пока их отпустят другие процессы
+"""
+@handle_db_errors
+def lock_stats() -> None:
+    if not locks.is_enabled():
+        print("Блокировки отключены (LOCKING = False или нет модуля fcntl).")
+        return
+    stats = locks.lock_stats()
+    if not stats:
+        print("Блокировки еще не запрашивались.")
+        return
+    print_table(["Блокировка", "Получена", "С ожиданием", "Ожидание, с",
+                 "Максимум, с"], (
+        [path, item.acquired, item.waited,
+         round(item.wait_total, 5), round(item.wait_max, 5)]
+        for path, item in sorted(stats.items())
+    ))
+
+"""
+Начало транзакции: изменения insert/update/delete копятся в памяти
+"""
+@handle_db_errors
+def begin() -> None:
+    utils.begin_transaction()
+    inform("Транзакция начата.")
+
+"""
+Фиксация транзакции: все изменения записываются на диск вместе
+"""
+@handle_db_errors
+def commit() -> None:
+    tables = utils.commit_transaction()
+    inform(f"Транзакция зафиксирована (изменено таблиц: {tables}).")
+
+"""
+Отмена транзакции: изменения, сделанные после begin, отбрасываются
+"""
+@handle_db_errors
+def rollback() -> None:
+    utils.rollback_transaction()
+    inform("Транзакция отменена.")
@@ -1,7 +1,26 @@
-import time
+import sys
 from typing import Callable
 
-import prompt
+from src.primitive_db.output import inform, report_error
+
+# Подтверждать опасные действия автоматически (флаг --yes)
+_assume_yes = False
+# Можно ли спросить подтверждение у пользователя (в режиме сервера - нет)
+_prompts = True
+
+"""
+Включение автоматического подтверждения действий
+"""
+def set_assume_yes(value: bool) -> None:
+    global _assume_yes
+    _assume_yes = value
+
+"""
+Разрешение и запрет вопросов пользователю (подтверждений)
+"""
+def set_prompts(enabled: bool) -> None:
+    global _prompts
+    _prompts = enabled
 
 """
 Обработка ошибок
@@ -11,41 +30,40 @@ def handle_db_errors(func: Callable) -> Callable:
         try:
             return func(*args, **kwargs)
         except FileNotFoundError:
-            print("Ошибка: Файл данных не найден. \
+            report_error("Ошибка: Файл данных не найден. \
                   Возможно, база данных не инициализирована.")
         except KeyError as e:
-            print(f"Ошибка: Таблица или столбец {e} не найден.")
+            report_error(f"Ошибка: Таблица или столбец {e} не найден.")
         except ValueError as e:
-            print(f"Ошибка валидации: {e}")
+            report_error(f"Ошибка валидации: {e}")
         except Exception as e:
-            print(f"Произошла непредвиденная ошибка: {e}")
+            report_error(f"Произошла непредвиденная ошибка: {e}")
         except UnboundLocalError as e:
-            print(f"Произошла непредвиденная ошибка: {e}")
+            report_error(f"Произошла непредвиденная ошибка: {e}")
     return wrapper
 
 """
-Подтверждение действия
+Подтверждение действия.
+С флагом --yes действие подтверждается автоматически; если ввод
+не с терминала (сценарий) или вопросы запрещены (сервер), спросить
+некого - действие отменяется с ошибкой
 """
 def confirm_action(action_name: str) -> Callable:
     def decorator(func: Callable) -> Callable:
         def wrapper(*args, **kwargs):
+            if _assume_yes:
+                return func(*args, **kwargs)
+            if not _prompts or not sys.stdin.isatty():
+                report_error(f'Действие "{action_name}" требует подтверждения: \
+                             запустите с флагом --yes.')
+                return None
+            import prompt
+
             answer = prompt.string(f'Вы уверены,\
                                     что хотите выполнить "{action_name}"? [y/n]: ')
             if answer.lower() == 'y':
                 return func(*args, **kwargs)
             else:
-                print("Операция отменена.")
+                inform("Операция отменена.")
         return wrapper
     return decorator
-
-"""
-Логирование времени выполнения
-"""
-def log_time(func: Callable) -> Callable:
-    def wrapper(*args, **kwargs):
-        start = time.monotonic()
-        result = func(*args, **kwargs)
-        end = time.monotonic()
-        print(f'Функция {func.__name__} выполнилась за {end - start:.5f} секунд.')
-        return result
-    return wrapper
\ No newline at end of file
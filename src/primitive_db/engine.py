@@ -1,8 +1,30 @@
-import shlex
-from typing import Dict
-
-from src.primitive_db import core, utils
-from src.primitive_db.constants import DB_FILE
+import os
+import sys
+from typing import Iterable, List, Optional, Tuple
+
+from src.primitive_db import core, locks, metrics, utils
+from src.primitive_db.cache import TableCache
+from src.primitive_db.constants import DB_FILE, METRICS_FILE
+from src.primitive_db.output import error_count, inform, is_quiet, report_error
+from src.primitive_db.planner import Plan, plan_statement, split_command
+from src.primitive_db.recovery import check_files
+from src.primitive_db.schema import get_schema
+
+# Команды, которые пишут на диск в обход транзакции (create_table и drop_table
+# сразу создают и удаляют файлы таблицы, а rollback отменяет только метаданные)
+TRANSACTION_BLOCKED = ("create_table", "drop_table", "load", "import",
+                       "create_index", "drop_index", "compact", "backup", "restore")
+# Команды, изменяющие метаданные (список таблиц или счетчик ID)
+METADATA_WRITERS = ("create_table", "drop_table", "alter_table", "insert", "load",
+                    "import", "restore")
+# Команды, работающие со всей базой: блокировки всех таблиц берут сами
+# (locks.holding_tables), в режиме сервера выполняются без других команд
+DATABASE_COMMANDS = ("backup", "restore")
+# Команды, читающие и изменяющие данные таблицы
+TABLE_READERS = ("select", "info", "analyze", "export", "explain")
+TABLE_WRITERS = ("create_table", "drop_table", "alter_table", "insert", "load",
+                 "import", "update", "delete", "create_index", "drop_index",
+                 "compact")
 
 """
 Приветственное сообщение (старая версия)
@@ -28,55 +50,204 @@ def welcome():
 def print_help():
     print("\n***Процесс работы с таблицей***")
     print("Функции:")
-    print("<command> create_table <имя_таблицы> <столбец1:тип> .. - создать таблицу")
+    print("<command> create_table <имя_таблицы> <столбец1:тип> .. \
+          [--format json|binary] [--compression none|zlib|lzma] - создать таблицу")
     print("<command> list_tables - показать список всех таблиц")
     print("<command> drop_table <имя_таблицы> - удалить таблицу")
+    print("<command> alter_table <имя_таблицы> add <столбец:тип> [default <значение>]\
+          | drop <столбец> | rename <столбец> <новое_имя> - изменить схему таблицы")
     
     print("\nРабота с записями:")
     print("<command> insert into <имя_таблицы> values \
           (<значение1>, <значение2>, ...) - создать запись")
+    print("<command> insert into <имя_таблицы> values \
+          (...), (...), ... - создать несколько записей")
+    print("<command> load <имя_таблицы> <файл.csv|файл.jsonl> \
+          - загрузить записи из файла")
     print("<command> select from <имя_таблицы> where \
           <столбец> = <значение> - прочитать записи по условию")
     print("<command> select from <имя_таблицы> - прочитать все записи")
+    print("<command> select from <имя_таблицы> [where ...] [limit N] [offset M] \
+          [--page] - прочитать часть записей / постранично")
+    print("<command> select count(*), sum|min|max|avg(<столбец>), ... from \
+          <имя_таблицы> [where ...] [group by <столбец>] - агрегаты")
     print("<command> update <имя_таблицы> set <столбец1> = <новое_значение1> \
           where <столбец_условия> = <значение_условия> - обновить запись")
     print("<command> delete from <имя_таблицы> where\
            <столбец> = <значение> - удалить запись")
-    print("<command> info <имя_таблицы> - вывести информацию о таблице")
+    print("<command> info <имя_таблицы> - вывести информацию о таблице \
+          и статистику столбцов")
+    print("<command> analyze <имя_таблицы> - пересчитать статистику таблицы")
+    print("<command> explain <select|update|delete ...> - план команды: \
+          способ доступа (перебор, индекс, поиск по ID), оценки его стоимости \
+          и числа записей")
+    print("<command> export <имя_таблицы> <файл.json> - выгрузить записи в JSON")
+    print("<command> import <имя_таблицы> <файл.json> - загрузить записи из JSON \
+          в пустую таблицу (с их ID)")
+    print("Условия where: =, !=, <, >, <=, >=, in (...), not in (...), \
+          between .. and .., связки and/or и скобки")
+    print("<command> create_index <имя_таблицы> <столбец> [hash|sorted] \
+          - создать индекс по столбцу")
+    print("<command> drop_index <имя_таблицы> <столбец> - удалить индекс")
+    print("<command> compact <имя_таблицы> - свернуть журнал изменений таблицы")
+    print("<command> backup <файл> [--incremental] - резервная копия базы \
+          в архив tar.gz (--incremental - только измененные таблицы)")
+    print("<command> restore <файл> - восстановить базу из копии \
+          (с проверкой контрольных сумм)")
+    print("<command> durability [off|normal|full] - надежность записи на диск \
+          (off - быстрее, для массовой загрузки)")
+    print("<command> parallel [N] - число процессов перебора больших таблиц \
+          без индекса (1 - последовательно)")
+
+    print("\nТранзакции:")
+    print("<command> begin - начать транзакцию")
+    print("<command> commit - записать изменения транзакции на диск")
+    print("<command> rollback - отменить изменения транзакции")
+    print("<command> locks - статистика ожидания блокировок других процессов")
 
     print("\nОбщие команды:")
+    print("<command> stats [reset | dump <файл>] - метрики производительности \
+          команд (dump - в JSON для *.json, иначе в формате Prometheus)")
     print("<command> exit - выход из программы")
     print("<command> help - справочная информация\n")
 
 """
-Парсинг строки вида 'age = 28'.
-Возвращает словарь вида {'age': '28'}.
+Разбор параметров формата команды create_table: --format json|binary
+и --compression none|zlib|lzma (сжатие без --format означает binary).
+Возвращает оставшиеся аргументы (столбцы), формат и сжатие
+"""
+@metrics.timed("parse")
+def parse_table_options(args: List[str]) -> Tuple[List[str], str, str]:
+    rest = []
+    options = {}
+    items = iter(args)
+    for arg in items:
+        if arg in ("--format", "--compression"):
+            value = next(items, None)
+            if value is None:
+                raise ValueError(f"Не указано значение {arg}.")
+            options[arg] = value
+        else:
+            rest.append(arg)
+    compression = options.get("--compression", "none")
+    default_format = "json" if compression == "none" else "binary"
+    return rest, options.get("--format", default_format), compression
+
+"""
+План команды select/insert/update/delete (см. planner.py).
+Ошибка синтаксиса выводится, результат - None
 """
-def parse_where_or_set(clause: str) -> Dict[str, str]:
-    clause = clause.strip()
-    if ' = ' not in clause:
-        raise ValueError(f"Некорректный формат условия: {clause}. \
-                         Ожидается 'ключ = значение'.")
+def statement_plan(args: List[str]) -> Optional[Plan]:
+    try:
+        return plan_statement(args)
+    except ValueError as e:
+        report_error(str(e))
+        return None
 
-    key, value = clause.split(' = ', 1)
-    key = key.strip()
-    value = value.strip()
+"""
+Имя таблицы, с которой работает команда (None, если его нет в аргументах)
+"""
+def command_table(args: List[str]) -> Optional[str]:
+    command = args[0]
+    if command == "explain":
+        return command_table(args[1:]) if len(args) > 1 else None
+    if command in ("select", "insert", "delete"):
+        keyword = "into" if command == "insert" else "from"
+        if keyword not in args:
+            return None
+        pos = args.index(keyword) + 1
+    else:
+        pos = 1
+    return args[pos] if pos < len(args) else None
 
-    if not key:
-        raise ValueError(f"Ключ не может быть пустым в: {clause}")
+"""
+Блокировки, нужные команде: пары (файл блокировки, исключительная).
+Порядок всегда один - метаданные, таблица, журнал транзакции, -
+поэтому команды разных процессов не ждут друг друга по кругу
+"""
+def command_locks(args: List[str]) -> List[Tuple[str, bool]]:
+    command = args[0]
+    plan = []
+    if command in METADATA_WRITERS:
+        plan.append((locks.METADATA_LOCK, True))
+    if command in TABLE_READERS or command in TABLE_WRITERS:
+        table_name = command_table(args)
+        # Имя с разделителем каталогов или точкой в начале указало бы файл
+        # блокировки вне data/ - такую команду отклонит проверка имени таблицы
+        if table_name and not table_name.startswith(".") and \
+                os.path.basename(table_name) == table_name:
+            plan.append((locks.table_lock(table_name), command in TABLE_WRITERS))
+    if command in ("commit", "alter_table"):
+        plan.append((locks.JOURNAL_LOCK, True))
+    elif command == "backup":
+        # Таблицы и журнал блокирует core.backup по списку таблиц
+        plan.append((locks.METADATA_LOCK, False))
+    return plan
 
-    if not key.replace('_', '').isalnum():
-        raise ValueError(f"Некорректное имя столбца: {key}")
+"""
+Открытие сессии: проверка файлов базы (под исключительной блокировкой,
+после завершения команд других процессов), кэш таблиц, перевод метаданных
+в новый формат. reload_metadata=False - метаданные читаются один раз
+за сессию (сценарий - единственный, кто их меняет)
+"""
+def start_session(reload_metadata: bool = True) -> TableCache:
+    cache = TableCache(reload_metadata=reload_metadata)
+    utils.use_cache(cache)
+    try:
+        locks.lock_database()
+    except ValueError as e:
+        locks.release_all()
+        report_error(f"Проверка файлов базы пропущена: {e}")
+        return cache
+    try:
+        problems = check_files(DB_FILE)
+        if problems:
+            print("Проверка файлов базы:", file=sys.stderr)
+            for problem in problems:
+                print(f"  {problem}", file=sys.stderr)
+        if utils.migrate_metadata(DB_FILE):
+            inform("Метаданные переведены в новый формат (добавлены счетчики ID).")
+    finally:
+        locks.release_all()
+    return cache
 
-    return {key: value}
+"""
+Закрытие сессии: незавершенная транзакция отменяется,
+остальные изменения записываются на диск
+"""
+def end_session(cache: TableCache) -> None:
+    if cache.in_transaction:
+        cache.rollback()
+        report_error("Незавершенная транзакция отменена.")
+    cache.flush()
+    locks.release_all()
+    utils.use_cache(None)
+    if METRICS_FILE and metrics.is_enabled():
+        try:
+            utils.save_metrics(METRICS_FILE)
+        except OSError as e:
+            report_error(f"Не удалось записать метрики в {METRICS_FILE}: {e}")
 
 """
-Основная функция
+Основная функция (интерактивный режим). Вместо полной справки при запуске
+выводится подсказка о команде help
 """
 def run():
-    print("***База данных***")
-    print_help()
+    if not is_quiet():
+        print("***База данных***")
+        print("Введите help - справка по командам, exit - выход.")
 
+    cache = start_session()
+    try:
+        repl()
+    finally:
+        end_session(cache)
+
+"""
+Цикл обработки команд. Изменения таблиц записываются на диск
+после каждой команды (только измененные таблицы)
+"""
+def repl():
     while True:
         try:
             user_input = input(">>>Введите команду: ").strip()
@@ -87,150 +258,295 @@ def run():
             continue
 
         try:
-            args = shlex.split(user_input)
+            args = split_command(user_input)
         except ValueError as e:
-            print(f"Ошибка парсинга: {e}. Попробуйте снова.")
+            report_error(f"Ошибка парсинга: {e}. Попробуйте снова.")
             continue
 
-        if not args:
+        if args and not execute(args):
+            break
+
+"""
+Разбор сценария: по команде на строке, пустые строки и комментарии
+(# или --) пропускаются, ';' в конце строки допускается.
+Весь сценарий разбирается до выполнения. Возвращает пары
+(номер строки, аргументы команды)
+"""
+def parse_script(lines: Iterable[str]) -> List[Tuple[int, List[str]]]:
+    commands = []
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith(("#", "--")):
             continue
+        try:
+            args = split_command(line.rstrip(";"))
+        except ValueError as e:
+            raise ValueError(f"Строка {number}: ошибка парсинга: {e}.")
+        if args:
+            commands.append((number, args))
+    return commands
 
-        command = args[0]
-        metadata = utils.load_metadata(DB_FILE)
+"""
+Неинтерактивное выполнение команд (файл сценария, stdin или -c).
+Без приглашений и справки; при ошибке выполнение останавливается,
+если не задан stop_on_error=False.
+Код возврата: 0 - все команды выполнены, 1 - были ошибки
+"""
+def run_script(commands: List[Tuple[int, List[str]]],
+               stop_on_error: bool = True) -> int:
+    # С блокировками метаданные могут менять другие процессы
+    cache = start_session(reload_metadata=locks.is_enabled())
+    try:
+        for number, args in commands:
+            errors = error_count()
+            if not execute(args):
+                break
+            if error_count() > errors and stop_on_error:
+                report_error(f"Выполнение остановлено на строке {number}.")
+                break
+    finally:
+        end_session(cache)
+    return 1 if error_count() else 0
 
-        if command == "exit":
-            break
+"""
+Выполнение одной команды под блокировками (см. command_locks).
+Блокировки снимаются после команды, а внутри транзакции - после
+commit или rollback. Возвращает False для команды exit
+"""
+def execute(args: List[str]) -> bool:
+    command = args[0]
+    if command in TRANSACTION_BLOCKED and utils.in_transaction():
+        report_error(f"Команда {command} недоступна внутри транзакции: \
+              сначала выполните commit или rollback.")
+        return True
+
+    try:
+        try:
+            wait = locks.acquire_all(command_locks(args))
+        except ValueError as e:
+            report_error(f"Ошибка блокировки: {e}")
+            return True
+        if wait:
+            inform(f"Ожидание блокировок: {wait:.5f} секунд.")
+        return run_command(args)
+    finally:
+        if not utils.in_transaction():
+            locks.release_all()
 
-        elif command == "help":
-            print_help()
-            continue
+"""
+Выполнение одной команды. Возвращает False для команды exit.
+Изменения таблиц записываются на диск после каждой команды
+(только измененные таблицы, внутри транзакции - при commit)
+"""
+@metrics.timed_command
+def run_command(args: List[str]) -> bool:
+    command = args[0]
+    metadata = utils.load_metadata(DB_FILE)
 
-        elif command == "list_tables":
-            core.list_tables(metadata)
+    if command == "exit":
+        return False
 
-        elif command == "create_table":
-            if len(args) < 2:
-                print("Некорректное значение: недостаточно \
-                      аргументов для команды create_table.")
-            else:
-                table_name = args[1]
-                column_specs = args[2:]
-                new_meta = core.create_table(metadata, table_name, column_specs)
-                if new_meta is not None:
-                    utils.save_metadata(DB_FILE, new_meta)
-
-        elif command == "drop_table":
-            if len(args) != 2:
-                print("Некорректное значение: команда \
-                      drop_table требует ровно одно имя таблицы.")
-            else:
-                table_name = args[1]
-                new_meta = core.drop_table(metadata, table_name)
+    elif command == "help":
+        print_help()
+        return True
+
+    elif command == "list_tables":
+        core.list_tables(metadata)
+
+    elif command == "create_table":
+        if len(args) < 2:
+            report_error("Некорректное значение: недостаточно \
+                  аргументов для команды create_table.")
+        else:
+            table_name = args[1]
+            try:
+                column_specs, table_format, compression = parse_table_options(
+                    args[2:]
+                )
+            except ValueError as e:
+                report_error(str(e))
+                return True
+            new_meta = core.create_table(metadata, table_name, column_specs,
+                                         table_format, compression)
+            if new_meta is not None:
+                utils.create_table_data(table_name,
+                                        new_meta[table_name]["columns"],
+                                        table_format, compression)
                 utils.save_metadata(DB_FILE, new_meta)
 
-        elif command == "insert":
-            if len(args) < 4 or args[1] != "into" or args[3] != "values":
-                print("Некорректный синтаксис: insert \
-                      into <таблица> values (значения...)")
-            else:
-                table_name = args[2]
-                values_str = " ".join(args[4:])
-                if values_str.startswith("(") and values_str.endswith(")"):
-                    values_str = values_str[1:-1].strip()
-                    if values_str == "":
-                        values = []
-                    else:
-                        values = [v.strip() for v in values_str.split(",")]
-                else:
-                    print("Ожидались значения в скобках: (val1, val2, ...)")
-                    continue
-
-                new_data = core.insert(metadata, table_name, values)
-                if new_data is not None:
-                    utils.save_table_data(table_name, new_data)
-
-        elif command == "select":
-            if len(args) < 3 or args[1] != "from":
-                print("Некорректный синтаксис: select from <таблица> [where ...]")
-            else:
-                table_name = args[2]
-                where_clause = None
-                if len(args) >= 5 and args[3] == "where":
-                    where_str = " ".join(args[4:])
-                    try:
-                        where_clause = parse_where_or_set(where_str)
-                    except ValueError as e:
-                        print(e)
-                        continue
-
-                core.select(metadata, table_name, where_clause)
-
-        elif command == "update":
-            if len(args) < 4 or args[2] != "set":
-                print("Некорректный синтаксис: update <таблица> \
-                      set col=val [where ...]")
-            else:
-                table_name = args[1]
-                set_part = []
-                where_part = []
-                in_set = True
-                for arg in args[3:]:
-                    if arg == "where":
-                        in_set = False
-                        continue
-                    if in_set:
-                        set_part.append(arg)
-                    else:
-                        where_part.append(arg)
-
-                if not set_part:
-                    print("Нет данных для обновления.")
-                    continue
-
-                set_str = " ".join(set_part)
-                try:
-                    set_dict = parse_where_or_set(set_str)
-                except ValueError as e:
-                    print(e)
-                    continue
-
-                if not where_part:
-                    print("Условие 'where' обязательно для update.")
-                    continue
-
-                where_str = " ".join(where_part)
-                try:
-                    where_dict = parse_where_or_set(where_str)
-                except ValueError as e:
-                    print(e)
-                    continue
-
-                new_data = core.update(metadata, table_name, set_dict, where_dict)
-                if new_data is not None:
-                    utils.save_table_data(table_name, new_data)
-
-        elif command == "delete":
-            if len(args) < 4 or args[1] != "from" or args[3] != "where":
-                print("Некорректный синтаксис: delete from <таблица> where ...")
-            else:
-                table_name = args[2]
-                where_str = " ".join(args[4:])
-                try:
-                    where_dict = parse_where_or_set(where_str)
-                except ValueError as e:
-                    print(e)
-                    continue
-
-                new_data = core.delete(metadata, table_name, where_dict)
-                if new_data is not None:
-                    utils.save_table_data(table_name, new_data)
-
-        elif command == "info":
-            if len(args) != 2:
-                print("Некорректный синтаксис: info <таблица>")
+    elif command == "drop_table":
+        if len(args) != 2:
+            report_error("Некорректное значение: команда \
+                  drop_table требует ровно одно имя таблицы.")
+        else:
+            table_name = args[1]
+            new_meta = core.drop_table(metadata, table_name)
+            if new_meta is not None:
+                utils.save_metadata(DB_FILE, new_meta)
+                utils.drop_table_data(table_name)
+
+    elif command == "alter_table":
+        if len(args) < 4:
+            report_error("Некорректный синтаксис: alter_table <таблица> \
+                  add <имя:тип> [default <значение>] | drop <столбец> | \
+                  rename <столбец> <новое имя>")
+        else:
+            table_name = args[1]
+            result = core.alter_table(metadata, table_name, args[2], args[3:])
+            if result is not None:
+                new_meta, ops = result
+                utils.save_schema_change(DB_FILE, new_meta, table_name, ops)
+
+    elif command == "insert":
+        plan = statement_plan(args)
+        if plan is not None:
+            if len(plan.values_list) == 1:
+                result = core.insert(metadata, plan.table, plan.values_list[0])
             else:
-                table_name = args[1]
-                core.info(metadata, table_name)
+                result = core.insert_many(metadata, plan.table, plan.values_list)
+            if result is not None:
+                new_meta, ops = result
+                utils.save_metadata(DB_FILE, new_meta)
+                utils.append_table_ops(plan.table, ops)
+
+    elif command == "load":
+        if len(args) != 3:
+            report_error("Некорректный синтаксис: load <таблица> <файл.csv|файл.jsonl>")
+        else:
+            core.load(metadata, args[1], args[2])
+
+    elif command == "select":
+        plan = statement_plan(args)
+        if plan is not None and plan.command == "aggregate":
+            core.aggregate(metadata, plan.table, plan.aggregates, plan.where,
+                           plan.group_by, plan.limit, plan.offset)
+        elif plan is not None:
+            core.select(metadata, plan.table, plan.where,
+                        plan.limit, plan.offset, plan.page)
+
+    elif command == "update":
+        plan = statement_plan(args)
+        if plan is not None:
+            ops = core.update(metadata, plan.table, plan.set_clause, plan.where)
+            if ops is not None:
+                utils.append_table_ops(plan.table, ops)
+
+    elif command == "delete":
+        plan = statement_plan(args)
+        if plan is not None:
+            ops = core.delete(metadata, plan.table, plan.where)
+            if ops is not None:
+                utils.append_table_ops(plan.table, ops)
+
+    elif command == "explain":
+        if len(args) == 1:
+            report_error("Некорректный синтаксис: explain <select|update|delete ...>")
+        else:
+            plan = statement_plan(args[1:])
+            if plan is not None:
+                core.explain(metadata, plan)
+
+    elif command == "info":
+        if len(args) != 2:
+            report_error("Некорректный синтаксис: info <таблица>")
+        else:
+            table_name = args[1]
+            core.info(metadata, table_name)
+
+    elif command == "analyze":
+        if len(args) != 2:
+            report_error("Некорректный синтаксис: analyze <таблица>")
+        else:
+            core.analyze(metadata, args[1])
+
+    elif command == "export":
+        if len(args) != 3:
+            report_error("Некорректный синтаксис: export <таблица> <файл.json>")
+        else:
+            core.export_table(metadata, args[1], args[2])
+
+    elif command == "import":
+        if len(args) != 3:
+            report_error("Некорректный синтаксис: import <таблица> <файл.json>")
+        else:
+            table_name = args[1]
+            result = core.import_table(metadata, table_name, args[2])
+            if result is not None:
+                new_meta, rows = result
+                schema = get_schema(new_meta, table_name)
+                utils.save_metadata(DB_FILE, new_meta)
+                utils.save_table_data(table_name, rows, schema.version,
+                                      schema.columns)
 
+    elif command == "create_index":
+        if len(args) not in (3, 4):
+            report_error("Некорректный синтаксис: create_index <таблица> \
+                  <столбец> [hash|sorted]")
         else:
-            print(f"Команды {command} нет. Попробуйте снова.")
\ No newline at end of file
+            kind = args[3] if len(args) == 4 else "hash"
+            core.create_index(metadata, args[1], args[2], kind)
+
+    elif command == "drop_index":
+        if len(args) != 3:
+            report_error("Некорректный синтаксис: drop_index <таблица> <столбец>")
+        else:
+            core.drop_index(metadata, args[1], args[2])
+
+    elif command == "compact":
+        if len(args) != 2:
+            report_error("Некорректный синтаксис: compact <таблица>")
+        else:
+            table_name = args[1]
+            core.compact(metadata, table_name)
+
+    elif command == "backup":
+        if len(args) not in (2, 3) or args[2:] not in ([], ["--incremental"]):
+            report_error("Некорректный синтаксис: backup <файл> [--incremental]")
+        else:
+            core.backup(metadata, args[1], len(args) == 3)
+
+    elif command == "restore":
+        if len(args) != 2:
+            report_error("Некорректный синтаксис: restore <файл>")
+        else:
+            core.restore(metadata, args[1])
+
+    elif command == "begin":
+        core.begin()
+
+    elif command == "commit":
+        core.commit()
+
+    elif command == "rollback":
+        core.rollback()
+
+    elif command == "locks":
+        core.lock_stats()
+
+    elif command == "durability":
+        if len(args) > 2:
+            report_error("Некорректный синтаксис: durability [off|normal|full]")
+        else:
+            core.durability(args[1] if len(args) == 2 else None)
+
+    elif command == "stats":
+        if len(args) == 1:
+            core.stats()
+        elif args[1:] == ["reset"]:
+            core.reset_stats()
+        elif len(args) == 3 and args[1] == "dump":
+            core.dump_stats(args[2])
+        else:
+            report_error("Некорректный синтаксис: stats [reset | dump <файл>]")
+
+    elif command == "parallel":
+        if len(args) > 2 or (len(args) == 2 and not args[1].isdigit()):
+            report_error("Некорректный синтаксис: parallel [число процессов]")
+        else:
+            core.scan_workers(int(args[1]) if len(args) == 2 else None)
+
+    else:
+        report_error(f"Команды {command} нет. Попробуйте снова.")
+
+    utils.flush_tables()
+    return True
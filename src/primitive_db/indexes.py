@@ -0,0 +1,192 @@
+import json
+import os
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from src.primitive_db import metrics
+from src.primitive_db.constants import DATA_DIR
+from src.primitive_db.storage import Row, Signature, atomic_write, table_path
+
+INDEX_KINDS = ("hash", "sorted")
+
+"""
+Хеш-индекс: значение столбца -> множество ID записей.
+Подходит для условий на равенство
+"""
+class HashIndex:
+    kind = "hash"
+
+    def __init__(self, column: str):
+        self.column = column
+        self.entries: Dict[Any, Set[int]] = {}
+
+    def add(self, row: Row) -> None:
+        self.entries.setdefault(row.get(self.column), set()).add(row["ID"])
+
+    def remove(self, row: Row) -> None:
+        value = row.get(self.column)
+        ids = self.entries.get(value)
+        if ids is not None:
+            ids.discard(row["ID"])
+            if not ids:
+                del self.entries[value]
+
+    def lookup(self, value: Any) -> List[int]:
+        return sorted(self.entries.get(value, ()))
+
+    def dump(self) -> List[Any]:
+        return [[value, sorted(ids)] for value, ids in self.entries.items()]
+
+    def restore(self, entries: List[Any]) -> None:
+        self.entries = {value: set(ids) for value, ids in entries}
+
+
+"""
+Упорядоченный индекс: отсортированный список пар (значение, ID).
+Поддерживает равенство и диапазоны через бинарный поиск
+"""
+class SortedIndex:
+    kind = "sorted"
+
+    def __init__(self, column: str):
+        self.column = column
+        self.entries: List[Tuple[Any, int]] = []
+
+    def add(self, row: Row) -> None:
+        value = row.get(self.column)
+        if value is not None:
+            insort(self.entries, (value, row["ID"]))
+
+    def remove(self, row: Row) -> None:
+        value = row.get(self.column)
+        if value is None:
+            return
+        pos = bisect_left(self.entries, (value, row["ID"]))
+        if pos < len(self.entries) and self.entries[pos] == (value, row["ID"]):
+            del self.entries[pos]
+
+    def lookup(self, value: Any) -> List[int]:
+        return self.range(value, value)
+
+    """
+    ID записей со значением в диапазоне [low, high]. None - без границы
+    """
+    def range(self, low: Any = None, high: Any = None,
+              low_inclusive: bool = True, high_inclusive: bool = True) -> List[int]:
+        if low is None:
+            start = 0
+        elif low_inclusive:
+            start = bisect_left(self.entries, (low,))
+        else:
+            start = bisect_right(self.entries, (low, float("inf")))
+        if high is None:
+            end = len(self.entries)
+        elif high_inclusive:
+            end = bisect_right(self.entries, (high, float("inf")))
+        else:
+            end = bisect_left(self.entries, (high,))
+        return sorted(row_id for _, row_id in self.entries[start:end])
+
+    def dump(self) -> List[Any]:
+        return [list(entry) for entry in self.entries]
+
+    def restore(self, entries: List[Any]) -> None:
+        self.entries = [(value, row_id) for value, row_id in entries]
+
+
+Index = HashIndex | SortedIndex
+
+INDEX_CLASSES = {
+    HashIndex.kind: HashIndex,
+    SortedIndex.kind: SortedIndex,
+}
+
+"""
+Создание пустого индекса заданного вида
+"""
+def new_index(column: str, kind: str) -> Index:
+    if kind not in INDEX_CLASSES:
+        raise ValueError(f"Неизвестный вид индекса: {kind}. \
+                         Доступные: {', '.join(INDEX_KINDS)}")
+    return INDEX_CLASSES[kind](column)
+
+"""
+Построение индекса по записям таблицы
+"""
+def build_index(column: str, kind: str, rows) -> Index:
+    index = new_index(column, kind)
+    if kind == SortedIndex.kind:
+        index.entries = sorted(
+            (row[column], row["ID"]) for row in rows if row.get(column) is not None
+        )
+    else:
+        for row in rows:
+            index.add(row)
+    return index
+
+"""
+Индексы таблицы после изменения схемы change: индекс удаленного столбца
+удаляется, индекс переименованного столбца переходит к новому имени
+"""
+def alter_indexes(indexes: Dict[str, Index], change: Dict[str, Any]) -> None:
+    if change["action"] == "add":
+        return
+    index = indexes.pop(change["column"], None)
+    if index is not None and change["action"] == "rename":
+        index.column = change["to"]
+        indexes[change["to"]] = index
+
+"""
+Путь к файлу индексов таблицы
+"""
+def index_path(table_name: str) -> str:
+    return table_path(table_name, "idx.json")
+
+"""
+Загрузка индексов таблицы.
+Возвращает подпись снапшота, для которого индексы были сохранены,
+и сами индексы (None вместо содержимого, если файл не найден)
+"""
+def load_indexes(table_name: str) -> Tuple[Optional[Signature], Dict[str, Index]]:
+    try:
+        with open(index_path(table_name), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+            metrics.add("bytes_read", f.tell())
+    except FileNotFoundError:
+        return None, {}
+
+    indexes = {}
+    for column, spec in data["indexes"].items():
+        index = new_index(column, spec["kind"])
+        index.restore(spec["entries"])
+        indexes[column] = index
+    signature = tuple(tuple(part) for part in data["snapshot"])
+    return signature, indexes
+
+"""
+Сохранение индексов таблицы вместе с подписью снапшота, которому они соответствуют
+"""
+def save_indexes(table_name: str, indexes: Dict[str, Index],
+                 snapshot: Signature) -> None:
+    if not indexes:
+        drop_indexes(table_name)
+        return
+    os.makedirs(DATA_DIR, exist_ok=True)
+    data = {
+        "snapshot": snapshot,
+        "indexes": {
+            column: {"kind": index.kind, "entries": index.dump()}
+            for column, index in indexes.items()
+        },
+    }
+    with atomic_write(index_path(table_name)) as f:
+        f.write(json.dumps(data, ensure_ascii=False))
+
+"""
+Удаление файла индексов таблицы
+"""
+def drop_indexes(table_name: str) -> None:
+    try:
+        os.remove(index_path(table_name))
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,72 @@
+import csv
+import json
+import os
+from typing import Iterator, List, Tuple
+
+"""
+Построчное чтение записей из CSV или JSONL файла.
+Возвращает пары (номер строки, значения столбцов в порядке схемы).
+Файл читается потоково, в памяти одновременно находится одна строка
+"""
+def read_records(filepath: str,
+                 columns: List[str]) -> Iterator[Tuple[int, List[str]]]:
+    ext = os.path.splitext(filepath)[1].lower()
+    if ext == ".csv":
+        return _read_csv(filepath, columns)
+    if ext in (".jsonl", ".ndjson"):
+        return _read_jsonl(filepath, columns)
+    raise ValueError(f"Неподдерживаемый формат файла: {filepath}. \
+                     Ожидается .csv или .jsonl")
+
+"""
+CSV: первая строка считается заголовком, если содержит все столбцы таблицы
+(столбец ID из файла игнорируется), иначе значения берутся по порядку
+"""
+def _read_csv(filepath: str,
+              columns: List[str]) -> Iterator[Tuple[int, List[str]]]:
+    with open(filepath, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        positions = None
+        first = True
+        for row in reader:
+            if first:
+                first = False
+                header = [cell.strip() for cell in row]
+                if set(columns) <= set(header):
+                    positions = [header.index(col) for col in columns]
+                    continue
+            if not row:
+                continue
+            if positions is None:
+                yield reader.line_num, row
+            elif len(row) != len(header):
+                raise ValueError(f"Строка {reader.line_num}: ожидалось \
+                                 {len(header)} значений, получено {len(row)}.")
+            else:
+                yield reader.line_num, [row[pos] for pos in positions]
+
+"""
+JSONL: объект {"столбец": значение, ...} или список значений на каждой строке
+"""
+def _read_jsonl(filepath: str,
+                columns: List[str]) -> Iterator[Tuple[int, List[str]]]:
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Строка {number}: некорректный JSON ({e}).")
+            if isinstance(record, dict):
+                missing = [col for col in columns if col not in record]
+                if missing:
+                    raise ValueError(f"Строка {number}: нет столбцов \
+                                     {', '.join(missing)}.")
+                values = [record[col] for col in columns]
+            elif isinstance(record, list):
+                values = record
+            else:
+                raise ValueError(f"Строка {number}: ожидается объект или список.")
+            yield number, [str(value) for value in values]
@@ -0,0 +1,254 @@
+import os
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+
+from src.primitive_db.constants import (
+    DB_FILE,
+    LOCK_FILE,
+    LOCK_TIMEOUT,
+    LOCKING,
+    TXN_FILE,
+)
+from src.primitive_db.storage import table_path
+
+try:
+    import fcntl
+except ImportError:
+    # Нет fcntl (Windows) - блокировки не используются
+    fcntl = None
+
+# Блокировка базы (разделяемая для команд, исключительная для проверки файлов)
+DATABASE_LOCK = LOCK_FILE
+# Очередь к блокировке базы: пока процесс ждет исключительную блокировку,
+# новые команды других процессов ее не получают
+GATE_LOCK = LOCK_FILE + ".gate"
+# Изменение метаданных (список таблиц, счетчики ID)
+METADATA_LOCK = DB_FILE + ".lock"
+# Запись журнала транзакции при commit
+JOURNAL_LOCK = TXN_FILE + ".lock"
+
+# Пауза между попытками получить занятую блокировку вне главного потока, секунд
+_RETRY_MIN = 0.0005
+_RETRY_MAX = 0.005
+
+_enabled = LOCKING and fcntl is not None
+_timeout = LOCK_TIMEOUT
+# Открытые файлы блокировок: путь -> дескриптор
+_files: Dict[str, int] = {}
+# Удерживаемые блокировки: путь -> исключительная ли
+_held: Dict[str, bool] = {}
+
+"""
+Статистика одной блокировки за сессию: сколько раз получена,
+сколько раз пришлось ждать другой процесс, суммарное и наибольшее ожидание
+"""
+class LockStats:
+    __slots__ = ("acquired", "waited", "wait_total", "wait_max")
+
+    def __init__(self):
+        self.acquired = 0
+        self.waited = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def add(self, wait: float) -> None:
+        self.acquired += 1
+        if wait:
+            self.waited += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+
+
+_stats: Dict[str, LockStats] = {}
+
+"""
+Включение и выключение блокировок (без fcntl включить нельзя)
+"""
+def set_enabled(enabled: bool) -> None:
+    global _enabled
+    _enabled = enabled and fcntl is not None
+
+def is_enabled() -> bool:
+    return _enabled
+
+"""
+Файл блокировки таблицы
+"""
+def table_lock(table_name: str) -> str:
+    return table_path(table_name, "lock")
+
+def _descriptor(path: str) -> int:
+    fd = _files.get(path)
+    if fd is None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fd = _files[path] = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    return fd
+
+"""
+Получение блокировки: разделяемой (читатели) или исключительной (писатель).
+Уже удерживаемая блокировка не запрашивается повторно, разделяемая
+при запросе исключительной повышается. Если другой процесс не отпускает
+блокировку LOCK_TIMEOUT секунд - ValueError (так же разрешаются
+взаимные ожидания транзакций). Возвращает время ожидания, секунд
+"""
+def acquire(path: str, exclusive: bool = False) -> float:
+    if not _enabled:
+        return 0.0
+    held = _held.get(path)
+    if held is not None and (held or not exclusive):
+        return 0.0
+
+    fd = _descriptor(path)
+    mode = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+    wait = 0.0
+    try:
+        fcntl.flock(fd, mode | fcntl.LOCK_NB)
+    except BlockingIOError:
+        start = time.perf_counter()
+        if threading.current_thread() is threading.main_thread():
+            acquired = _wait_blocking(fd, mode)
+        else:
+            acquired = _wait_polling(fd, mode)
+        wait = time.perf_counter() - start
+        if not acquired:
+            _stats.setdefault(path, LockStats()).add(wait)
+            raise ValueError(f"Блокировка {path} занята другим процессом \
+                             дольше {_timeout} с.")
+    _held[path] = exclusive
+    _stats.setdefault(path, LockStats()).add(wait)
+    return wait
+
+class _LockTimeout(Exception):
+    pass
+
+def _on_alarm(signum, frame):
+    raise _LockTimeout()
+
+"""
+Ожидание блокировки в очереди ядра (процесс просыпается сразу, как только
+блокировка освободится), ограниченное таймером SIGALRM.
+Возвращает False, если блокировка не получена за LOCK_TIMEOUT секунд
+"""
+def _wait_blocking(fd: int, mode: int) -> bool:
+    previous = signal.signal(signal.SIGALRM, _on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, _timeout)
+    try:
+        fcntl.flock(fd, mode)
+        return True
+    except _LockTimeout:
+        return False
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+"""
+Ожидание блокировки повторными попытками (таймер сигнала доступен
+только главному потоку). Возвращает False по истечении LOCK_TIMEOUT
+"""
+def _wait_polling(fd: int, mode: int) -> bool:
+    deadline = time.perf_counter() + _timeout
+    delay = _RETRY_MIN
+    while True:
+        left = deadline - time.perf_counter()
+        if left <= 0:
+            return False
+        time.sleep(min(delay, left))
+        delay = min(delay * 2, _RETRY_MAX)
+        try:
+            fcntl.flock(fd, mode | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            continue
+
+"""
+Освобождение одной блокировки
+"""
+def release(path: str) -> None:
+    if _held.pop(path, None) is not None:
+        fcntl.flock(_files[path], fcntl.LOCK_UN)
+
+"""
+Освобождение всех удерживаемых блокировок
+"""
+def release_all() -> None:
+    for path in list(_held):
+        release(path)
+
+"""
+Вход в базу для команды: разделяемая блокировка базы через очередь GATE_LOCK,
+чтобы ожидающая проверка файлов не ждала бесконечно
+"""
+def _enter_database() -> float:
+    if DATABASE_LOCK in _held:
+        return 0.0
+    wait = acquire(GATE_LOCK)
+    try:
+        wait += acquire(DATABASE_LOCK)
+    finally:
+        release(GATE_LOCK)
+    return wait
+
+"""
+Исключительная блокировка всей базы (проверка и восстановление файлов
+при запуске): ждет завершения команд других процессов
+"""
+def lock_database() -> float:
+    return acquire(GATE_LOCK, exclusive=True) + acquire(DATABASE_LOCK, exclusive=True)
+
+"""
+Блокировки для команды: разделяемая блокировка базы, затем перечисленные
+блокировки (путь, исключительная) в заданном порядке.
+Возвращает суммарное время ожидания, секунд
+"""
+def acquire_all(locks: List[Tuple[str, bool]]) -> float:
+    wait = _enter_database()
+    for path, exclusive in locks:
+        wait += acquire(path, exclusive)
+    return wait
+
+"""
+Блокировки всех таблиц базы (в порядке имен) и журнала транзакции
+на время блока with - для команд, работающих со всей базой (backup,
+restore). Берутся после блокировки метаданных, в том же порядке, что
+и для остальных команд; при выходе снимаются те из них, что не были
+получены раньше, - и в пакетном режиме, и в режиме сервера, который
+не снимает блокировки файлов после команды. Значение блока - время
+ожидания, секунд
+"""
+@contextmanager
+def holding_tables(table_names: List[str],
+                   exclusive: bool = False) -> Iterator[float]:
+    paths = [table_lock(name) for name in sorted(table_names)] + [JOURNAL_LOCK]
+    taken = [path for path in paths if path not in _held]
+    try:
+        wait = 0.0
+        for path in paths:
+            wait += acquire(path, exclusive or path == JOURNAL_LOCK)
+        yield wait
+    finally:
+        for path in taken:
+            release(path)
+
+"""
+Статистика ожидания блокировок за сессию: путь файла блокировки -> статистика
+"""
+def lock_stats() -> Dict[str, LockStats]:
+    return _stats
+
+"""
+В дочернем процессе (fork) блокировки родителя не считаются своими:
+снятие блокировки через общий дескриптор сняло бы ее и у родителя
+"""
+def _forget() -> None:
+    _files.clear()
+    _held.clear()
+    _stats.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget)
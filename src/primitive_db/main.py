@@ -1,11 +1,80 @@
 #!/usr/bin/env python3
 
-from src.primitive_db.engine import run
+import argparse
+import sys
+
+from src.primitive_db.constants import SERVER_HOST, SERVER_SOCKET, SERVER_WORKERS
+from src.primitive_db.decorators import set_assume_yes
+from src.primitive_db.engine import parse_script, run, run_script
+from src.primitive_db.output import OUTPUT_FORMATS, set_output_format, set_quiet
+
+"""
+Разбор аргументов командной строки
+"""
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="database",
+        description="Примитивная база данных. Без аргументов запускается "
+                    "интерактивный режим; если stdin не терминал, команды "
+                    "читаются из него построчно. database serve - режим "
+                    "сервера для клиента database-client.",
+    )
+    parser.add_argument("mode", nargs="?", choices=["serve"],
+                        help="запустить сервер базы")
+    parser.add_argument("-f", "--file",
+                        help="выполнить команды из файла сценария")
+    parser.add_argument("-c", "--command", action="append", default=[],
+                        help="выполнить команду (флаг можно повторять)")
+    parser.add_argument("-y", "--yes", action="store_true",
+                        help="подтверждать удаление без вопроса")
+    parser.add_argument("-q", "--quiet", action="store_true",
+                        help="выводить только результаты запросов и ошибки")
+    parser.add_argument("-o", "--output", choices=OUTPUT_FORMATS, default="table",
+                        help="формат вывода результатов: table - таблица, tsv - "
+                             "через табуляцию, json - объект на строку")
+    parser.add_argument("--continue-on-error", action="store_true",
+                        help="не останавливать сценарий на ошибке")
+    parser.add_argument("--socket", default=SERVER_SOCKET,
+                        help=f"serve: Unix-сокет (по умолчанию {SERVER_SOCKET})")
+    parser.add_argument("--host", default=SERVER_HOST,
+                        help="serve: адрес для TCP (по умолчанию только локальный)")
+    parser.add_argument("--port", type=int,
+                        help="serve: порт TCP вместо Unix-сокета")
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS,
+                        help="serve: число потоков, выполняющих команды")
+    return parser.parse_args(argv)
 
 
 def main():
-    run()
+    args = parse_args()
+    set_quiet(args.quiet)
+    set_assume_yes(args.yes)
+    set_output_format(args.output)
+
+    if args.mode == "serve":
+        # asyncio нужен только серверу, его импорт удлиняет запуск
+        from src.primitive_db.server import serve
+
+        sys.exit(serve(args.socket, args.host, args.port, args.workers))
+
+    if not args.file and not args.command and sys.stdin.isatty():
+        run()
+        return
+
+    try:
+        if args.file:
+            with open(args.file, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+        elif args.command:
+            lines = []
+        else:
+            lines = sys.stdin.readlines()
+        commands = parse_script(lines + args.command)
+    except (OSError, ValueError) as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        sys.exit(2)
+    sys.exit(run_script(commands, stop_on_error=not args.continue_on_error))
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,321 @@
+"""
+Метрики производительности сессии: гистограммы времени выполнения команд,
+время фаз команды (разбор, загрузка, отбор, приведение типов, вывод, запись)
+и счетчики (просмотрено записей, прочитано и записано байт).
+Команда копит фазы и счетчики в записи своего потока (без блокировок),
+в общие гистограммы они попадают одним шагом по завершении команды.
+Время фазы - собственное: вложенная фаза (загрузка во время отбора)
+вычитается из объемлющей
+"""
+import json
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.primitive_db.constants import METRICS, METRICS_BUCKETS
+
+PHASES = ("parse", "load", "filter", "cast", "render", "save")
+PHASE_NAMES = {
+    "parse": "разбор",
+    "load": "загрузка",
+    "filter": "отбор",
+    "cast": "приведение",
+    "render": "вывод",
+    "save": "запись",
+}
+COUNTERS = ("rows_scanned", "bytes_read", "bytes_written")
+COUNTER_NAMES = {
+    "rows_scanned": "Просмотрено записей",
+    "bytes_read": "Прочитано байт",
+    "bytes_written": "Записано байт",
+}
+# Префикс имен метрик в формате Prometheus
+PROMETHEUS_PREFIX = "primitive_db"
+
+_enabled = METRICS
+_clock = time.perf_counter
+_lock = threading.Lock()
+# Команда, выполняемая в текущем потоке (_Record)
+_local = threading.local()
+
+"""
+Гистограмма значений (секунд) с фиксированными границами корзин:
+counts[i] - значения не больше bounds[i], последняя корзина - больше всех
+"""
+class Histogram:
+    def __init__(self, bounds: Tuple[float, ...] = METRICS_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    """
+    Приблизительный квантиль: верхняя граница корзины, в которую он попал
+    (не больше наибольшего значения)
+    """
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    """
+    Накопленные числа значений по границам корзин (как в Prometheus)
+    """
+    def cumulative(self) -> List[Tuple[str, int]]:
+        result = []
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            result.append((repr(float(bound)), seen))
+        result.append(("+Inf", self.count))
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "max": self.max,
+            "buckets": dict(self.cumulative()),
+        }
+
+
+"""
+Накопленные метрики одной команды (select, insert, ...)
+"""
+class CommandStats:
+    def __init__(self):
+        self.latency = Histogram()
+        self.phases: Dict[str, Histogram] = {}
+        self.counters = dict.fromkeys(COUNTERS, 0)
+
+
+"""
+Фазы и счетчики выполняемой команды. Стек фаз нужен для собственного
+времени вложенных фаз: при входе во вложенную фазу время объемлющей
+останавливается, при выходе - продолжается
+"""
+class _Record:
+    __slots__ = ("phases", "counters", "stack")
+
+    def __init__(self):
+        self.phases: Dict[str, float] = dict.fromkeys(PHASES, 0.0)
+        self.counters: Dict[str, int] = dict.fromkeys(COUNTERS, 0)
+        self.stack: List[Tuple[str, float]] = []
+
+    def enter(self, phase: str) -> None:
+        now = _clock()
+        stack = self.stack
+        if stack:
+            outer, start = stack[-1]
+            self.phases[outer] += now - start
+        stack.append((phase, now))
+
+    def exit(self) -> None:
+        now = _clock()
+        stack = self.stack
+        phase, start = stack.pop()
+        self.phases[phase] += now - start
+        if stack:
+            stack[-1] = (stack[-1][0], now)
+
+
+_commands: Dict[str, CommandStats] = {}
+
+"""
+Включение и выключение сбора метрик
+"""
+def set_enabled(enabled: bool) -> None:
+    global _enabled
+    _enabled = enabled
+
+def is_enabled() -> bool:
+    return _enabled
+
+"""
+Декоратор выполнения команды: время выполнения, фазы и счетчики
+попадают в метрики команды args[0] (первый аргумент функции)
+"""
+def timed_command(func: Callable) -> Callable:
+    def wrapper(args: List[str], *rest, **kwargs):
+        if not _enabled:
+            return func(args, *rest, **kwargs)
+        previous = getattr(_local, "record", None)
+        record = _local.record = _Record()
+        start = time.perf_counter()
+        try:
+            return func(args, *rest, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            _local.record = previous
+            _observe(args[0], elapsed, record)
+    return wrapper
+
+"""
+Учет времени блока кода в фазе команды текущего потока:
+with metrics.phase("filter"): ... (класс, а не contextmanager-генератор -
+вход и выход в несколько раз дешевле)
+"""
+class phase:
+    __slots__ = ("name", "record")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.record = getattr(_local, "record", None)
+        if self.record is not None:
+            self.record.enter(self.name)
+
+    def __exit__(self, *exc_info: Any) -> None:
+        if self.record is not None:
+            self.record.exit()
+
+"""
+Декоратор: время функции учитывается в фазе name
+"""
+def timed(name: str) -> Callable:
+    def decorator(func: Callable) -> Callable:
+        def wrapper(*args, **kwargs):
+            record = getattr(_local, "record", None)
+            if record is None:
+                return func(*args, **kwargs)
+            record.enter(name)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record.exit()
+        wrapper.__name__ = func.__name__
+        wrapper.__doc__ = func.__doc__
+        return wrapper
+    return decorator
+
+"""
+Увеличение счетчика команды текущего потока (вне команды не учитывается)
+"""
+def add(counter: str, amount: int) -> None:
+    record = getattr(_local, "record", None)
+    if record is not None:
+        record.counters[counter] += amount
+
+def _observe(command: str, elapsed: float, record: _Record) -> None:
+    with _lock:
+        stats = _commands.get(command)
+        if stats is None:
+            stats = _commands[command] = CommandStats()
+        stats.latency.observe(elapsed)
+        for name, seconds in record.phases.items():
+            if not seconds:
+                continue
+            histogram = stats.phases.get(name)
+            if histogram is None:
+                histogram = stats.phases[name] = Histogram()
+            histogram.observe(seconds)
+        for name, amount in record.counters.items():
+            stats.counters[name] += amount
+
+"""
+Копия накопленных метрик: команда -> CommandStats
+"""
+def snapshot() -> Dict[str, CommandStats]:
+    with _lock:
+        result = {}
+        for command, stats in _commands.items():
+            copy = CommandStats()
+            copy.latency = _copy_histogram(stats.latency)
+            copy.phases = {name: _copy_histogram(h) for name, h in stats.phases.items()}
+            copy.counters = dict(stats.counters)
+            result[command] = copy
+        return result
+
+def _copy_histogram(histogram: Histogram) -> Histogram:
+    copy = Histogram(histogram.bounds)
+    copy.counts = list(histogram.counts)
+    copy.count, copy.total, copy.max = histogram.count, histogram.total, histogram.max
+    return copy
+
+def reset() -> None:
+    with _lock:
+        _commands.clear()
+
+"""
+Метрики в формате файла path: JSON для *.json, иначе текстовый Prometheus
+"""
+def render(path: str) -> str:
+    return to_json() if path.endswith(".json") else to_prometheus()
+
+"""
+Метрики в JSON: по каждой команде гистограммы времени и фаз (секунды,
+накопленные числа по границам корзин) и счетчики
+"""
+def to_json(stats: Optional[Dict[str, CommandStats]] = None) -> str:
+    stats = snapshot() if stats is None else stats
+    return json.dumps({
+        command: {
+            "latency": item.latency.to_dict(),
+            "phases": {name: h.to_dict() for name, h in item.phases.items()},
+            "counters": item.counters,
+        }
+        for command, item in sorted(stats.items())
+    }, ensure_ascii=False, indent=2)
+
+"""
+Метрики в текстовом формате Prometheus
+"""
+def to_prometheus(stats: Optional[Dict[str, CommandStats]] = None) -> str:
+    stats = snapshot() if stats is None else stats
+    prefix = PROMETHEUS_PREFIX
+    lines = [
+        f"# HELP {prefix}_command_seconds Время выполнения команды",
+        f"# TYPE {prefix}_command_seconds histogram",
+    ]
+    for command, item in sorted(stats.items()):
+        lines.extend(_histogram_lines(f"{prefix}_command_seconds",
+                                      f'command="{command}"', item.latency))
+    lines += [
+        f"# HELP {prefix}_phase_seconds Время фазы команды",
+        f"# TYPE {prefix}_phase_seconds histogram",
+    ]
+    for command, item in sorted(stats.items()):
+        for name, histogram in item.phases.items():
+            lines.extend(_histogram_lines(
+                f"{prefix}_phase_seconds",
+                f'command="{command}",phase="{name}"', histogram,
+            ))
+    for counter in COUNTERS:
+        lines += [
+            f"# HELP {prefix}_{counter}_total {COUNTER_NAMES[counter]}",
+            f"# TYPE {prefix}_{counter}_total counter",
+        ]
+        lines.extend(
+            f'{prefix}_{counter}_total{{command="{command}"}} '
+            f'{item.counters[counter]}'
+            for command, item in sorted(stats.items())
+        )
+    return "\n".join(lines) + "\n"
+
+def _histogram_lines(name: str, labels: str, histogram: Histogram) -> List[str]:
+    lines = [
+        f'{name}_bucket{{{labels},le="{bound}"}} {count}'
+        for bound, count in histogram.cumulative()
+    ]
+    lines.append(f"{name}_sum{{{labels}}} {histogram.total!r}")
+    lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+    return lines
@@ -0,0 +1,153 @@
+import io
+import json
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Any, Iterable, Iterator, List, TextIO, Tuple
+
+# Форматы вывода результатов: "table" - таблица PrettyTable, "tsv" - значения
+# через табуляцию со строкой заголовка, "json" - JSON-объект на строку
+OUTPUT_FORMATS = ("table", "tsv", "json")
+
+# Тихий режим: выводятся только результаты запросов и ошибки
+_quiet = False
+_format = "table"
+# Число ошибок команд за сессию (для кода возврата при выполнении сценария)
+_errors = 0
+# Буферы вывода команды, выполняемой в текущем потоке (режим сервера)
+_local = threading.local()
+
+"""
+Включение и выключение тихого режима
+"""
+def set_quiet(quiet: bool) -> None:
+    global _quiet
+    _quiet = quiet
+
+def is_quiet() -> bool:
+    return _quiet
+
+"""
+Информационное сообщение (об успешной операции, времени выполнения).
+В тихом режиме не выводится
+"""
+def inform(message: str) -> None:
+    if not _quiet:
+        print(message)
+
+"""
+Сообщение об ошибке команды: выводится в stderr и учитывается
+в счетчике ошибок сессии
+"""
+def report_error(message: str) -> None:
+    global _errors
+    _errors += 1
+    print(message, file=sys.stderr)
+
+def error_count() -> int:
+    return _errors
+
+"""
+Выбор формата вывода результатов (select, агрегаты, stats, locks)
+"""
+def set_output_format(output_format: str) -> None:
+    global _format
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Неизвестный формат вывода: {output_format}. \
+                         Доступные: {', '.join(OUTPUT_FORMATS)}")
+    _format = output_format
+
+def get_output_format() -> str:
+    return _format
+
+"""
+Вывод строк результата в выбранном формате. header - выводить заголовок
+(в tsv; результат select выводится частями, заголовок - только у первой).
+PrettyTable импортируется только для формата table
+"""
+def print_table(columns: List[str], rows: Iterable[List[Any]],
+                header: bool = True) -> None:
+    if _format == "tsv":
+        lines = ["\t".join(map(_tsv_field, columns))] if header else []
+        lines.extend("\t".join(map(_tsv_field, row)) for row in rows)
+    elif _format == "json":
+        lines = [json.dumps(dict(zip(columns, row)), ensure_ascii=False)
+                 for row in rows]
+    else:
+        from prettytable import PrettyTable
+
+        table = PrettyTable()
+        table.field_names = columns
+        for row in rows:
+            table.add_row(["" if value is None else value for value in row])
+        lines = [table.get_string()]
+    if lines:
+        print("\n".join(lines))
+
+"""
+Пустой результат: в формате table - сообщение, в tsv - только заголовок,
+в json - ничего
+"""
+def print_empty(columns: List[str]) -> None:
+    if _format == "table":
+        print("Нет записей.")
+    else:
+        print_table(columns, [])
+
+"""
+Значение поля tsv: табуляция, перевод строки и обратная косая черта
+экранируются, None - пустое поле
+"""
+def _tsv_field(value: Any) -> str:
+    if value is None:
+        return ""
+    text = str(value)
+    if "\\" in text or "\t" in text or "\n" in text:
+        text = text.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+    return text
+
+
+"""
+Поток вывода, который в потоке с перехваченным выводом (captured)
+пишет в его буфер, а в остальных - в исходный поток
+"""
+class _ThreadStream(io.TextIOBase):
+    def __init__(self, stream: TextIO, name: str):
+        self.stream = stream
+        self.name = name
+
+    def _target(self) -> TextIO:
+        return getattr(_local, self.name, None) or self.stream
+
+    def write(self, text: str) -> int:
+        return self._target().write(text)
+
+    def flush(self) -> None:
+        self._target().flush()
+
+    def isatty(self) -> bool:
+        return self._target().isatty()
+
+
+"""
+Подмена sys.stdout и sys.stderr потоками, различающими потоки выполнения.
+Нужна, когда команды выполняются одновременно в нескольких потоках
+"""
+def install_thread_capture() -> None:
+    if not isinstance(sys.stdout, _ThreadStream):
+        sys.stdout = _ThreadStream(sys.stdout, "stdout")
+    if not isinstance(sys.stderr, _ThreadStream):
+        sys.stderr = _ThreadStream(sys.stderr, "stderr")
+
+"""
+Перехват вывода команды, выполняемой в текущем потоке.
+Возвращает буферы (stdout, stderr)
+"""
+@contextmanager
+def captured() -> Iterator[Tuple[io.StringIO, io.StringIO]]:
+    out, err = io.StringIO(), io.StringIO()
+    _local.stdout, _local.stderr = out, err
+    try:
+        yield out, err
+    finally:
+        _local.stdout = _local.stderr = None
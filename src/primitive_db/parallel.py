@@ -0,0 +1,149 @@
+"""
+Параллельный полный перебор таблицы: позиции делятся на части по числу
+процессов, условие для каждой части вычисляется в пуле процессов
+(concurrent.futures), отметки частей склеиваются в порядке позиций -
+результат совпадает с последовательным перебором.
+Процессам передаются только столбцы, которые проверяет условие,
+и только целые и булевы (копия массива или битовой карты).
+Процессы запускаются методом spawn: новый интерпретатор не наследует
+потоки режима сервера и открытые файлы блокировок.
+multiprocessing и concurrent.futures импортируются при первом параллельном
+переборе: их импорт заметно удлиняет запуск процесса database
+"""
+import atexit
+import operator
+import os
+import threading
+from array import array
+from itertools import repeat
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from src.primitive_db.constants import SCAN_WORKERS
+from src.primitive_db.predicates import Predicate, column_mask, predicate_columns
+
+# Виды столбцов, части которых передаются процессам целыми массивами
+PARALLEL_KINDS = ("int", "bool")
+
+# Часть столбцов для процесса: имя -> array ID, IntColumn/BoolColumn
+# или None (столбца нет в таблице)
+Chunk = Dict[str, Any]
+
+_workers = SCAN_WORKERS or os.cpu_count() or 1
+# Пул процессов (ProcessPoolExecutor) или None, пока он не нужен
+_executor: Optional[Any] = None
+_lock = threading.Lock()
+
+"""
+Установка числа процессов перебора для текущей сессии (1 - без параллелизма)
+"""
+def set_workers(count: int) -> None:
+    global _workers
+    if count < 1:
+        raise ValueError(f"Число процессов должно быть не меньше 1: {count}")
+    with _lock:
+        if count != _workers:
+            _shutdown()
+        _workers = count
+
+def get_workers() -> int:
+    return _workers
+
+"""
+Запущен ли пул процессов (первый параллельный перебор его запускает)
+"""
+def started() -> bool:
+    return _executor is not None
+
+"""
+Можно ли проверить условие для таблицы (ColumnarTable) параллельно:
+процессов больше одного и условие проверяет только целые и булевы столбцы
+(передача процессам столбцов строк дороже самой проверки)
+"""
+def can_scan(table: Any, pred: Predicate) -> bool:
+    if _workers < 2:
+        return False
+    for name in predicate_columns(pred):
+        column = table.columns.get(name)
+        if column is not None and column.kind not in PARALLEL_KINDS:
+            return False
+    return True
+
+"""
+Отметки живых позиций таблицы (ColumnarTable), удовлетворяющих условию,
+вычисленные по частям в пуле процессов. Выгоден ли параллельный перебор,
+решает оценка стоимости (core.access_path). None - перебирать
+последовательно: условие нельзя проверить в процессах (см. can_scan)
+или пул недоступен
+"""
+def scan_selection(table: Any, pred: Predicate) -> Optional[bytes]:
+    if not can_scan(table, pred):
+        return None
+    length = len(table.ids)
+    workers = _workers
+    names = predicate_columns(pred)
+
+    from concurrent.futures.process import BrokenProcessPool
+
+    # Граница частей кратна 8 - битовые карты делятся целыми байтами
+    step = -(-length // workers)
+    step += -step % 8
+    try:
+        executor = _get_executor()
+        futures = []
+        for start in range(0, length, step):
+            stop = start + step
+            chunk: Chunk = {}
+            for name in names:
+                if name == "ID":
+                    chunk[name] = table.ids[start:stop]
+                elif name in table.columns:
+                    chunk[name] = table.columns[name].slice(start, stop)
+                else:
+                    chunk[name] = None
+            alive = table.alive[start:stop]
+            futures.append(executor.submit(_chunk_selection, pred, chunk, alive))
+        return b"".join(future.result() for future in futures)
+    except (BrokenProcessPool, OSError):
+        with _lock:
+            _shutdown()
+        return None
+
+"""
+Отметки живых позиций части таблицы, удовлетворяющих условию
+(выполняется в процессе пула)
+"""
+def _chunk_selection(pred: Predicate, chunk: Chunk, alive: bytearray) -> bytes:
+    def column(name: str) -> Tuple[Iterable[Any], bool]:
+        part = chunk[name]
+        if part is None:
+            return repeat(None, len(alive)), True
+        if isinstance(part, array):
+            return part, False
+        return part.values(), False
+    return bytes(map(operator.and_, column_mask(pred, column), alive))
+
+"""
+Пул процессов сессии: создается при первом параллельном переборе
+и переиспользуется следующими командами
+"""
+def _get_executor() -> Any:
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+def _shutdown() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+
+# Пул закрывается до выгрузки модулей, импортированных лениво
+atexit.register(_shutdown)
@@ -0,0 +1,524 @@
+"""
+Разбор команд работы с записями (select, insert, update, delete) в план:
+таблица, условие where, параметры выборки, значения set/values.
+Планы хранятся в LRU-кэше по нормализованному тексту команды, в котором
+значения заменены параметрами '?': 'select from t where ID = 5' и
+'select from t where ID = 7' используют один план, при повторе команда
+не разбирается заново - в копию плана подставляются значения
+"""
+import os
+import re
+import shlex
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from src.primitive_db import metrics
+from src.primitive_db.aggregates import Aggregate, parse_aggregates
+from src.primitive_db.constants import (
+    INDEX_ROW_COST,
+    PARALLEL_ROW_COST,
+    PARALLEL_SPAWN_COST,
+    PARALLEL_TASK_COST,
+    PLAN_CACHE_SIZE,
+    ROW_BUILD_COST,
+    SCAN_ROW_COST,
+)
+from src.primitive_db.predicates import (
+    COMPARISONS,
+    And,
+    Comparison,
+    Or,
+    Predicate,
+    Quoted,
+    parse_where,
+    raw_text,
+    tokenize,
+)
+
+# Параметр в нормализованном тексте команды
+PARAM = "?"
+# Команды, которые разбираются в план
+STATEMENTS = ("select", "insert", "update", "delete")
+
+# Доля записей, удовлетворяющих сравнению, если статистика таблицы его
+# не оценивает (как в классических оптимизаторах: равенство - 1/10,
+# диапазон - 1/3)
+SELECTIVITY = {"=": 0.1, "!=": 0.9, "<": 1 / 3, ">": 1 / 3, "<=": 1 / 3,
+               ">=": 1 / 3, "between": 0.25}
+
+# Символы, при которых строку команды нужно разбирать shlex (кавычки, экранирование)
+_SHLEX_CHARS = re.compile(r"[\"'\\]")
+# Части наборов значений insert: строка в кавычках, скобка, запятая
+# или текст без них (вместе с пробелами)
+_VALUE_TOKEN_RE = re.compile(r""""(?:[^"\\]|\\.)*"|'[^']*'|[(),]|[^(),"']+""")
+# Исходный текст одного аргумента: символы, экранирования и части в кавычках
+_ARG_RE = re.compile(r"""(?:[^\s"'\\]|\\.|"(?:[^"\\]|\\.)*"|'[^']*')+""")
+
+"""
+План команды. command - select, aggregate (select с агрегатами), insert,
+update или delete; key - нормализованный текст команды (None, если
+команда разобрана без кэша), cached - план взят из кэша
+"""
+class Plan:
+    def __init__(self, command: str, table: str,
+                 where: Optional[Predicate] = None,
+                 limit: Optional[int] = None,
+                 offset: int = 0,
+                 page: bool = False,
+                 aggregates: Optional[List[Aggregate]] = None,
+                 group_by: Optional[str] = None,
+                 set_clause: Optional[Dict[str, str]] = None,
+                 values_list: Optional[List[List[str]]] = None):
+        self.command = command
+        self.table = table
+        self.where = where
+        self.limit = limit
+        self.offset = offset
+        self.page = page
+        self.aggregates = aggregates
+        self.group_by = group_by
+        self.set_clause = set_clause
+        self.values_list = values_list
+        self.key: Optional[str] = None
+        self.cached = False
+
+    """
+    Копия плана-шаблона со значениями параметров (по порядку в тексте команды).
+    None - число параметров не совпало с шаблоном
+    """
+    def bind(self, params: List[str]) -> Optional["Plan"]:
+        values = iter(params)
+        try:
+            plan = Plan(self.command, self.table, None, self.limit, self.offset,
+                        self.page, self.aggregates, self.group_by)
+            if self.set_clause is not None:
+                plan.set_clause = {col: next(values) for col in self.set_clause}
+            if self.command == "insert":
+                plan.values_list = parse_values_list(next(values))
+            if self.where is not None:
+                plan.where = _fill(self.where, values)
+        except StopIteration:
+            return None
+        if next(values, None) is not None:
+            return None
+        plan.key = self.key
+        return plan
+
+
+"""
+Условие шаблона со значениями параметров вместо '?'
+"""
+def _fill(pred: Predicate, values: Iterator[str]) -> Predicate:
+    if isinstance(pred, (And, Or)):
+        return type(pred)([_fill(item, values) for item in pred.items])
+    return Comparison(pred.column, pred.op, [next(values) for _ in pred.values])
+
+
+"""
+LRU-кэш планов: нормализованный текст -> план-шаблон.
+Кэшем пользуются потоки сервера, поэтому он под блокировкой
+"""
+class PlanCache:
+    def __init__(self, max_plans: int = PLAN_CACHE_SIZE):
+        self.max_plans = max_plans
+        self.hits = 0
+        self.misses = 0
+        self._plans: "OrderedDict[Tuple[str, ...], Plan]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, ...]) -> Optional[Plan]:
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._plans.move_to_end(key)
+            return plan
+
+    def put(self, key: Tuple[str, ...], plan: Plan) -> None:
+        with self._lock:
+            self._plans[key] = plan
+            self._plans.move_to_end(key)
+            while len(self._plans) > self.max_plans:
+                self._plans.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._plans)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._plans.clear()
+            self.hits = self.misses = 0
+
+
+plan_cache = PlanCache()
+
+"""
+Разбиение строки команды на аргументы. Строка без кавычек и обратной
+косой черты разбивается по пробелам, без медленного shlex; аргументы
+с кавычками возвращаются как Quoted (с исходным текстом)
+"""
+def split_command(line: str) -> List[str]:
+    if _SHLEX_CHARS.search(line) is None:
+        return line.split()
+    args = shlex.split(line)
+    texts = _ARG_RE.findall(line)
+    if len(texts) != len(args):
+        return args
+    return [Quoted(arg, text) if _SHLEX_CHARS.search(text) else arg
+            for arg, text in zip(args, texts)]
+
+"""
+Парсинг строки вида 'age = 28' (часть set команды update).
+Возвращает словарь вида {'age': '28'}.
+"""
+def parse_where_or_set(clause: str) -> Dict[str, str]:
+    clause = clause.strip()
+    if ' = ' not in clause:
+        raise ValueError(f"Некорректный формат условия: {clause}. \
+                         Ожидается 'ключ = значение'.")
+
+    key, value = clause.split(' = ', 1)
+    key = key.strip()
+    value = value.strip()
+
+    if not key:
+        raise ValueError(f"Ключ не может быть пустым в: {clause}")
+
+    if not key.replace('_', '').isalnum():
+        raise ValueError(f"Некорректное имя столбца: {key}")
+
+    return {key: value}
+
+"""
+Парсинг значений вида '(v1, v2), (v3, v4)' по исходному тексту команды.
+Значение в кавычках ("x(y", 'a, b') - одно значение, даже если содержит
+скобки или запятые; без кавычек скобки внутри набора недопустимы.
+Возвращает список наборов значений: [['v1', 'v2'], ['v3', 'v4']].
+"""
+def parse_values_list(values_str: str) -> List[List[str]]:
+    values_str = values_str.strip()
+    if not (values_str.startswith("(") and values_str.endswith(")")):
+        raise ValueError("Ожидались значения в скобках: (val1, val2, ...)")
+
+    pieces = _VALUE_TOKEN_RE.findall(values_str)
+    if sum(map(len, pieces)) != len(values_str):
+        raise ValueError("Незакрытая кавычка в значениях.")
+    values_list: List[List[str]] = []
+    group: Optional[List[str]] = None
+    # Части текущего значения: (текст, в кавычках ли)
+    value: List[Tuple[str, bool]] = []
+    expect_group = True
+    for piece in pieces:
+        if group is None:
+            # Между наборами - только запятая и пробелы
+            if piece == "(" and expect_group:
+                group = []
+                expect_group = False
+            elif piece == "," and not expect_group:
+                expect_group = True
+            elif piece.strip():
+                raise ValueError(f"Неожиданный фрагмент значений: {piece.strip()}")
+            continue
+        if piece in (",", ")"):
+            if value or piece == "," or group:
+                group.append(_join_value(value))
+            value = []
+            if piece == ")":
+                values_list.append(group)
+                group = None
+        elif not value and piece.isspace():
+            continue
+        elif piece == "(":
+            raise ValueError("Скобка внутри набора значений: \
+                             заключите значение в кавычки.")
+        elif piece[0] in "\"'":
+            value.append((shlex.split(piece)[0], True))
+        else:
+            value.append((piece, False))
+    if group is not None or expect_group:
+        raise ValueError("Ожидались значения в скобках: (val1, val2, ...)")
+    return values_list
+
+"""
+Значение набора из частей: пробелы по краям частей без кавычек отбрасываются
+"""
+def _join_value(parts: List[Tuple[str, bool]]) -> str:
+    if parts and not parts[0][1]:
+        parts[0] = (parts[0][0].lstrip(), False)
+    if parts and not parts[-1][1]:
+        parts[-1] = (parts[-1][0].rstrip(), False)
+    return "".join(text for text, _ in parts)
+
+"""
+Разбор необязательных частей select: limit N, offset M, --page.
+Возвращает оставшиеся аргументы (условие where), limit, offset и флаг page
+"""
+def parse_select_options(
+    args: List[str]
+) -> Tuple[List[str], Optional[int], int, bool]:
+    rest = []
+    limit = None
+    offset = 0
+    page = False
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg == "--page":
+            page = True
+        elif arg in ("limit", "offset"):
+            if i + 1 >= len(args) or not args[i + 1].isdigit():
+                raise ValueError(f"После {arg} ожидается неотрицательное число.")
+            if arg == "limit":
+                limit = int(args[i + 1])
+            else:
+                offset = int(args[i + 1])
+            i += 1
+        else:
+            rest.append(arg)
+        i += 1
+    return rest, limit, offset, page
+
+"""
+Отделение 'group by <столбец>' в конце аргументов select.
+Возвращает оставшиеся аргументы и столбец группировки (или None)
+"""
+def parse_group_by(args: List[str]) -> Tuple[List[str], Optional[str]]:
+    if len(args) >= 3 and args[-3] == "group" and args[-2] == "by":
+        return args[:-3], args[-1]
+    return args, None
+
+"""
+Условие where из оставшихся аргументов select: 'where ...' или ничего
+"""
+def _parse_rest_where(rest: List[str]) -> Optional[Predicate]:
+    if rest and rest[0] == "where" and len(rest) >= 2:
+        return parse_where(rest[1:])
+    if rest:
+        raise ValueError(f"Неожиданные аргументы: {' '.join(rest)}")
+    return None
+
+"""
+Разбор команды в план без кэша
+"""
+def parse_statement(args: List[str]) -> Plan:
+    command = args[0]
+
+    if command == "insert":
+        if len(args) < 4 or args[1] != "into" or args[3] != "values":
+            raise ValueError("Некорректный синтаксис: insert \
+                  into <таблица> values (значения...)")
+        values = raw_text(args[4:])
+        # В шаблоне значения - параметр, они разбираются при подстановке
+        values_list = None if values == PARAM else parse_values_list(values)
+        return Plan("insert", args[2], values_list=values_list)
+
+    if command == "select" and "from" in args[2:]:
+        # select <агрегаты> from <таблица> [where ...] [group by <столбец>]
+        from_pos = args.index("from")
+        if from_pos + 1 >= len(args):
+            raise ValueError("Некорректный синтаксис: select count(*), sum(<столбец>), \
+                  ... from <таблица> [where ...] [group by <столбец>]")
+        aggregates = parse_aggregates(" ".join(args[1:from_pos]))
+        rest, limit, offset, page = parse_select_options(args[from_pos + 2:])
+        rest, group_by = parse_group_by(rest)
+        if page:
+            raise ValueError("--page не поддерживается для агрегатов.")
+        return Plan("aggregate", args[from_pos + 1], _parse_rest_where(rest),
+                    limit, offset, aggregates=aggregates, group_by=group_by)
+
+    if command == "select":
+        if len(args) < 3 or args[1] != "from":
+            raise ValueError("Некорректный синтаксис: select from <таблица> \
+                  [where ...]")
+        rest, limit, offset, page = parse_select_options(args[3:])
+        return Plan("select", args[2], _parse_rest_where(rest), limit, offset, page)
+
+    if command == "update":
+        if len(args) < 4 or args[2] != "set":
+            raise ValueError("Некорректный синтаксис: update <таблица> \
+                  set col=val [where ...]")
+        set_part = []
+        where_part = []
+        in_set = True
+        for arg in args[3:]:
+            if arg == "where":
+                in_set = False
+                continue
+            if in_set:
+                set_part.append(arg)
+            else:
+                where_part.append(arg)
+
+        if not set_part:
+            raise ValueError("Нет данных для обновления.")
+        set_clause = parse_where_or_set(" ".join(set_part))
+        if not where_part:
+            raise ValueError("Условие 'where' обязательно для update.")
+        return Plan("update", args[1], parse_where(where_part),
+                    set_clause=set_clause)
+
+    if command == "delete":
+        if len(args) < 4 or args[1] != "from" or args[3] != "where":
+            raise ValueError("Некорректный синтаксис: delete from <таблица> where ...")
+        return Plan("delete", args[2], parse_where(args[4:]))
+
+    raise ValueError(f"Команда {command} не разбирается в план: \
+                     ожидается {', '.join(STATEMENTS)}.")
+
+"""
+Значения условия where заменяются параметрами: лексема после оператора
+сравнения, после between и его and, элементы списка in (...).
+Возвращает лексемы с '?' вместо значений и сами значения по порядку
+"""
+def _normalize_where(tokens: List[str]) -> Tuple[List[str], List[str]]:
+    key: List[str] = []
+    params: List[str] = []
+    value_next = in_list = open_list = between = False
+    for token in tokens:
+        if value_next:
+            key.append(PARAM)
+            params.append(token)
+            value_next = False
+            continue
+        if in_list:
+            if isinstance(token, Quoted):
+                key.append(PARAM)
+                params.append(token)
+            elif token in (",", "("):
+                key.append(token)
+            elif token == ")":
+                key.append(token)
+                in_list = False
+            else:
+                key.append(PARAM)
+                params.append(token)
+            continue
+        key.append(token)
+        word = "" if isinstance(token, Quoted) else token.lower()
+        if open_list:
+            in_list = token == "("
+            open_list = False
+        elif word and (token in COMPARISONS or token == "<>"):
+            value_next = True
+        elif word == "between":
+            value_next = between = True
+        elif word == "and" and between:
+            value_next = True
+            between = False
+        elif word == "in":
+            open_list = True
+    return key, params
+
+"""
+Нормализованный текст команды (лексемы с '?' вместо значений) и значения
+параметров. Ключ None - команду нельзя нормализовать, она разбирается без кэша
+"""
+def normalize(args: List[str]) -> Tuple[Optional[Tuple[str, ...]], List[str]]:
+    command = args[0]
+    if command == "insert":
+        if len(args) < 5:
+            return None, []
+        return (*args[:4], PARAM), [raw_text(args[4:])]
+    if command not in STATEMENTS:
+        return None, []
+    if "where" not in args:
+        return tuple(args), []
+
+    where_pos = args.index("where")
+    head = args[:where_pos]
+    params: List[str] = []
+    if command == "update":
+        set_part = head[3:]
+        if len(set_part) >= 3 and set_part[1] == "=":
+            head = [*head[:3], set_part[0], "=", PARAM]
+            params.append(" ".join(set_part[2:]))
+    tokens, where_params = _normalize_where(tokenize(args[where_pos + 1:]))
+    return (*head, "where", *tokens), params + where_params
+
+"""
+План команды: из кэша по нормализованному тексту (с подстановкой значений)
+или разбором команды. Ошибка синтаксиса - ValueError с тем же сообщением,
+что и при разборе исходной команды
+"""
+@metrics.timed("parse")
+def plan_statement(args: List[str]) -> Plan:
+    key, params = normalize(args)
+    if key is None:
+        return parse_statement(args)
+
+    template = plan_cache.get(key)
+    cached = template is not None
+    if template is None:
+        try:
+            template = parse_statement(list(key))
+        except ValueError:
+            # Сообщение об ошибке - по исходной команде, а не по шаблону
+            return parse_statement(args)
+        template.key = " ".join(key).replace("( ", "(").replace(" )", ")") \
+            .replace(" ,", ",")
+        plan_cache.put(key, template)
+    plan = template.bind(params)
+    if plan is None:
+        return parse_statement(args)
+    plan.cached = cached
+    return plan
+
+"""
+Оценка доли записей, удовлетворяющих условию (None - все записи), по
+статистике таблицы stats (stats.TableStats, значения условия приведены
+к типам столбцов) или, без нее, по постоянным долям SELECTIVITY.
+Условия and считаются независимыми, or - объединением независимых
+"""
+def estimate_selectivity(pred: Optional[Predicate], stats: Any = None) -> float:
+    if pred is None:
+        return 1.0
+    if isinstance(pred, And):
+        result = 1.0
+        for item in pred.items:
+            result *= estimate_selectivity(item, stats)
+        return result
+    if isinstance(pred, Or):
+        missed = 1.0
+        for item in pred.items:
+            missed *= 1.0 - estimate_selectivity(item, stats)
+        return 1.0 - missed
+    if stats is not None:
+        share = stats.selectivity(pred.column, pred.op, pred.values)
+        if share is not None:
+            return share
+    if pred.op in ("in", "not in"):
+        share = min(1.0, SELECTIVITY["="] * len(set(pred.values)))
+        return share if pred.op == "in" else 1.0 - share
+    return SELECTIVITY[pred.op]
+
+"""
+Число сравнений в условии (каждое проверяется при переборе для всех записей)
+"""
+def count_comparisons(pred: Optional[Predicate]) -> int:
+    if pred is None:
+        return 0
+    if isinstance(pred, (And, Or)):
+        return sum(count_comparisons(item) for item in pred.items)
+    return 1
+
+"""
+Оценка стоимости способа доступа к записям, микросекунды (см. *_COST
+в constants.py). scan - перебор rows записей по столбцам с comparisons
+сравнениями, parallel - тот же перебор в workers процессах (spawn - пул
+еще не запущен), index - поиск found записей по индексу или ID.
+matched - оценка числа подходящих записей, которые создаются при переборе
+"""
+def access_cost(kind: str, rows: int, comparisons: int, matched: float,
+                found: float = 0, workers: int = 1, spawn: bool = False) -> float:
+    if kind == "scan":
+        return rows * comparisons * SCAN_ROW_COST + matched * ROW_BUILD_COST
+    if kind == "parallel":
+        cost = PARALLEL_TASK_COST + (PARALLEL_SPAWN_COST * workers if spawn else 0)
+        # Процессов больше, чем процессоров, не ускоряют проверку
+        cpus = min(workers, os.cpu_count() or 1)
+        share = comparisons * SCAN_ROW_COST / cpus
+        return cost + rows * (share + PARALLEL_ROW_COST) + matched * ROW_BUILD_COST
+    return found * INDEX_ROW_COST
@@ -0,0 +1,347 @@
+import operator
+import re
+import shlex
+from itertools import repeat
+from typing import Any, Callable, Dict, Iterable, List, Tuple, Union
+
+from src.primitive_db import metrics
+
+Row = Dict[str, Any]
+Matcher = Callable[[Row], bool]
+# Значения столбца по позициям и признак того, что среди них может быть None
+ColumnGetter = Callable[[str], Tuple[Iterable[Any], bool]]
+
+COMPARISONS = {
+    "=": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    ">": operator.gt,
+    "<=": operator.le,
+    ">=": operator.ge,
+}
+RANGE_OPERATORS = ("<", ">", "<=", ">=", "between")
+
+# Лексема условия: оператор, скобка, запятая или значение; значение может
+# содержать части в кавычках и экранированные символы ("a=b", 'x y', a\ b)
+_TOKEN_RE = re.compile(r"""<=|>=|!=|<>|=|<|>|\(|\)|,"""
+                       r"""|(?:[^\s=<>!(),"'\\]|\\.|"(?:[^"\\]|\\.)*"|'[^']*')+""")
+# Кавычки и обратная косая черта - признак того, что текст нужно разбирать shlex
+_QUOTE_RE = re.compile(r"[\"'\\]")
+
+"""
+Условие на один столбец: column op values.
+op - один из COMPARISONS, "in", "not in" или "between";
+values - список значений (строки после разбора, типизированные после bind)
+"""
+class Comparison:
+    def __init__(self, column: str, op: str, values: List[Any]):
+        self.column = column
+        self.op = op
+        self.values = values
+
+    def __str__(self) -> str:
+        if self.op in ("in", "not in"):
+            return f"{self.column} {self.op} ({', '.join(map(str, self.values))})"
+        if self.op == "between":
+            return f"{self.column} between {self.values[0]} and {self.values[1]}"
+        return f"{self.column} {self.op} {self.values[0]}"
+
+
+"""
+Логическое И / ИЛИ над несколькими условиями
+"""
+class And:
+    def __init__(self, items: List["Predicate"]):
+        self.items = items
+
+    def __str__(self) -> str:
+        return " and ".join(_wrap(item) for item in self.items)
+
+
+class Or:
+    def __init__(self, items: List["Predicate"]):
+        self.items = items
+
+    def __str__(self) -> str:
+        return " or ".join(_wrap(item) for item in self.items)
+
+
+Predicate = Union[Comparison, And, Or]
+
+
+def _wrap(item: Predicate) -> str:
+    return f"({item})" if isinstance(item, (And, Or)) else str(item)
+
+"""
+Аргумент команды, записанный с кавычками или экранированием: строка -
+значение без кавычек, raw - исходный текст аргумента. По raw разбор
+условий и наборов значений отличает "a=b" (одно значение) от a=b
+"""
+class Quoted(str):
+    raw: str
+
+    def __new__(cls, value: str, raw: str) -> "Quoted":
+        obj = super().__new__(cls, value)
+        obj.raw = raw
+        return obj
+
+    def __getnewargs__(self) -> Tuple[str, str]:
+        return str(self), self.raw
+
+"""
+Исходный текст аргументов команды (с кавычками аргументов Quoted)
+"""
+def raw_text(args: List[str]) -> str:
+    return " ".join(getattr(arg, "raw", arg) for arg in args)
+
+"""
+Лексемы текста с кавычками: значение в кавычках - одна лексема Quoted,
+даже если содержит операторы, скобки, запятые или пробелы.
+Незакрытая кавычка - ValueError
+"""
+def _quoted_tokens(text: str) -> List[str]:
+    shlex.split(text)
+    tokens = []
+    for token in _TOKEN_RE.findall(text):
+        if _QUOTE_RE.search(token):
+            token = Quoted(shlex.split(token)[0], token)
+        tokens.append(token)
+    return tokens
+
+"""
+Разбиение условия на лексемы.
+Аргумент, содержащий пробелы (значение в кавычках), остается одной лексемой;
+аргументы с кавычками (Quoted) разбираются по исходному тексту
+"""
+def tokenize(args: Union[str, List[str]]) -> List[str]:
+    if isinstance(args, str):
+        if _QUOTE_RE.search(args):
+            return _quoted_tokens(args)
+        return _TOKEN_RE.findall(args)
+    text = " ".join(args)
+    if len(text.split()) == len(args) and not any(
+            isinstance(arg, Quoted) for arg in args):
+        # Пробелов и кавычек внутри аргументов нет - лексемы не пересекают
+        # границы аргументов, и строка разбирается за один проход
+        return _TOKEN_RE.findall(text)
+    tokens = []
+    for arg in args:
+        if isinstance(arg, Quoted):
+            tokens.extend(_quoted_tokens(arg.raw))
+        elif any(ch.isspace() for ch in arg):
+            tokens.append(arg)
+        else:
+            tokens.extend(_TOKEN_RE.findall(arg))
+    return tokens
+
+
+class _Parser:
+    def __init__(self, tokens: List[str]):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self) -> str:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else ""
+
+    """
+    Следующая лексема как служебная (скобка, запятая, ключевое слово):
+    значение в кавычках служебным не бывает
+    """
+    def symbol(self) -> str:
+        token = self.peek()
+        return "" if isinstance(token, Quoted) else token
+
+    def keyword(self, word: str) -> bool:
+        if self.symbol().lower() == word:
+            self.pos += 1
+            return True
+        return False
+
+    def take(self, what: str) -> str:
+        token = self.peek()
+        if not token:
+            raise ValueError(f"Неожиданный конец условия: ожидается {what}.")
+        self.pos += 1
+        return token
+
+    def expect(self, token: str) -> None:
+        if self.symbol() != token:
+            self.take(f"'{token}'")
+            raise ValueError(f"Ожидается '{token}' в позиции {self.pos}.")
+        self.pos += 1
+
+    def parse_or(self) -> Predicate:
+        items = [self.parse_and()]
+        while self.keyword("or"):
+            items.append(self.parse_and())
+        return items[0] if len(items) == 1 else Or(items)
+
+    def parse_and(self) -> Predicate:
+        items = [self.parse_atom()]
+        while self.keyword("and"):
+            items.append(self.parse_atom())
+        return items[0] if len(items) == 1 else And(items)
+
+    def parse_atom(self) -> Predicate:
+        if self.symbol() == "(":
+            self.pos += 1
+            node = self.parse_or()
+            self.expect(")")
+            return node
+
+        column = self.take("имя столбца")
+        if not column.replace('_', '').isalnum():
+            raise ValueError(f"Некорректное имя столбца: {column}")
+
+        if self.keyword("between"):
+            low = self.take("значение")
+            if not self.keyword("and"):
+                raise ValueError("Ожидается 'between <значение> and <значение>'.")
+            return Comparison(column, "between", [low, self.take("значение")])
+
+        op = "not in" if self.keyword("not") else ""
+        if self.keyword("in"):
+            self.expect("(")
+            values = [self.take("значение")]
+            while self.symbol() == ",":
+                self.pos += 1
+                values.append(self.take("значение"))
+            self.expect(")")
+            return Comparison(column, op or "in", values)
+        if op:
+            raise ValueError("Ожидается 'not in'.")
+
+        op = self.take("оператор сравнения")
+        op = "!=" if op == "<>" else op
+        if op not in COMPARISONS or isinstance(op, Quoted):
+            raise ValueError(f"Неизвестный оператор: {op}. \
+                             Поддерживаются: {', '.join(COMPARISONS)}, in, between")
+        return Comparison(column, op, [self.take("значение")])
+
+"""
+Разбор условия where: сравнения =, !=, <, >, <=, >=, in (...), not in (...),
+between ... and ..., связанные and/or (and приоритетнее), и скобки
+"""
+@metrics.timed("parse")
+def parse_where(args: Union[str, List[str]]) -> Predicate:
+    parser = _Parser(tokenize(args))
+    if not parser.tokens:
+        raise ValueError("Пустое условие where.")
+    node = parser.parse_or()
+    if parser.peek():
+        raise ValueError(f"Неожиданный фрагмент условия: \
+                         {' '.join(parser.tokens[parser.pos:])}")
+    return node
+
+"""
+Приведение значений условия к типам столбцов схемы (один раз на запрос).
+types - словарь столбец -> тип, cast - функция приведения строки к типу
+"""
+def bind(pred: Predicate, types: Dict[str, str],
+         cast: Callable[[str, str], Any]) -> Predicate:
+    if isinstance(pred, (And, Or)):
+        return type(pred)([bind(item, types, cast) for item in pred.items])
+    if pred.column not in types:
+        raise KeyError(pred.column)
+    col_type = types[pred.column]
+    return Comparison(pred.column, pred.op,
+                      [cast(str(value), col_type) for value in pred.values])
+
+"""
+Компиляция типизированного условия в функцию проверки записи.
+Значения сравниваются в своих типах, без преобразования в строку
+"""
+def compile_matcher(pred: Predicate) -> Matcher:
+    if isinstance(pred, (And, Or)):
+        matchers = [compile_matcher(item) for item in pred.items]
+        if isinstance(pred, And):
+            def match_all(row: Row) -> bool:
+                for matcher in matchers:
+                    if not matcher(row):
+                        return False
+                return True
+            return match_all
+
+        def match_any(row: Row) -> bool:
+            for matcher in matchers:
+                if matcher(row):
+                    return True
+            return False
+        return match_any
+
+    column = pred.column
+    if pred.op in ("in", "not in"):
+        values = frozenset(pred.values)
+        if pred.op == "in":
+            return lambda row: row.get(column) in values
+        return lambda row: row.get(column) not in values
+    if pred.op == "between":
+        low, high = pred.values
+        def match_between(row: Row) -> bool:
+            value = row.get(column)
+            return value is not None and low <= value <= high
+        return match_between
+
+    value = pred.values[0]
+    compare = COMPARISONS[pred.op]
+    if pred.op == "=":
+        return lambda row: row.get(column) == value
+    if pred.op == "!=":
+        return lambda row: row.get(column) != value
+
+    def match_order(row: Row) -> bool:
+        current = row.get(column)
+        return current is not None and compare(current, value)
+    return match_order
+
+"""
+Результат типизированного условия для каждой позиции столбцов.
+column(name) возвращает значения столбца и признак возможного None:
+каждое сравнение вычисляется сразу для всего столбца, результаты
+объединяются по and/or
+"""
+def column_mask(pred: Predicate, column: ColumnGetter) -> List[Any]:
+    if isinstance(pred, (And, Or)):
+        combine = operator.and_ if isinstance(pred, And) else operator.or_
+        masks = [column_mask(item, column) for item in pred.items]
+        result = masks[0]
+        for mask in masks[1:]:
+            result = list(map(combine, result, mask))
+        return result
+
+    # Отсутствующее значение проверяется как None, как и в compile_matcher
+    values, nullable = column(pred.column)
+    op = pred.op
+    if op in ("in", "not in"):
+        mask = list(map(frozenset(pred.values).__contains__, values))
+        return mask if op == "in" else list(map(operator.not_, mask))
+    if op in ("=", "!="):
+        return list(map(COMPARISONS[op], values, repeat(pred.values[0])))
+    if op == "between":
+        low, high = pred.values
+        if nullable:
+            return [v is not None and low <= v <= high for v in values]
+        return [low <= v <= high for v in values]
+    compare = COMPARISONS[op]
+    value = pred.values[0]
+    if nullable:
+        return [v is not None and compare(v, value) for v in values]
+    return list(map(compare, values, repeat(value)))
+
+"""
+Столбцы, которые проверяет условие (без повторов, в порядке появления)
+"""
+def predicate_columns(pred: Predicate) -> List[str]:
+    if isinstance(pred, (And, Or)):
+        names: Dict[str, None] = {}
+        for item in pred.items:
+            names.update(dict.fromkeys(predicate_columns(item)))
+        return list(names)
+    return [pred.column]
+
+"""
+Условия, которые должны выполняться для всех подходящих записей
+(само условие или части верхнего уровня and) - кандидаты для индекса
+"""
+def conjuncts(pred: Predicate) -> List[Predicate]:
+    return pred.items if isinstance(pred, And) else [pred]
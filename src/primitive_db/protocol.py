@@ -0,0 +1,23 @@
+from typing import Tuple
+
+"""
+Протокол сервера: клиент отправляет команды по одной на строку (UTF-8),
+на каждую сервер отвечает строкой заголовка 'ok|error <байт stdout> <байт stderr>'
+и затем выводом команды (stdout, потом stderr). Ответы идут в порядке команд,
+поэтому клиент может отправить несколько команд, не дожидаясь ответов.
+Модуль не зависит от остального пакета: его использует тонкий клиент
+"""
+def encode_response(ok: bool, out: str, err: str) -> bytes:
+    out_bytes = out.encode("utf-8")
+    err_bytes = err.encode("utf-8")
+    header = f"{'ok' if ok else 'error'} {len(out_bytes)} {len(err_bytes)}\n"
+    return header.encode("ascii") + out_bytes + err_bytes
+
+"""
+Разбор строки заголовка ответа: (успех, байт stdout, байт stderr)
+"""
+def parse_header(line: bytes) -> Tuple[bool, int, int]:
+    parts = line.decode("ascii").split()
+    if len(parts) != 3 or parts[0] not in ("ok", "error"):
+        raise ValueError(f"Некорректный ответ сервера: {line!r}")
+    return parts[0] == "ok", int(parts[1]), int(parts[2])
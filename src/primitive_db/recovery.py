@@ -0,0 +1,125 @@
+import glob
+import os
+from typing import List
+
+from src.primitive_db import binary
+from src.primitive_db.constants import (
+    DATA_DIR,
+    RESTORE_FILE,
+    RESTORE_STAGING_PREFIX,
+    TXN_FILE,
+)
+from src.primitive_db.storage import TMP_SUFFIX, get_storage
+from src.primitive_db.transaction import replay_journal
+
+# Сколько байт с конца файла читать при проверке и поиске конца строки
+_TAIL_BYTES = 64 * 1024
+
+"""
+Проверка JSON файла на обрыв записи: пустой файл или файл, который
+не заканчивается закрывающей скобкой. Файл целиком не разбирается
+"""
+def is_torn_json(path: str) -> bool:
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(_TAIL_BYTES).lstrip()
+            f.seek(max(0, os.path.getsize(path) - _TAIL_BYTES))
+            tail = f.read().rstrip()
+    except FileNotFoundError:
+        return False
+    if not head or not tail:
+        return True
+    closing = {ord("["): ord("]"), ord("{"): ord("}")}.get(head[0])
+    return closing is None or tail[-1] != closing
+
+"""
+Отбрасывание недописанной последней строки журнала (без перевода строки).
+Возвращает число отброшенных байт
+"""
+def truncate_torn_log(path: str) -> int:
+    with open(path, 'rb+') as f:
+        size = f.seek(0, os.SEEK_END)
+        end = size
+        while end > 0:
+            start = max(0, end - _TAIL_BYTES)
+            f.seek(start)
+            chunk = f.read(end - start)
+            if end == size and chunk.endswith(b"\n"):
+                return 0
+            newline = chunk.rfind(b"\n")
+            if newline != -1:
+                end = start + newline + 1
+                break
+            end = start
+        f.truncate(end)
+        return size - end
+
+"""
+Проверка файлов базы при запуске: удаляет временные файлы прерванных
+атомарных записей, обрезает недописанные строки журналов, удаляет
+поврежденные файлы индексов и статистики, сообщает о поврежденных снапшотах
+и метаданных, завершает прерванное восстановление из копии (restore)
+и прерванный commit по журналу транзакции.
+Вызывается под исключительной блокировкой базы (других команд в это время нет).
+Возвращает список сообщений о найденных проблемах
+"""
+def check_files(db_file: str) -> List[str]:
+    problems = []
+    # Модуль копий (tarfile, gzip) загружается, только если есть
+    # следы прерванного восстановления
+    restored = None
+    if os.path.exists(RESTORE_FILE) or glob.glob(
+            os.path.join(glob.escape(DATA_DIR), RESTORE_STAGING_PREFIX + "*")):
+        from src.primitive_db.backup import finish_restore
+        restored = finish_restore()
+    if restored is not None:
+        problems.append(f"Завершено прерванное восстановление из копии \
+                        (таблиц: {restored}).")
+    data_files = []
+    if os.path.isdir(DATA_DIR):
+        data_files = [os.path.join(DATA_DIR, name)
+                      for name in sorted(os.listdir(DATA_DIR))]
+
+    tmp_files = [
+        path
+        for name in (db_file, TXN_FILE, RESTORE_FILE)
+        for path in glob.glob(glob.escape(name) + "*" + TMP_SUFFIX)
+    ]
+    for path in [*tmp_files, *data_files]:
+        if path.endswith(TMP_SUFFIX) and os.path.exists(path):
+            os.remove(path)
+            problems.append(f"Удален временный файл прерванной записи: {path}")
+
+    if is_torn_json(db_file):
+        problems.append(f"Файл метаданных {db_file} поврежден (запись оборвана).")
+
+    for path in data_files:
+        if path.endswith(".idx.json"):
+            if is_torn_json(path):
+                os.remove(path)
+                problems.append(f"Файл индексов {path} поврежден и удален, \
+                                индексы нужно создать заново (create_index).")
+        elif path.endswith(".stats.json"):
+            if is_torn_json(path):
+                os.remove(path)
+                problems.append(f"Файл статистики {path} поврежден и удален, \
+                                статистика будет посчитана заново.")
+        elif path.endswith(".json"):
+            if is_torn_json(path):
+                problems.append(f"Снапшот таблицы {path} поврежден \
+                                (запись оборвана).")
+        elif path.endswith(".bin"):
+            if binary.is_torn(path):
+                problems.append(f"Файл таблицы {path} поврежден \
+                                (запись оборвана).")
+        elif path.endswith(".log"):
+            cut = truncate_torn_log(path)
+            if cut:
+                problems.append(f"Журнал {path}: отброшена недописанная \
+                                последняя строка ({cut} байт).")
+
+    replayed = replay_journal(get_storage())
+    if replayed is not None:
+        problems.append(f"Завершена прерванная фиксация транзакции \
+                        (таблиц: {replayed}).")
+    return problems
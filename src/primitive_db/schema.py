@@ -0,0 +1,109 @@
+"""
+Разобранная схема таблицы: столбцы 'имя:тип' из метаданных разбиваются
+один раз и хранятся в кэше по имени таблицы, пока столбцы или версия
+схемы в метаданных не изменятся.
+
+Изменения схемы (alter_table) нумеруются версиями таблицы (создание - 1)
+и записываются операцией журнала таблицы
+{"op": "alter", "v": <версия>, "action": "add"|"drop"|"rename", ...}:
+add - "column", "type" и необязательное "default", drop - "column",
+rename - "column" и новое имя "to". Записи на диске не переписываются:
+записи прежних версий приводятся к последней версии при чтении
+(alter_row, upgrade_row, а по столбцам - ColumnarTable.alter),
+на диске - при сворачивании журнала
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+Row = Dict[str, Any]
+Op = Dict[str, Any]
+
+ALTER_ACTIONS = ("add", "drop", "rename")
+
+"""
+Схема одной таблицы: имена столбцов, типы и пары (имя, тип) столбцов данных,
+версия схемы и значения по умолчанию столбцов, добавленных с default
+"""
+class Schema:
+    def __init__(self, columns: List[str], version: int = 1,
+                 defaults: Optional[Dict[str, Any]] = None):
+        self.columns = list(columns)
+        pairs = [tuple(spec.split(":", 1)) for spec in columns]
+        self.names: List[str] = [name for name, _ in pairs]
+        self.types: Dict[str, str] = dict(pairs)
+        self.data_columns: List[Tuple[str, str]] = pairs[1:]
+        self.version = version
+        self.defaults: Dict[str, Any] = dict(defaults or {})
+
+
+_schemas: Dict[str, Schema] = {}
+
+"""
+Схема таблицы из метаданных (таблица должна существовать)
+"""
+def get_schema(metadata: Dict[str, Dict[str, Any]], table_name: str) -> Schema:
+    entry = metadata[table_name]
+    columns = entry["columns"]
+    version = entry.get("version", 1)
+    schema = _schemas.get(table_name)
+    if schema is None or schema.columns != columns or schema.version != version:
+        schema = _schemas[table_name] = Schema(columns, version,
+                                               entry.get("defaults"))
+    return schema
+
+"""
+Запись после изменения схемы change (новый словарь; запись без изменений -
+та же). Столбец, добавленный без default, в прежних записях отсутствует
+"""
+def alter_row(row: Row, change: Op) -> Row:
+    action, name = change["action"], change["column"]
+    if action == "add":
+        if change.get("default") is None:
+            return row
+        return {**row, name: change["default"]}
+    if name not in row:
+        return row
+    if action == "drop":
+        return {key: value for key, value in row.items() if key != name}
+    return {change["to"] if key == name else key: value
+            for key, value in row.items()}
+
+"""
+Столбцы 'имя:тип' после изменения схемы change
+"""
+def alter_columns(columns: List[str], change: Op) -> List[str]:
+    action, name = change["action"], change["column"]
+    if action == "add":
+        return [*columns, f"{name}:{change['type']}"]
+    result = []
+    for spec in columns:
+        column, typ = spec.split(":", 1)
+        if column != name:
+            result.append(spec)
+        elif action == "rename":
+            result.append(f"{change['to']}:{typ}")
+    return result
+
+"""
+Изменения схемы из операций журнала новее версии version, по порядку.
+Повтор уже примененного изменения (журнал, примененный заново после сбоя)
+пропускается
+"""
+def schema_changes(ops: List[Op], version: int) -> List[Op]:
+    changes = []
+    for op in ops:
+        if op["op"] == "alter" and op["v"] > version:
+            changes.append(op)
+            version = op["v"]
+    return changes
+
+"""
+Запись версии from_version, приведенная к версии to_version
+по изменениям схемы history (версия -> изменение)
+"""
+def upgrade_row(row: Row, history: Dict[int, Op], from_version: int,
+                to_version: int) -> Row:
+    for version in range(from_version + 1, to_version + 1):
+        change = history.get(version)
+        if change is not None:
+            row = alter_row(row, change)
+    return row
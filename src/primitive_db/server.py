@@ -0,0 +1,227 @@
+import asyncio
+import os
+import signal
+import socket
+import stat
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from src.primitive_db import engine, locks
+from src.primitive_db.constants import SERVER_HOST, SERVER_SOCKET, SERVER_WORKERS
+from src.primitive_db.decorators import set_prompts
+from src.primitive_db.output import (
+    captured,
+    inform,
+    install_thread_capture,
+    report_error,
+)
+from src.primitive_db.protocol import encode_response
+
+# Команды, недоступные в режиме сервера: кэш таблиц (и транзакция) общий
+# для всех клиентов, а вывода постранично на сервере нет
+SERVER_BLOCKED = ("begin", "commit", "rollback")
+# Наибольшая длина строки команды (insert многих записей), байт
+LINE_LIMIT = 16 * 1024 * 1024
+
+"""
+Блокировка читатели/писатель для задач asyncio: читателей может быть
+несколько, писатель - один и без читателей. Ожидающий писатель
+не пропускает новых читателей вперед себя
+"""
+class RWLock:
+    def __init__(self):
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self, exclusive: bool) -> None:
+        async with self._condition:
+            if exclusive:
+                self._waiting_writers += 1
+                try:
+                    await self._condition.wait_for(
+                        lambda: not self._writer and not self._readers
+                    )
+                except BaseException:
+                    # Ожидание отменено - читатели больше не ждут этого писателя
+                    self._waiting_writers -= 1
+                    self._condition.notify_all()
+                    raise
+                self._waiting_writers -= 1
+                self._writer = True
+            else:
+                await self._condition.wait_for(
+                    lambda: not self._writer and not self._waiting_writers
+                )
+                self._readers += 1
+
+    async def release(self, exclusive: bool) -> None:
+        async with self._condition:
+            if exclusive:
+                self._writer = False
+            else:
+                self._readers -= 1
+            self._condition.notify_all()
+
+
+"""
+Сервер базы: одна сессия (кэш таблиц и метаданных в памяти) на всех клиентов.
+Команды выполняются в пуле потоков; блокировки те же, что и у процессов
+(engine.command_locks), но в памяти: запись в таблицу - по одной,
+чтение - одновременно с другими чтениями
+"""
+class DatabaseServer:
+    def __init__(self, workers: int = SERVER_WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers=workers,
+                                           thread_name_prefix="database")
+        self._locks: Dict[str, RWLock] = {}
+        self.clients = 0
+
+    """
+    Выполнение команды в потоке пула с перехватом ее вывода.
+    Возвращает (успех, stdout, stderr); успех - не было сообщений об ошибках
+    """
+    def _run(self, args: List[str]) -> Tuple[bool, str, str]:
+        with captured() as (out, err):
+            try:
+                engine.run_command(args)
+            except Exception as e:
+                report_error(f"Произошла непредвиденная ошибка: {e}")
+        return not err.getvalue(), out.getvalue(), err.getvalue()
+
+    """
+    Выполнение строки команды клиента под блокировками ее таблицы и метаданных
+    """
+    async def execute(self, line: str) -> Tuple[bool, str, str]:
+        try:
+            commands = engine.parse_script([line])
+        except ValueError as e:
+            return False, "", f"{e}\n"
+        if not commands:
+            return True, "", ""
+        args = commands[0][1]
+        if args[0] in SERVER_BLOCKED:
+            return False, "", f"Команда {args[0]} недоступна в режиме сервера.\n"
+        if "--page" in args:
+            return False, "", "--page недоступен в режиме сервера.\n"
+
+        # Команды над всей базой (backup, restore) ждут окончания остальных
+        # и не пускают новые: блокировки файлов сервер не использует
+        whole = args[0] in engine.DATABASE_COMMANDS
+        plan = [(locks.DATABASE_LOCK, whole), *engine.command_locks(args)]
+        held = []
+        try:
+            for path, exclusive in plan:
+                lock = self._locks.setdefault(path, RWLock())
+                await lock.acquire(exclusive)
+                held.append((lock, exclusive))
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, self._run, args)
+        finally:
+            for lock, exclusive in reversed(held):
+                await lock.release(exclusive)
+
+    """
+    Обслуживание соединения: команды читаются построчно, ответы
+    отправляются в том же порядке. exit закрывает соединение
+    """
+    async def handle_client(self, reader: asyncio.StreamReader,
+                            writer: asyncio.StreamWriter) -> None:
+        self.clients += 1
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                text = line.decode("utf-8", errors="replace").strip()
+                if text.rstrip(";") == "exit":
+                    break
+                ok, out, err = await self.execute(text)
+                writer.write(encode_response(ok, out, err))
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            # Разрыв соединения или строка длиннее LINE_LIMIT
+            pass
+        finally:
+            self.clients -= 1
+            writer.close()
+
+    """
+    Прием соединений до сигнала SIGINT или SIGTERM
+    """
+    async def listen(self, socket_path: Optional[str], host: str,
+                     port: Optional[int]) -> None:
+        if port is None:
+            remove_stale_socket(socket_path)
+            server = await asyncio.start_unix_server(
+                self.handle_client, path=socket_path, limit=LINE_LIMIT
+            )
+            address = socket_path
+        else:
+            server = await asyncio.start_server(
+                self.handle_client, host, port, limit=LINE_LIMIT
+            )
+            address = f"{host}:{port}"
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stop.set)
+        inform(f"Сервер базы данных запущен: {address}. Остановка - Ctrl-C.")
+        try:
+            async with server:
+                await stop.wait()
+        finally:
+            if port is None and os.path.exists(socket_path):
+                os.remove(socket_path)
+        inform("Сервер остановлен.")
+
+
+"""
+Удаление файла сокета, оставшегося от завершившегося сервера.
+Если по сокету отвечает работающий сервер - ошибка
+"""
+def remove_stale_socket(path: str) -> None:
+    try:
+        if not stat.S_ISSOCK(os.stat(path).st_mode):
+            raise ValueError(f"{path} существует и не является сокетом.")
+    except FileNotFoundError:
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except ConnectionRefusedError:
+        os.remove(path)
+        return
+    finally:
+        probe.close()
+    raise ValueError(f"По сокету {path} уже работает сервер.")
+
+"""
+Запуск сервера (команда database serve). На время работы сервер
+держит исключительную блокировку базы: таблицы в его памяти не могут
+измениться в обход него. Возвращает код завершения
+"""
+def serve(socket_path: Optional[str] = SERVER_SOCKET, host: str = SERVER_HOST,
+          port: Optional[int] = None, workers: int = SERVER_WORKERS) -> int:
+    cache = engine.start_session(reload_metadata=False)
+    try:
+        locks.lock_database()
+    except ValueError as e:
+        report_error(f"Сервер не запущен: {e}")
+        engine.end_session(cache)
+        return 1
+
+    set_prompts(False)
+    install_thread_capture()
+    server = DatabaseServer(workers)
+    try:
+        asyncio.run(server.listen(socket_path, host, port))
+    except (OSError, ValueError) as e:
+        report_error(f"Сервер не запущен: {e}")
+        return 1
+    finally:
+        server.executor.shutdown(wait=True)
+        engine.end_session(cache)
+    return 0
@@ -0,0 +1,285 @@
+"""
+Статистика таблицы для info и выбора способа доступа (core.access_path):
+число записей и по каждому столбцу - число значений (не пропусков),
+min/max и оценка числа различных значений (HyperLogLog).
+Статистика обновляется операциями insert/update/delete в кэше таблиц
+и хранится в data/<таблица>.stats.json с подписью файлов таблицы, для
+которой она посчитана. Удаление и изменение записи не сужают min/max
+и не уменьшают оценку различных значений - они остаются границами сверху
+до пересчета (команда analyze)
+"""
+import base64
+import json
+import math
+import os
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.primitive_db import metrics
+from src.primitive_db.constants import DATA_DIR, STATS_HLL_PRECISION
+from src.primitive_db.storage import Op, Row, Signature, atomic_write, table_path
+
+# Операции сравнения, для которых доля записей оценивается по min/max
+_LOWER = (">", ">=")
+_UPPER = ("<", "<=")
+
+"""
+Устойчивый между процессами 32-битный хеш значения (hash() строк
+меняется от запуска к запуску): CRC32 текста значения, перемешанный
+умножением, чтобы старшие биты (номер регистра) были равномерны
+"""
+def _hash(value: Any) -> int:
+    return (zlib.crc32(str(value).encode("utf-8")) * 0x9E3779B1) & 0xFFFFFFFF
+
+"""
+Оценка числа различных значений (HyperLogLog): 2^precision регистров
+по байту, погрешность около 1.04 / sqrt(2^precision)
+"""
+class HyperLogLog:
+    def __init__(self, precision: int = STATS_HLL_PRECISION):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def update(self, values: Iterable[Any]) -> None:
+        registers = self.registers
+        shift = 32 - self.precision
+        mask = (1 << shift) - 1
+        for code in map(_hash, values):
+            pos = code >> shift
+            rank = shift - (code & mask).bit_length() + 1
+            if rank > registers[pos]:
+                registers[pos] = rank
+
+    def count(self) -> float:
+        size = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / size)
+        estimate = alpha * size * size / sum(2.0 ** -rank for rank in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * size and zeros:
+            # Малые значения точнее оцениваются по числу пустых регистров
+            estimate = size * math.log(size / zeros)
+        return estimate
+
+    def dump(self) -> str:
+        return base64.b64encode(bytes(self.registers)).decode("ascii")
+
+    def restore(self, data: str) -> None:
+        self.registers = bytearray(base64.b64decode(data))
+        self.precision = len(self.registers).bit_length() - 1
+
+
+"""
+Статистика столбца: число значений, min/max и оценка различных значений
+"""
+class ColumnStats:
+    def __init__(self):
+        self.count = 0
+        self.min: Any = None
+        self.max: Any = None
+        self.sketch = HyperLogLog()
+
+    """
+    Учет значений (без пропусков). Хешируются только различные значения
+    """
+    def add(self, values: List[Any]) -> None:
+        self.count += len(values)
+        distinct = set(values)
+        self.sketch.update(distinct)
+        bounds = [*distinct, *(v for v in (self.min, self.max) if v is not None)]
+        try:
+            self.min, self.max = min(bounds), max(bounds)
+        except TypeError:
+            # Значения разных типов (столбец после смены типа данных) - границы
+            # остаются прежними
+            pass
+
+    def distinct(self) -> int:
+        return min(round(self.sketch.count()), self.count)
+
+    def contains(self, value: Any) -> bool:
+        try:
+            return self.count > 0 and self.min <= value <= self.max
+        except TypeError:
+            return True
+
+    """
+    Доля диапазона [min, max], попадающая в [low, high] (None - без границы);
+    целые считаются дискретными. None - оценка невозможна (не целые)
+    """
+    def range_share(self, low: Any, high: Any) -> Optional[float]:
+        bounds = [v for v in (self.min, self.max, low, high) if v is not None]
+        if not all(type(v) in (int, bool) for v in bounds):
+            return None
+        low = self.min if low is None else max(low, self.min)
+        high = self.max if high is None else min(high, self.max)
+        if high < low:
+            return 0.0
+        return (high - low + 1) / (self.max - self.min + 1)
+
+    def dump(self) -> Dict[str, Any]:
+        return {"count": self.count, "min": self.min, "max": self.max,
+                "sketch": self.sketch.dump()}
+
+    @classmethod
+    def restore(cls, data: Dict[str, Any]) -> "ColumnStats":
+        column = cls()
+        column.count, column.min, column.max = data["count"], data["min"], data["max"]
+        column.sketch.restore(data["sketch"])
+        return column
+
+
+"""
+Статистика таблицы: число записей и статистика столбцов данных (без ID)
+"""
+class TableStats:
+    def __init__(self):
+        self.rows = 0
+        self.columns: Dict[str, ColumnStats] = {}
+
+    """
+    Статистика таблицы в памяти (ColumnarTable) по столбцам, без создания записей
+    """
+    @classmethod
+    def build(cls, table: Any) -> "TableStats":
+        stats = cls()
+        stats.rows = len(table)
+        for name in list(table.columns):
+            values, _ = table.column(name)
+            values = [v for v, alive in zip(values, table.alive)
+                      if alive and v is not None]
+            if values:
+                stats.columns[name] = column = ColumnStats()
+                column.add(values)
+        return stats
+
+    def add_rows(self, rows: List[Row]) -> None:
+        self.rows += len(rows)
+        values: Dict[str, List[Any]] = {}
+        for row in rows:
+            for name, value in row.items():
+                if value is not None and name != "ID":
+                    values.setdefault(name, []).append(value)
+        for name, column_values in values.items():
+            self.columns.setdefault(name, ColumnStats()).add(column_values)
+
+    def remove_row(self, row: Row) -> None:
+        self.rows -= 1
+        for name, value in row.items():
+            column = self.columns.get(name)
+            if column is not None and value is not None:
+                column.count -= 1
+
+    """
+    Статистика после изменения схемы (см. schema.alter_row)
+    """
+    def alter(self, change: Op) -> None:
+        action, name = change["action"], change["column"]
+        if action == "add":
+            self.columns.pop(name, None)
+            if change.get("default") is not None and self.rows:
+                self.columns[name] = column = ColumnStats()
+                column.add([change["default"]] * self.rows)
+        elif action == "drop":
+            self.columns.pop(name, None)
+        elif name in self.columns:
+            self.columns[change["to"]] = self.columns.pop(name)
+
+    """
+    Учет операций журнала, если для этого не нужны прежние записи
+    (insert и изменения схемы). False - в операциях есть update или delete,
+    статистику нужно посчитать заново
+    """
+    def apply_inserts(self, ops: List[Op]) -> bool:
+        if any(op["op"] not in ("insert", "alter") for op in ops):
+            return False
+        batch: List[Row] = []
+        for op in ops:
+            if op["op"] == "insert":
+                batch.append(op["row"])
+                continue
+            self.add_rows(batch)
+            batch = []
+            self.alter(op)
+        self.add_rows(batch)
+        return True
+
+    """
+    Доля записей, удовлетворяющих сравнению column op values (значения
+    в типе столбца). None - по статистике оценить нельзя
+    """
+    def selectivity(self, column: str, op: str, values: List[Any]) -> Optional[float]:
+        if self.rows <= 0:
+            return 0.0
+        stats = self.columns.get(column)
+        if stats is None or stats.count <= 0:
+            # В столбце нет значений: совпадений нет, отрицания - не оцениваются
+            return None if op in ("!=", "not in") else 0.0
+        present = min(stats.count / self.rows, 1.0)
+        if op in ("=", "in", "!=", "not in"):
+            inside = sum(1 for value in set(values) if stats.contains(value))
+            share = present * min(inside / max(stats.distinct(), 1), 1.0)
+            return share if op in ("=", "in") else present - share
+        if op == "between":
+            share = stats.range_share(values[0], values[-1])
+        elif op in _LOWER:
+            low = values[0] + 1 if op == ">" and type(values[0]) is int else values[0]
+            share = stats.range_share(low, None)
+        elif op in _UPPER:
+            high = values[0] - 1 if op == "<" and type(values[0]) is int else values[0]
+            share = stats.range_share(None, high)
+        else:
+            return None
+        return None if share is None else present * share
+
+    def dump(self) -> Dict[str, Any]:
+        return {"rows": self.rows,
+                "columns": {name: column.dump()
+                            for name, column in self.columns.items()}}
+
+    @classmethod
+    def restore(cls, data: Dict[str, Any]) -> "TableStats":
+        stats = cls()
+        stats.rows = data["rows"]
+        stats.columns = {name: ColumnStats.restore(column)
+                         for name, column in data["columns"].items()}
+        return stats
+
+
+"""
+Путь к файлу статистики таблицы
+"""
+def stats_path(table_name: str) -> str:
+    return table_path(table_name, "stats.json")
+
+"""
+Загрузка статистики таблицы: подпись файлов таблицы, для которой она
+посчитана, и статистика. (None, None) - файла нет или он поврежден
+"""
+def load_stats(table_name: str) -> Tuple[Optional[Signature], Optional[TableStats]]:
+    try:
+        with open(stats_path(table_name), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+            metrics.add("bytes_read", f.tell())
+        signature = tuple(tuple(part) for part in data["signature"])
+        return signature, TableStats.restore(data["stats"])
+    except (FileNotFoundError, ValueError, KeyError, TypeError):
+        return None, None
+
+"""
+Сохранение статистики с подписью файлов таблицы. Статистика восстанавливается
+по таблице, поэтому записывается без fsync
+"""
+def save_stats(table_name: str, stats: TableStats, signature: Signature) -> None:
+    os.makedirs(DATA_DIR, exist_ok=True)
+    data = {"signature": signature, "stats": stats.dump()}
+    with atomic_write(stats_path(table_name), sync=False) as f:
+        f.write(json.dumps(data, ensure_ascii=False))
+
+"""
+Удаление файла статистики таблицы
+"""
+def drop_stats(table_name: str) -> None:
+    try:
+        os.remove(stats_path(table_name))
+    except FileNotFoundError:
+        pass
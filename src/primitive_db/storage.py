@@ -0,0 +1,460 @@
+import json
+import os
+import re
+from contextlib import contextmanager
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.primitive_db import binary, metrics
+from src.primitive_db.constants import (
+    DATA_DIR,
+    DURABILITY,
+    DURABILITY_LEVELS,
+    LOG_COMPACT_MIN_BYTES,
+    STORAGE_BACKEND,
+)
+from src.primitive_db.schema import (
+    alter_columns,
+    alter_row,
+    schema_changes,
+    upgrade_row,
+)
+
+Row = Dict[str, Any]
+Op = Dict[str, Any]
+Signature = Tuple[Tuple[int, int, int], ...]
+
+# Суффикс временных файлов атомарной записи
+TMP_SUFFIX = ".tmp"
+
+_durability = DURABILITY
+
+"""
+Установка уровня надежности записи для текущей сессии
+"""
+def set_durability(level: str) -> None:
+    global _durability
+    if level not in DURABILITY_LEVELS:
+        raise ValueError(f"Неизвестный уровень надежности: {level}. \
+                         Доступные: {', '.join(DURABILITY_LEVELS)}")
+    _durability = level
+
+def get_durability() -> str:
+    return _durability
+
+"""
+Сброс на диск записи о файлах каталога (создание, переименование, удаление)
+"""
+def fsync_dir(path: str) -> None:
+    fd = os.open(path or ".", os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+"""
+Атомарная запись файла: данные пишутся во временный файл рядом с целевым,
+который затем заменяет целевой переименованием. При сбое во время записи
+остается старая версия файла, а не обрезанная новая.
+Имя временного файла содержит PID, чтобы процессы не мешали друг другу.
+binary=True - файл открывается в двоичном режиме, sync=False - без fsync
+при любом уровне надежности (файл, который можно построить заново)
+"""
+@contextmanager
+def atomic_write(path: str, binary: bool = False, sync: bool = True) -> Iterator[IO]:
+    tmp_path = f"{path}.{os.getpid()}{TMP_SUFFIX}"
+    try:
+        with (open(tmp_path, 'wb') if binary
+              else open(tmp_path, 'w', encoding='utf-8')) as f:
+            yield f
+            metrics.add("bytes_written", f.tell())
+            if sync and _durability != "off":
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    if sync and _durability == "full":
+        fsync_dir(os.path.dirname(path))
+
+"""
+Дозапись строк в конец файла (журнал); при уровне full - с fsync.
+Строки пишутся одним вызовом write в режиме O_APPEND, поэтому дозаписи
+разных процессов не перемешиваются
+"""
+def append_durable(path: str, text: str) -> None:
+    data = text.encode("utf-8")
+    metrics.add("bytes_written", len(data))
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        while data:
+            data = data[os.write(fd, data):]
+        if _durability == "full":
+            os.fsync(fd)
+    finally:
+        os.close(fd)
+
+"""
+Проверка имени таблицы: буквы, цифры, '_' и '-' (не первым символом).
+Имя становится частью пути к файлам в DATA_DIR, поэтому разделители
+каталогов, точки и пробелы недопустимы
+"""
+def validate_table_name(table_name: str) -> None:
+    if not re.fullmatch(r"\w[\w-]*", table_name):
+        raise ValueError(f"Некорректное имя таблицы: {table_name!r}. \
+                         Допустимы буквы, цифры, '_' и '-'.")
+
+"""
+Путь к файлу таблицы с заданным расширением
+"""
+def table_path(table_name: str, ext: str) -> str:
+    return os.path.join(DATA_DIR, f"{table_name}.{ext}")
+
+"""
+Подпись файлов (время изменения, размер и inode) для проверки их актуальности.
+Атомарная запись создает новый файл, поэтому inode меняется даже тогда,
+когда время изменения и размер совпали
+"""
+def file_signature(paths: List[str]) -> Signature:
+    signature = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            signature.append((st.st_mtime_ns, st.st_size, st.st_ino))
+        except FileNotFoundError:
+            signature.append((0, -1, 0))
+    return tuple(signature)
+
+"""
+Запись файла метаданных (атомарно, через временный файл)
+"""
+def write_metadata_file(filepath: str, data: Dict[str, Any]) -> None:
+    with atomic_write(filepath) as f:
+        json.dump(data, f, ensure_ascii=False, indent=4)
+
+"""
+Операция журнала insert или update с записью версии схемы version.
+Версия 1 не пишется: журналы таблиц без изменений схемы остаются прежними
+"""
+def row_op(kind: str, row: Row, version: int = 1) -> Op:
+    if version > 1:
+        return {"op": kind, "row": row, "v": version}
+    return {"op": kind, "row": row}
+
+"""
+Применение построчных операций к записям снапшота версии схемы version.
+Операции: {"op": "insert"|"update", "row": {...}}, {"op": "delete", "ID": n}
+и изменение схемы {"op": "alter", "v": n, ...} (см. schema.py). Запись
+операции, сделанной при прежней версии схемы (журнал, примененный заново
+после сбоя), приводится к текущей версии.
+Возвращает записи и версию схемы после операций
+"""
+def apply_ops(rows: Iterable[Row], ops: List[Op],
+              version: int = 1) -> Tuple[List[Row], int]:
+    by_id = {row["ID"]: row for row in rows}
+    history = {op["v"]: op for op in ops if op["op"] == "alter"}
+    for op in ops:
+        kind = op["op"]
+        if kind in ("insert", "update"):
+            row = op["row"]
+            if op.get("v", 1) < version:
+                row = upgrade_row(row, history, op.get("v", 1), version)
+            by_id[row["ID"]] = row
+        elif kind == "delete":
+            by_id.pop(op["ID"], None)
+        elif kind == "alter":
+            if op["v"] > version:
+                by_id = {row_id: alter_row(row, op) for row_id, row in by_id.items()}
+                version = op["v"]
+        else:
+            raise ValueError(f"Неизвестная операция журнала: {kind}")
+    return list(by_id.values()), version
+
+"""
+Содержимое JSON снапшота: массив записей, а после изменений схемы -
+объект с версией схемы {"version": n, "rows": [...]}
+"""
+def snapshot_json(rows: Iterable[Row], version: int = 1) -> Any:
+    if version > 1:
+        return {"version": version, "rows": list(rows)}
+    return list(rows)
+
+"""
+Хранение таблицы одним файлом, который перезаписывается целиком.
+Формат файла выбирается при создании таблицы: JSON (data/<таблица>.json)
+или двоичный (data/<таблица>.bin, см. binary.py). Двоичный файл создается
+вместе с таблицей и хранит схему и сжатие, поэтому формат таблицы
+определяется по тому, какой файл есть на диске
+"""
+class JsonStorage:
+    name = "json"
+    extensions = ("json", "bin")
+
+    """
+    Файлы таблицы, по подписи которых проверяется ее актуальность
+    """
+    def paths(self, table_name: str) -> List[str]:
+        return [self.snapshot_path(table_name)]
+
+    def snapshot_path(self, table_name: str) -> str:
+        path = table_path(table_name, "bin")
+        return path if os.path.exists(path) else table_path(table_name, "json")
+
+    """
+    Формат и сжатие файла таблицы: ("json", "none") или ("binary", <сжатие>)
+    """
+    def table_format(self, table_name: str) -> Tuple[str, str]:
+        path = table_path(table_name, "bin")
+        if not os.path.exists(path):
+            return "json", "none"
+        return "binary", binary.read_header(path)["compression"]
+
+    """
+    Файлы новой таблицы. Файлы прежней таблицы с тем же именем удаляются;
+    для двоичного формата сразу записывается пустой файл со схемой и сжатием,
+    JSON файл появится при первой записи
+    """
+    def create(self, table_name: str, columns: List[str],
+               table_format: str = "json", compression: str = "none") -> None:
+        self.drop(table_name)
+        if table_format == "binary":
+            os.makedirs(DATA_DIR, exist_ok=True)
+            with atomic_write(table_path(table_name, "bin"), binary=True) as f:
+                binary.write_table(f, [], columns, compression)
+
+    def load(self, table_name: str) -> Iterable[Row]:
+        return self.load_snapshot(table_name)[0]
+
+    """
+    Записи снапшота и версия схемы, при которой он записан
+    """
+    def load_snapshot(self, table_name: str) -> Tuple[Iterable[Row], int]:
+        path = table_path(table_name, "bin")
+        if os.path.exists(path):
+            table = binary.read_table(path)
+            return table, table.version
+        try:
+            with open(table_path(table_name, "json"), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+                metrics.add("bytes_read", f.tell())
+        except FileNotFoundError:
+            return [], 1
+        if isinstance(data, dict):
+            return data["rows"], data["version"]
+        return data, 1
+
+    """
+    Снапшот, версия его схемы и операции, записанные после него
+    """
+    def load_parts(self, table_name: str) -> Tuple[Iterable[Row], int, List[Op]]:
+        return (*self.load_snapshot(table_name), [])
+
+    def snapshot_signature(self, table_name: str) -> Signature:
+        return file_signature([self.snapshot_path(table_name)])
+
+    """
+    Операции, записанные между двумя состояниями файлов таблицы (подписи
+    old и new), или None, если таблицу нужно прочитать заново
+    """
+    def ops_since(self, table_name: str, old: Signature,
+                  new: Signature) -> Optional[List[Op]]:
+        return None
+
+    """
+    Перезапись снапшота записями версии схемы version. columns - столбцы
+    двоичного файла этой версии (None - прежние столбцы файла)
+    """
+    def save(self, table_name: str, rows: Iterable[Row], version: int = 1,
+             columns: Optional[List[str]] = None) -> None:
+        if self._save_binary(table_name, rows, version, columns):
+            return
+        os.makedirs(DATA_DIR, exist_ok=True)
+        with atomic_write(table_path(table_name, "json")) as f:
+            json.dump(snapshot_json(rows, version), f, ensure_ascii=False, indent=2)
+
+    """
+    Перезапись двоичного файла таблицы с его сжатием (и схемой, если
+    столбцы не заданы). Возвращает False, если таблица хранится в JSON
+    """
+    def _save_binary(self, table_name: str, rows: Iterable[Row], version: int,
+                     columns: Optional[List[str]]) -> bool:
+        path = table_path(table_name, "bin")
+        if not os.path.exists(path):
+            return False
+        header = binary.read_header(path)
+        with atomic_write(path, binary=True) as f:
+            binary.write_table(f, rows, columns or header["columns"],
+                               header["compression"], version=version)
+        return True
+
+    """
+    Перезапись снапшота записями после операций ops: записи прежних версий
+    схемы приводятся к последней, двоичный файл получает ее столбцы
+    """
+    def _rewrite(self, table_name: str, rows: Iterable[Row], version: int,
+                 ops: List[Op]) -> None:
+        changes = schema_changes(ops, version)
+        rows, version = apply_ops(rows, ops, version)
+        columns = None
+        path = table_path(table_name, "bin")
+        if changes and os.path.exists(path):
+            columns = binary.read_header(path)["columns"]
+            for change in changes:
+                columns = alter_columns(columns, change)
+        self.save(table_name, rows, version, columns)
+
+    def append(self, table_name: str, ops: List[Op],
+               compact: bool = True) -> None:
+        self._rewrite(table_name, *self.load_snapshot(table_name), ops)
+
+    def compact(self, table_name: str) -> None:
+        pass
+
+    def drop(self, table_name: str) -> None:
+        for ext in self.extensions:
+            path = table_path(table_name, ext)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+"""
+Снапшот (JSON или двоичный) + журнал операций (data/<таблица>.log,
+по строке на операцию).
+Запись новой операции - дозапись строки в конец журнала, без перезаписи таблицы.
+Журнал сворачивается в снапшот, когда становится больше самого снапшота.
+Старые таблицы без журнала читаются как есть.
+"""
+class LogStorage(JsonStorage):
+    name = "log"
+    extensions = ("json", "bin", "log")
+
+    def paths(self, table_name: str) -> List[str]:
+        return [self.snapshot_path(table_name), table_path(table_name, "log")]
+
+    def load(self, table_name: str) -> Iterable[Row]:
+        rows, version, ops = self.load_parts(table_name)
+        return apply_ops(rows, ops, version)[0] if ops else rows
+
+    def load_parts(self, table_name: str) -> Tuple[Iterable[Row], int, List[Op]]:
+        return (*self.load_snapshot(table_name), self._read_log(table_name))
+
+    def save(self, table_name: str, rows: Iterable[Row], version: int = 1,
+             columns: Optional[List[str]] = None) -> None:
+        if not self._save_binary(table_name, rows, version, columns):
+            os.makedirs(DATA_DIR, exist_ok=True)
+            with atomic_write(table_path(table_name, "json")) as f:
+                f.write(json.dumps(snapshot_json(rows, version), ensure_ascii=False))
+        # Повторное применение журнала к новому снапшоту безопасно,
+        # поэтому журнал удаляется только после записи снапшота
+        try:
+            os.remove(table_path(table_name, "log"))
+        except FileNotFoundError:
+            pass
+
+    """
+    compact=False отключает автоматическое сворачивание журнала
+    (массовая загрузка не должна читать всю таблицу в память)
+    """
+    def append(self, table_name: str, ops: List[Op],
+               compact: bool = True) -> None:
+        if not ops:
+            return
+        os.makedirs(DATA_DIR, exist_ok=True)
+        lines = "".join(
+            json.dumps(op, ensure_ascii=False, separators=(",", ":")) + "\n"
+            for op in ops
+        )
+        append_durable(table_path(table_name, "log"), lines)
+        if compact and self._needs_compaction(table_name):
+            self.compact(table_name)
+
+    """
+    Если снапшот не менялся, а журнал только дописывался,
+    читается лишь дописанный конец журнала
+    """
+    def ops_since(self, table_name: str, old: Signature,
+                  new: Signature) -> Optional[List[Op]]:
+        (old_snapshot, old_log), (new_snapshot, new_log) = old, new
+        if old_snapshot != new_snapshot or new_log[1] < 0:
+            return None
+        if old_log[1] < 0:
+            offset = 0
+        elif old_log[2] == new_log[2] and old_log[1] <= new_log[1]:
+            offset = old_log[1]
+        else:
+            return None
+        return self._read_log(table_name, offset)
+
+    def compact(self, table_name: str) -> None:
+        if os.path.exists(table_path(table_name, "log")):
+            self._rewrite(table_name, *self.load_parts(table_name))
+
+    def _needs_compaction(self, table_name: str) -> bool:
+        log_size = os.path.getsize(table_path(table_name, "log"))
+        if log_size < LOG_COMPACT_MIN_BYTES:
+            return False
+        try:
+            snapshot_size = os.path.getsize(self.snapshot_path(table_name))
+        except FileNotFoundError:
+            snapshot_size = 0
+        return log_size > snapshot_size
+
+    def _read_log(self, table_name: str, offset: int = 0) -> List[Op]:
+        try:
+            with open(table_path(table_name, "log"), 'rb') as f:
+                f.seek(offset)
+                data = f.read()
+        except FileNotFoundError:
+            return []
+        metrics.add("bytes_read", len(data))
+        lines = data.decode("utf-8").split("\n")
+        ops = []
+        for number, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                ops.append(json.loads(line))
+            except json.JSONDecodeError:
+                # Недописанная последняя строка (сбой во время записи) пропускается
+                if number == len(lines):
+                    break
+                raise ValueError(
+                    f"Поврежден журнал таблицы {table_name}, строка {number}."
+                )
+        return ops
+
+
+STORAGES = {
+    JsonStorage.name: JsonStorage,
+    LogStorage.name: LogStorage,
+}
+
+_instances: Dict[str, JsonStorage] = {}
+_backend = STORAGE_BACKEND
+
+"""
+Выбор хранилища по умолчанию для текущего процесса
+"""
+def use_storage(name: str) -> None:
+    global _backend
+    get_storage(name)
+    _backend = name
+
+"""
+Получение хранилища по имени (по умолчанию - STORAGE_BACKEND или заданное
+через use_storage)
+"""
+def get_storage(name: Optional[str] = None) -> JsonStorage:
+    name = name or _backend
+    if name not in STORAGES:
+        raise ValueError(f"Неизвестное хранилище: {name}. \
+                         Доступные: {', '.join(STORAGES)}")
+    if name not in _instances:
+        _instances[name] = STORAGES[name]()
+    return _instances[name]
@@ -0,0 +1,59 @@
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+from src.primitive_db.constants import TXN_FILE
+from src.primitive_db.stats import drop_stats
+from src.primitive_db.storage import (
+    JsonStorage,
+    Op,
+    atomic_write,
+    fsync_dir,
+    get_durability,
+    write_metadata_file,
+)
+
+"""
+Журнал транзакции: перед записью изменений в файлы таблиц и метаданных
+все изменения транзакции одним файлом сохраняются в TXN_FILE.
+Если сбой прервет commit, при следующем запуске журнал применяется
+заново (replay_journal). Операции журнала - запись строки целиком,
+удаление по ID или изменение схемы с номером версии (уже примененная
+версия пропускается), поэтому повторное применение безопасно
+"""
+def write_journal(tables: Dict[str, List[Op]],
+                  metadata: Dict[str, Dict[str, Any]]) -> None:
+    with atomic_write(TXN_FILE) as f:
+        json.dump({"tables": tables, "metadata": metadata}, f, ensure_ascii=False)
+
+"""
+Удаление журнала после того, как все изменения записаны
+"""
+def clear_journal() -> None:
+    try:
+        os.remove(TXN_FILE)
+    except FileNotFoundError:
+        return
+    if get_durability() == "full":
+        fsync_dir(os.path.dirname(TXN_FILE))
+
+"""
+Применение журнала незавершенного commit (при запуске).
+Часть операций могла быть уже записана и учтена в статистике таблицы,
+поэтому статистика таблиц журнала удаляется и будет посчитана заново.
+Возвращает число таблиц, изменения которых применены, или None,
+если журнала нет
+"""
+def replay_journal(storage: JsonStorage) -> Optional[int]:
+    try:
+        with open(TXN_FILE, 'r', encoding='utf-8') as f:
+            journal = json.load(f)
+    except FileNotFoundError:
+        return None
+    for table_name, ops in journal["tables"].items():
+        storage.append(table_name, ops)
+        drop_stats(table_name)
+    for filepath, data in journal["metadata"].items():
+        write_metadata_file(filepath, data)
+    clear_journal()
+    return len(journal["tables"])
@@ -1,42 +1,314 @@
 import json
-from typing import Any, Dict, List
+from typing import Any, Collection, Dict, List, Optional, Tuple
+
+from src.primitive_db import metrics
+from src.primitive_db.cache import TableCache
+from src.primitive_db.indexes import drop_indexes, load_indexes
+from src.primitive_db.stats import TableStats, drop_stats, save_stats
+from src.primitive_db.storage import (
+    atomic_write,
+    file_signature,
+    get_storage,
+    write_metadata_file,
+)
+from src.primitive_db.transaction import clear_journal, write_journal
+
+# Кэш таблиц текущей сессии (устанавливается движком через use_cache)
+_cache: Optional[TableCache] = None
+
+"""
+Подключение кэша таблиц сессии. None - работа напрямую с диском
+"""
+def use_cache(cache: Optional[TableCache]) -> None:
+    global _cache
+    _cache = cache
+
+"""
+Приведение метаданных старого формата (список столбцов таблицы)
+к виду {"columns": [...], "sequence": n}.
+Счетчик ID заполняется максимальным ID из данных таблицы.
+Возвращает True, если метаданные были изменены
+"""
+def upgrade_metadata(data: Dict[str, Any]) -> bool:
+    changed = False
+    for table_name, entry in data.items():
+        if isinstance(entry, list):
+            rows = load_table_data(table_name)
+            data[table_name] = {
+                "columns": entry,
+                "sequence": max((row.get("ID", 0) for row in rows), default=0),
+            }
+            changed = True
+    return changed
 
 """
 Загрузка метаданных из JSON файла
 """
+@metrics.timed("load")
 def load_metadata(filepath: str) -> Dict[str, Any]:
+    if _cache is not None:
+        data = _cache.get_metadata(filepath)
+    else:
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+                metrics.add("bytes_read", f.tell())
+        except FileNotFoundError:
+            data = {}
+    upgrade_metadata(data)
+    return data
+
+"""
+Перевод файла метаданных в новый формат.
+Возвращает True, если файл был обновлен
+"""
+def migrate_metadata(filepath: str) -> bool:
     try:
         with open(filepath, 'r', encoding='utf-8') as f:
-            return json.load(f)
+            data = json.load(f)
     except FileNotFoundError:
-        return {}
+        return False
+    if not upgrade_metadata(data):
+        return False
+    save_metadata(filepath, data)
+    return True
 
 """
-Сохранение метаданных в JSON файл
+Сохранение метаданных в JSON файл (атомарно, через временный файл)
 """
+@metrics.timed("save")
 def save_metadata(filepath: str, data: Dict[str, Any]):
     if data is None:
         data = {}
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
+    if _cache is not None and _cache.in_transaction:
+        # Внутри транзакции метаданные записываются при commit
+        _cache.stage_metadata(filepath, data)
+        return
+    write_metadata_file(filepath, data)
+    if _cache is not None:
+        _cache.set_metadata(filepath, data)
 
 """
 Загрузка данных таблиц из папки data/
 """
-def load_table_data(table_name: str) -> List[Dict[str, Any]]:
-    filepath = f"data/{table_name}.json"
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return []
+@metrics.timed("load")
+def load_table_data(table_name: str) -> Collection[Dict[str, Any]]:
+    if _cache is not None:
+        return _cache.get(table_name)
+    return get_storage().load(table_name)
+
+"""
+Создание файлов новой таблицы в выбранном формате (json или binary)
+вместе с пустой статистикой, которую дальше обновляют изменения таблицы
+"""
+@metrics.timed("save")
+def create_table_data(table_name: str, columns: List[str],
+                      table_format: str = "json", compression: str = "none") -> None:
+    if _cache is not None:
+        _cache.discard(table_name)
+    storage = get_storage()
+    storage.create(table_name, columns, table_format, compression)
+    save_stats(table_name, TableStats(), file_signature(storage.paths(table_name)))
+
+"""
+Формат и сжатие файла таблицы
+"""
+def table_format(table_name: str) -> Tuple[str, str]:
+    return get_storage().table_format(table_name)
 
 """
-Сохранение данных таблиц в папку data/
+Сохранение данных таблиц в папку data/ (полная перезапись).
+version и columns - версия и столбцы схемы, которой соответствуют записи
 """
-def save_table_data(table_name: str, data: List[Dict[str, Any]]) -> None:
-    filepath = f"data/{table_name}.json"
+@metrics.timed("save")
+def save_table_data(table_name: str, data: List[Dict[str, Any]],
+                    version: int = 1, columns: Optional[List[str]] = None) -> None:
     if data is None:
-        data = {}
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
\ No newline at end of file
+        data = []
+    if _cache is not None:
+        _cache.discard(table_name)
+    get_storage().save(table_name, data, version, columns)
+
+"""
+Запись изменения схемы: метаданные с новой версией схемы и операция
+журнала таблицы. Вне транзакции обе записи проходят через журнал
+транзакции, чтобы сбой между ними не оставил схему без записей
+"""
+@metrics.timed("save")
+def save_schema_change(filepath: str, data: Dict[str, Any], table_name: str,
+                       ops: List[Dict[str, Any]]) -> None:
+    if in_transaction():
+        save_metadata(filepath, data)
+        append_table_ops(table_name, ops)
+        return
+    write_journal({table_name: ops}, {filepath: data})
+    (_cache or TableCache()).append_now(table_name, ops)
+    save_metadata(filepath, data)
+    clear_journal()
+
+"""
+Запись построчных изменений таблицы (insert/update/delete).
+С кэшем изменения попадают на диск при flush_tables
+"""
+@metrics.timed("save")
+def append_table_ops(table_name: str, ops: List[Dict[str, Any]]) -> None:
+    if _cache is not None:
+        _cache.apply(table_name, ops)
+    else:
+        get_storage().append(table_name, ops)
+
+"""
+Запись пачки операций сразу на диск, без удержания таблицы в памяти.
+Журнал при этом не сворачивается
+"""
+@metrics.timed("save")
+def bulk_append_table_ops(table_name: str, ops: List[Dict[str, Any]]) -> None:
+    if _cache is not None:
+        _cache.append_direct(table_name, ops)
+    else:
+        get_storage().append(table_name, ops, compact=False)
+
+"""
+Запись на диск накопленных в кэше изменений
+"""
+@metrics.timed("save")
+def flush_tables() -> None:
+    if _cache is not None:
+        _cache.flush()
+
+"""
+Сворачивание журнала изменений таблицы в снапшот
+"""
+@metrics.timed("save")
+def compact_table_data(table_name: str) -> None:
+    if _cache is not None:
+        _cache.compact(table_name)
+    else:
+        get_storage().compact(table_name)
+
+"""
+Удаление файлов данных таблицы
+"""
+def drop_table_data(table_name: str) -> None:
+    if _cache is not None:
+        _cache.drop(table_name)
+    else:
+        drop_indexes(table_name)
+        drop_stats(table_name)
+    get_storage().drop(table_name)
+
+"""
+Поиск записей по индексу столбца.
+Возвращает None, если индекса нет (или кэш не подключен) - нужен полный перебор
+"""
+@metrics.timed("filter")
+def find_rows(table_name: str, column: str,
+              value: Any) -> Optional[List[Dict[str, Any]]]:
+    if _cache is None:
+        return None
+    return _cache.find_rows(table_name, column, value)
+
+"""
+Поиск записей со значением столбца в диапазоне по упорядоченному индексу.
+Возвращает None, если такого индекса нет - нужен полный перебор
+"""
+@metrics.timed("filter")
+def find_range(table_name: str, column: str, low: Any, high: Any,
+               low_inclusive: bool = True,
+               high_inclusive: bool = True) -> Optional[List[Dict[str, Any]]]:
+    if _cache is None:
+        return None
+    return _cache.find_range(table_name, column, low, high,
+                             low_inclusive, high_inclusive)
+
+"""
+Статистика таблицы (см. stats.py), без чтения таблицы, если сохраненная
+статистика соответствует ее файлам
+"""
+def table_stats(table_name: str) -> TableStats:
+    return (_cache or TableCache()).table_stats(table_name)
+
+"""
+Пересчет статистики таблицы по ее записям
+"""
+def analyze_table(table_name: str) -> TableStats:
+    return (_cache or TableCache()).analyze(table_name)
+
+"""
+Индексы таблицы: столбец -> вид индекса
+"""
+def table_indexes(table_name: str) -> Dict[str, str]:
+    if _cache is not None:
+        return _cache.indexes(table_name)
+    _, indexes = load_indexes(table_name)
+    return {column: index.kind for column, index in indexes.items()}
+
+"""
+Создание индекса по столбцу таблицы
+"""
+def create_index(table_name: str, column: str, kind: str) -> None:
+    (_cache or TableCache()).create_index(table_name, column, kind)
+
+"""
+Удаление индекса по столбцу таблицы
+"""
+def drop_index(table_name: str, column: str) -> None:
+    (_cache or TableCache()).drop_index(table_name, column)
+
+"""
+Резервная копия базы в архив filepath (см. backup.py).
+Возвращает manifest копии
+"""
+@metrics.timed("save")
+def backup_database(filepath: str, data: Dict[str, Any],
+                    incremental: bool = False) -> Dict[str, Any]:
+    from src.primitive_db.backup import write_backup
+
+    return write_backup(filepath, data, incremental)
+
+"""
+Замена файлов базы распакованной копией (см. backup.install_restore).
+Таблицы базы и копии удаляются из кэша, метаданные в кэше заменяются
+каталогом копии
+"""
+@metrics.timed("save")
+def restore_database(filepath: str, staging: str, manifest: Dict[str, Any],
+                     catalog: Dict[str, Any], current_tables: List[str]) -> None:
+    from src.primitive_db.backup import install_restore
+
+    install_restore(staging, manifest, filepath, current_tables)
+    if _cache is not None:
+        for table_name in {*current_tables, *manifest["tables"]}:
+            _cache.discard(table_name)
+        _cache.set_metadata(filepath, catalog)
+
+"""
+Транзакции сессии: begin, commit (возвращает число измененных таблиц),
+rollback. Доступны только при работе через кэш таблиц
+"""
+def begin_transaction() -> None:
+    if _cache is None:
+        raise ValueError("Транзакции доступны только в сессии с кэшем таблиц.")
+    _cache.begin()
+
+def commit_transaction() -> int:
+    if _cache is None:
+        raise ValueError("Нет открытой транзакции.")
+    return _cache.commit()
+
+def rollback_transaction() -> None:
+    if _cache is None:
+        raise ValueError("Нет открытой транзакции.")
+    _cache.rollback()
+
+def in_transaction() -> bool:
+    return _cache is not None and _cache.in_transaction
+
+"""
+Запись метрик сессии в файл (атомарно): JSON для *.json,
+иначе текстовый формат Prometheus
+"""
+def save_metrics(filepath: str) -> None:
+    text = metrics.render(filepath)
+    with atomic_write(filepath) as f:
+        f.write(text)